@@ -1,22 +1,46 @@
-from fastapi import APIRouter, HTTPException, Body, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
 from app.services.se_user_management import (
-    get_se_user,
-    create_se_user,
-    update_se_user,
-    delete_se_user,
-    log_usage,
-    fetch_usage_summary
+    get_se_user_async,
+    get_se_user_versioned_async,
+    create_se_user_async,
+    update_se_user_async,
+    delete_se_user_async,
+    fetch_usage_summary_async
 )
-from app.services.se_prompt import get_outgoing_paraphrase, get_incoming_paraphrase
-from app.services.se_psql_management import add_text_log, get_session_text_logs, get_latest_text_logs
+from app.services.se_prompt import (
+    INCOMING_PARAPHRASE_PREFIX,
+    OUTGOING_PARAPHRASE_PREFIX,
+    PromptPrefix,
+    get_incoming_paraphrase,
+    get_outgoing_paraphrase,
+    paraphrase_call_count,
+    stream_incoming_paraphrase,
+    stream_outgoing_paraphrase,
+)
+from app.services.se_psql_management import fetch_latest_text_logs, get_text_log_high_water_mark, note_text_log_write
+from app.services.se_psql_routing import READ_AFTER_HEADER, read_after_token
 from app.schemas.se_user import SEUserCreate, SEUserUpdate, SEUserResponse
-from app.services.se_agent import initialize_session, run_agent
+from app.services.se_agent import initialize_session, run_agent, stream_agent
+from app.services.se_agent_events import AgentError, TextDelta, event_to_dict
+from app.services.se_executor import run_gemini, run_postgres, run_reasoning_engine
+from app.services.se_singleflight import SingleFlight
+from app.services.se_proxy import post_json, proxy_request
+from app.services.se_live import Handler, LiveConnection, iterate_blocking
+from app.services.se_admission import charge_admitted_request, get_route_policy
+from app.services.se_serialization import FastJSONResponse, dump_text_log_rows, dump_user_response, json_bytes_response, user_response
+from app.services.se_textlog_export import DEFAULT_BATCH_SIZE, arrow_ipc_stream, complete_batches, export_cap, fetch_text_log_batches, naive_utc
+from app.services.se_etag import CONDITIONAL_REQUESTS, ETagCache, etag_matches, make_etag, not_modified
+from app.services.se_text_log_buffer import LATEST_TEXT_LOG_READS, LatestTextLogBuffer
+from starlette.background import BackgroundTask, BackgroundTasks
 from pydantic import BaseModel
+import os
+import hmac
+import asyncio
+import json
 import logging
-from typing import List, Optional, Dict, Any
-import requests
-import httpx
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
 
 
 router = APIRouter()
@@ -24,6 +48,27 @@ logger = logging.getLogger('app.main')  # Use the main app's logger
 
 multi_agent_url = "http://localhost:8010"
 
+# Server that owns the textlog table; text-log endpoints here proxy to it
+TEXT_LOG_SERVER_URL = os.getenv("SE_TEXT_LOG_SERVER_URL", "http://35.192.165.158:8020")
+TEXT_LOG_SERVER_HEADERS = {"X-Internal-Token": "my-shared-secret"}  # optional security
+
+# Shared secret for the bulk text-log export; the endpoint is disabled when unset
+EXPORT_TOKEN = os.getenv("SE_EXPORT_TOKEN")
+
+# Concurrent identical reads share one in-flight upstream call
+user_lookups = SingleFlight("get_se_user")
+paraphrases = SingleFlight("paraphrase")
+latest_text_log_fills = SingleFlight("latest_text_logs")
+
+# Last known ETags, so a poll with a current If-None-Match can be answered
+# with 304 without touching Firestore or Postgres
+user_etags = ETagCache()
+text_log_etags = ETagCache()
+
+# Newest text logs of recently polled users, kept current by the writes
+# that go through this app
+latest_text_logs = LatestTextLogBuffer()
+
 class ParaphraseRequest(BaseModel):
     text_content: str
 
@@ -35,12 +80,34 @@ class RunAgentRequest(BaseModel):
     question: str
 
 @router.get("/users/{uid}", response_model=SEUserResponse)
-async def get_se_user_endpoint(uid: str):
+async def get_se_user_endpoint(uid: str, request: Request):
     try:
-        user_data = get_se_user(uid)
+        if_none_match = request.headers.get("if-none-match")
+        cached_etag = user_etags.get(uid)
+        if etag_matches(if_none_match, cached_etag):
+            CONDITIONAL_REQUESTS.inc("user", "cached_304")
+            return not_modified(cached_etag)
+
+        stamp = user_etags.stamp(uid)
+        user_data, updated_at = await user_lookups.do(uid, get_se_user_versioned_async, uid)
         if user_data is None:
+            user_etags.invalidate(uid)
             raise HTTPException(status_code=404, detail="SE User not found")
-        return user_data
+
+        # Version by the document's update time; hash the body if Firestore did not report one
+        body = None
+        if updated_at is None:
+            body = dump_user_response(user_data)
+        etag = make_etag("user", uid, updated_at if updated_at is not None else body)
+        user_etags.set(uid, None, etag, stamp)
+        if etag_matches(if_none_match, etag):
+            CONDITIONAL_REQUESTS.inc("user", "checked_304")
+            return not_modified(etag)
+        if if_none_match:
+            CONDITIONAL_REQUESTS.inc("user", "modified")
+        if body is None:
+            body = dump_user_response(user_data)
+        return json_bytes_response(body, {"ETag": etag})
     except HTTPException:
         raise
     except Exception as e:
@@ -51,12 +118,13 @@ async def get_se_user_endpoint(uid: str):
 async def create_se_user_endpoint(uid: str, user_data: SEUserCreate):
     try:
         # Check if user already exists
-        existing_user = get_se_user(uid)
+        existing_user = await get_se_user_async(uid)
         if existing_user is not None:
             raise HTTPException(status_code=409, detail="SE User already exists")
             
-        created_user = create_se_user(uid, user_data)
-        return created_user
+        created_user = await create_se_user_async(uid, user_data)
+        user_etags.invalidate(uid)
+        return user_response(created_user)
     except HTTPException:
         raise
     except Exception as e:
@@ -66,10 +134,11 @@ async def create_se_user_endpoint(uid: str, user_data: SEUserCreate):
 @router.put("/users/{uid}", response_model=SEUserResponse)
 async def update_se_user_endpoint(uid: str, user_data: SEUserUpdate):
     try:
-        updated_user = update_se_user(uid, user_data)
+        updated_user = await update_se_user_async(uid, user_data)
+        user_etags.invalidate(uid)
         if updated_user is None:
             raise HTTPException(status_code=404, detail="SE User not found")
-        return updated_user
+        return user_response(updated_user)
     except HTTPException:
         raise
     except Exception as e:
@@ -79,7 +148,8 @@ async def update_se_user_endpoint(uid: str, user_data: SEUserUpdate):
 @router.delete("/users/{uid}")
 async def delete_se_user_endpoint(uid: str):
     try:
-        success = delete_se_user(uid)
+        success = await delete_se_user_async(uid)
+        user_etags.invalidate(uid)
         if not success:
             raise HTTPException(status_code=404, detail="SE User not found")
         return {"message": f"SE User {uid} successfully deleted"}
@@ -92,11 +162,14 @@ async def delete_se_user_endpoint(uid: str):
 @router.get("/fetch_usage_summary/{uid}")
 async def fetch_usage_summary_endpoint(uid: str):
     try:
-        usage_summary = fetch_usage_summary(uid)
-        return {
+        usage_summary = await fetch_usage_summary_async(uid)
+        # Returned as a response so the datetimes skip jsonable_encoder
+        return FastJSONResponse({
             "status": "success",
             "usage_summary": usage_summary
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in fetch_usage_summary endpoint: {str(e)}")
         raise HTTPException(
@@ -104,6 +177,10 @@ async def fetch_usage_summary_endpoint(uid: str):
             detail=f"Failed to fetch usage summary: {str(e)}"
         )
 
+async def _charge_paraphrase(text_content: str, prefix: PromptPrefix):
+    """Charge the Gemini calls beyond the first (one per uncached sentence of a chunked text) to the caller's rate limit."""
+    await charge_admitted_request(paraphrase_call_count(text_content, prefix) - 1)
+
 @router.post("/outgoing_paraphrase")
 async def outgoing_paraphrase_endpoint(request: ParaphraseRequest):
     """
@@ -116,7 +193,10 @@ async def outgoing_paraphrase_endpoint(request: ParaphraseRequest):
         dict: Response containing the paraphrased text or error message
     """
     try:
-        result = get_outgoing_paraphrase(request.text_content)
+        await _charge_paraphrase(request.text_content, OUTGOING_PARAPHRASE_PREFIX)
+        result = await paraphrases.do(
+            ("outgoing", request.text_content), run_gemini, get_outgoing_paraphrase, request.text_content
+        )
         if result is None:
             raise HTTPException(
                 status_code=500,
@@ -126,6 +206,8 @@ async def outgoing_paraphrase_endpoint(request: ParaphraseRequest):
             "status": "success",
             "paraphrase": result
         }
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=422, detail=str(ve))
     except Exception as e:
@@ -144,7 +226,10 @@ async def incoming_paraphrase_endpoint(request: ParaphraseRequest):
         dict: Response containing the paraphrased text or error message
     """
     try:
-        result = get_incoming_paraphrase(request.text_content)
+        await _charge_paraphrase(request.text_content, INCOMING_PARAPHRASE_PREFIX)
+        result = await paraphrases.do(
+            ("incoming", request.text_content), run_gemini, get_incoming_paraphrase, request.text_content
+        )
         if result is None:
             raise HTTPException(
                 status_code=500,
@@ -154,30 +239,135 @@ async def incoming_paraphrase_endpoint(request: ParaphraseRequest):
             "status": "success",
             "paraphrase": result
         }
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=422, detail=str(ve))
     except Exception as e:
         logger.error(f"Error in incoming_paraphrase endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _text_log_etag(uid: str, key: tuple, session_id: Optional[str], text_type: Optional[str],
+                         read_after: Optional[str], limit: Optional[int]) -> Optional[str]:
+    """ETag of a text-log listing from its high-water mark, cached; None if Postgres is unavailable."""
+    stamp = text_log_etags.stamp(uid)
+    mark = await run_postgres(get_text_log_high_water_mark, uid, session_id, text_type, read_after, limit)
+    if mark is None:
+        return None
+    etag = make_etag("text_logs", uid, key, *mark)
+    text_log_etags.set(uid, key, etag, stamp)
+    return etag
+
+async def _warm_text_log_etag(*args):
+    """Cache a listing's ETag after an unconditional response, so the client's next poll gets one."""
+    try:
+        await _text_log_etag(*args)
+    except Exception as e:
+        logger.warning(f"Could not compute text log ETag: {str(e)}")
+
+async def _proxy_text_logs_conditionally(request: Request, url: str, uid: str, key: tuple, session_id: Optional[str] = None,
+                                         text_type: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Proxy a text-log listing with an ETag from its high-water mark (latest
+    timestamp and row count; of the newest ``limit`` rows for the latest
+    view). A matching If-None-Match gets a 304 without fetching the listing;
+    when the ETag is cached, without querying Postgres. Requests without
+    If-None-Match never wait for the high-water mark: they get the cached
+    ETag, or it is computed after the response for their next poll.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    etag = text_log_etags.get(uid, key)
+    if etag is not None and etag_matches(if_none_match, etag):
+        CONDITIONAL_REQUESTS.inc("text_logs", "cached_304")
+        return not_modified(etag)
+
+    mark_args = (uid, key, session_id, text_type, request.headers.get(READ_AFTER_HEADER), limit)
+    if etag is None and if_none_match:
+        etag = await _text_log_etag(*mark_args)
+    if etag_matches(if_none_match, etag):
+        CONDITIONAL_REQUESTS.inc("text_logs", "checked_304")
+        return not_modified(etag)
+    if if_none_match:
+        CONDITIONAL_REQUESTS.inc("text_logs", "modified")
+
+    response = await proxy_request(request, url, TEXT_LOG_SERVER_HEADERS)
+    if response.status_code == 200:
+        if etag is not None:
+            response.headers["ETag"] = etag
+        else:
+            # After the upstream connection is closed
+            response.background = BackgroundTasks([response.background, BackgroundTask(_warm_text_log_etag, *mark_args)])
+    return response
+
+def _stored_timestamp(result: Any) -> Optional[datetime]:
+    """The row's timestamp as stored by the text-log server, if its reply reports it."""
+    try:
+        return datetime.fromisoformat(result["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _remember_text_log(uid: str, session_id: str, text_log: Optional[TextLogRequest], stored_at: Optional[datetime]) -> str:
+    """
+    Record a text log the text-log server accepted from this app.
+
+    The row is buffered with the timestamp the server stored, so a later
+    refill from Postgres yields the same row; without one the buffer is
+    dropped and refilled on the next poll.
+
+    Returns the read-after token for the client. The text-log server made
+    the write, so its WAL position is unknown and the token is its time.
+    """
+    note_text_log_write(uid, session_id)
+    token = read_after_token()
+    if text_log is None or stored_at is None:
+        latest_text_logs.forget(uid)  # Row unknown: refill on the next poll
+        return token
+    latest_text_logs.append(uid, {
+        "uid": uid,
+        "session_id": session_id,
+        "timestamp": stored_at,
+        "text_type": text_log.text_type,
+        "text_content": text_log.text_content,
+    })
+    return token
+
+async def _replay(body: bytes):
+    yield body
+
 @router.post("/text_logs/{uid}/{session_id}")
 async def add_text_log_endpoint(request: Request, uid: str, session_id: str):
     """
     Proxy text log creation to another server.
+    
+    A successful response carries an X-Read-After token; sending it back on
+    the session's reads makes them see this write.
     """
     try:
-        body = await request.body()
-        headers = dict(request.headers)
-        headers["X-Internal-Token"] = "my-shared-secret"  # optional security
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"http://35.192.165.158:8020/apps/se/text_logs/{uid}/{session_id}",
-                content=body,
-                headers=headers
-            )
-
-        return JSONResponse(status_code=response.status_code, content=response.json())
+        body = await request.body()  # Kept by Starlette; the proxy still streams it
+        try:
+            text_log = TextLogRequest.model_validate_json(body)
+        except ValueError:
+            text_log = None
+        url = f"{TEXT_LOG_SERVER_URL}/apps/se/text_logs/{uid}/{session_id}"
+        response = await proxy_request(request, url, TEXT_LOG_SERVER_HEADERS)
+        text_log_etags.invalidate(uid)
+        if response.status_code < 400:
+            stored_at = None
+            if text_log is not None and "content-encoding" not in response.headers:
+                # The reply is a few bytes; read it for the stored timestamp
+                # before answering, so the next poll already sees the row
+                try:
+                    reply = b"".join([chunk async for chunk in response.body_iterator])
+                except Exception:
+                    await response.background()  # Release the upstream connection
+                    raise
+                response.body_iterator = _replay(reply)
+                try:
+                    stored_at = _stored_timestamp(json.loads(reply))
+                except ValueError:
+                    pass
+            response.headers[READ_AFTER_HEADER] = _remember_text_log(uid, session_id, text_log, stored_at)
+        return response
     except Exception as e:
         logger.error(f"Error in add_text_log endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -188,34 +378,61 @@ async def get_session_text_logs_endpoint(request: Request, uid: str, session_id:
     Proxy text log retrieval to another server.
     """
     try:
-        headers = dict(request.headers)
-        headers["X-Internal-Token"] = "my-shared-secret"  # optional security
-
-        async with httpx.AsyncClient() as client:
-            url = f"http://35.192.165.158:8020/apps/se/text_logs/{uid}/{session_id}"
-            if text_type:
-                url += f"?text_type={text_type}"
-            response = await client.get(url, headers=headers)
-
-        return JSONResponse(status_code=response.status_code, content=response.json())
+        url = f"{TEXT_LOG_SERVER_URL}/apps/se/text_logs/{uid}/{session_id}"
+        if text_type:
+            url += f"?text_type={text_type}"
+        key = ("session", session_id, text_type)
+        return await _proxy_text_logs_conditionally(request, url, uid, key, session_id, text_type)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in get_session_text_logs endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _fill_latest_text_logs(uid: str) -> Optional[List[Dict[str, Any]]]:
+    """Read a user's newest rows into the buffer; None if the database is unavailable."""
+    latest_text_logs.begin_fill(uid)
+    try:
+        # No read-after token: the fill is shared by concurrent pollers, so
+        # it reads without one (the primary, unless this process saw the writes)
+        rows = await run_postgres(fetch_latest_text_logs, uid, latest_text_logs.capacity)
+    except Exception as e:
+        latest_text_logs.cancel_fill(uid)
+        logger.warning(f"Filling latest text logs for {uid} failed, proxying: {str(e)}")
+        return None
+    latest_text_logs.fill(uid, rows)
+    return rows
+
 @router.get("/latest_text_logs/{uid}")
 async def get_latest_text_logs_endpoint(request: Request, uid: str, limit: int = 10):
     """
-    Proxy latest text log retrieval to another server.
+    Latest text logs of a user, newest first.
+    
+    Served from the in-memory buffer (filled from Postgres on first poll) when
+    ``limit`` fits in it; otherwise, or when Postgres is unavailable, proxied
+    to the text-log server.
     """
     try:
-        headers = dict(request.headers)
-        headers["X-Internal-Token"] = "my-shared-secret"  # optional security
-
-        async with httpx.AsyncClient() as client:
-            url = f"http://35.192.165.158:8020/apps/se/latest_text_logs/{uid}?limit={limit}"
-            response = await client.get(url, headers=headers)
-
-        return JSONResponse(status_code=response.status_code, content=response.json())
+        source = "memory"
+        rows = latest_text_logs.get(uid, limit)
+        if rows is None and 0 < limit <= latest_text_logs.capacity:
+            source = "database"
+            rows = await latest_text_log_fills.do(uid, _fill_latest_text_logs, uid)
+            if rows is not None:
+                rows = rows[:limit]
+        if rows is None:
+            LATEST_TEXT_LOG_READS.inc("proxy")
+            url = f"{TEXT_LOG_SERVER_URL}/apps/se/latest_text_logs/{uid}?limit={limit}"
+            return await _proxy_text_logs_conditionally(request, url, uid, ("latest", limit), limit=limit)
+        LATEST_TEXT_LOG_READS.inc(source)
+        # Rows are only appended, so the newest timestamp and count identify the listing
+        etag = make_etag("latest_text_logs", uid, limit, rows[0]["timestamp"] if rows else None, len(rows))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            CONDITIONAL_REQUESTS.inc("text_logs", "cached_304")
+            return not_modified(etag)
+        return json_bytes_response(dump_text_log_rows(rows), {"ETag": etag})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in get_latest_text_logs endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -223,8 +440,10 @@ async def get_latest_text_logs_endpoint(request: Request, uid: str, limit: int =
 @router.post("/initialize_session/{uid}/{session_id}")
 async def initialize_session_endpoint(uid: str, session_id: str):
     try:
-        result = initialize_session(uid, session_id)
+        result = await run_reasoning_engine(initialize_session, uid, session_id)
         return {"status": "success", "message": result or "Session initialized successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error initializing session: {e}")
         raise HTTPException(status_code=500, detail=f"Error initializing session: {e}")
@@ -232,8 +451,175 @@ async def initialize_session_endpoint(uid: str, session_id: str):
 @router.post("/run_agent/{uid}/{session_id}")
 async def run_agent_endpoint(uid: str, session_id: str, request: RunAgentRequest):
     try:
-        result = run_agent(request.question, uid, session_id)
+        result = await run_reasoning_engine(run_agent, request.question, uid, session_id)
         return {"status": "success", "agent_response": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error communicating with the agent server: {e}")
-        raise HTTPException(status_code=500, detail=f"Error communicating with the agent server: {e}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error communicating with the agent server: {e}") 
+
+@router.post("/run_agent_stream/{uid}/{session_id}")
+async def run_agent_stream_endpoint(uid: str, session_id: str, request: RunAgentRequest):
+    """Stream the agent's typed events (text, tool_call, tool_result, usage, error) as SSE."""
+    events = stream_agent(request.question, uid, session_id)
+
+    async def sse():
+        try:
+            while True:
+                # Each blocking read of the upstream stream runs on the agent bulkhead
+                record = await run_reasoning_engine(next, events, None)
+                if record is None:
+                    break
+                yield f"data: {json.dumps(event_to_dict(record))}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming from the agent server: {e}")
+            error = AgentError("stream_failed", str(getattr(e, "detail", e)))
+            yield f"data: {json.dumps(event_to_dict(error))}\n\n"
+        finally:
+            try:
+                events.close()
+            except ValueError:
+                # Still executing on a worker thread (client went away mid-read)
+                pass
+
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+def _live_handlers(uid: str, session_id: str) -> Dict[str, Handler]:
+    """Operations available on a live session, mirroring the REST endpoints."""
+
+    def paraphrase(stream, prefix):
+        async def handler(message):
+            request = ParaphraseRequest.model_validate(message)
+            await _charge_paraphrase(request.text_content, prefix)
+            pieces = []
+            async for piece in iterate_blocking(run_gemini, stream(request.text_content)):
+                pieces.append(piece)
+                yield "chunk", {"text": piece}
+            yield "result", {"status": "success", "paraphrase": "".join(pieces).strip()}
+        return handler
+
+    async def text_log(message):
+        request = TextLogRequest.model_validate(message)
+        url = f"{TEXT_LOG_SERVER_URL}/apps/se/text_logs/{uid}/{session_id}"
+        response = await post_json(url, request.model_dump(), TEXT_LOG_SERVER_HEADERS)
+        text_log_etags.invalidate(uid)
+        if response.status_code >= 400:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+        result = response.json()
+        token = _remember_text_log(uid, session_id, request, _stored_timestamp(result))
+        if isinstance(result, dict):
+            result["read_after"] = token
+        yield "result", result
+
+    async def agent(message):
+        request = RunAgentRequest.model_validate(message)
+        texts = []
+        async for record in iterate_blocking(run_reasoning_engine, stream_agent(request.question, uid, session_id)):
+            if isinstance(record, TextDelta):
+                texts.append(record.text)
+            yield "event", event_to_dict(record)
+        yield "result", {"status": "success", "agent_response": texts}
+
+    return {
+        "outgoing_paraphrase": paraphrase(stream_outgoing_paraphrase, OUTGOING_PARAPHRASE_PREFIX),
+        "incoming_paraphrase": paraphrase(stream_incoming_paraphrase, INCOMING_PARAPHRASE_PREFIX),
+        "text_log": text_log,
+        "run_agent": agent,
+    }
+
+# Live operation type -> the REST route whose admission policy it shares
+LIVE_ROUTES = {
+    "outgoing_paraphrase": "/apps/se/outgoing_paraphrase",
+    "incoming_paraphrase": "/apps/se/incoming_paraphrase",
+    "text_log": "/apps/se/text_logs/{uid}/{session_id}",
+    "run_agent": "/apps/se/run_agent_stream/{uid}/{session_id}",
+}
+
+def _live_policies(uid: str, client_host: str) -> Dict[str, Tuple[str, int, str]]:
+    """Route class, priority and rate-limit key per operation, keyed like the REST request (uid, else client address)."""
+    policies = {}
+    for message_type, route in LIVE_ROUTES.items():
+        route_class, priority = get_route_policy(route)
+        policies[message_type] = (route_class, priority, uid if "{uid}" in route else client_host)
+    return policies
+
+@router.websocket("/live/{uid}/{session_id}")
+async def live_session_endpoint(websocket: WebSocket, uid: str, session_id: str):
+    """
+    Live conversation session: paraphrases, text-log writes and agent
+    questions as typed JSON messages over one WebSocket (see LiveConnection).
+    Paraphrase pieces and agent events are streamed back as they arrive.
+    Each operation is admitted like the matching REST request.
+    """
+    await websocket.accept()
+    client_host = websocket.client.host if websocket.client else "anonymous"
+    await LiveConnection(
+        websocket,
+        _live_handlers(uid, session_id),
+        admission=getattr(websocket.app.state, "admission", None),
+        policies=_live_policies(uid, client_host),
+    ).run()
+
+# Export streams being closed after their client went away
+_closing_exports: set = set()
+
+def _close_export_stream(stream, in_flight: Optional[asyncio.Future] = None):
+    """
+    Close an export stream on the Postgres bulkhead, once the batch in
+    flight (if any) is done, ending its cursor transaction and returning
+    the connection to the pool.
+    """
+    async def close():
+        if in_flight is not None:
+            await asyncio.wait([in_flight])
+            if not in_flight.cancelled():
+                in_flight.exception()  # Nobody else will retrieve it
+        try:
+            await run_postgres(stream.close)
+        except Exception as e:
+            logger.warning(f"Closing text log export failed: {str(e)}")
+
+    task = asyncio.ensure_future(close())
+    _closing_exports.add(task)
+    task.add_done_callback(_closing_exports.discard)
+
+@router.get("/export/text_logs")
+async def export_text_logs_endpoint(request: Request, since: Optional[datetime] = None, until: Optional[datetime] = None, batch_size: int = 10000):
+    """
+    Stream text logs after ``since`` (the client's watermark) as a
+    zstd-compressed Arrow IPC stream, one record batch per ``batch_size``
+    rows (at most SE_EXPORT_BATCH_SIZE).
+
+    The stream stops at ``until`` capped by the export safety lag; the cap
+    is returned in X-Export-Until and is the client's next watermark.
+
+    Requires the X-Export-Token header to match SE_EXPORT_TOKEN.
+    """
+    if not EXPORT_TOKEN or not hmac.compare_digest(request.headers.get("x-export-token", ""), EXPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Export is not allowed")
+    # Query values may carry an offset; the column is naive UTC
+    since, until = naive_utc(since), export_cap(until)
+    batch_size = max(1, min(batch_size, DEFAULT_BATCH_SIZE))
+    try:
+        stream = arrow_ipc_stream(complete_batches(fetch_text_log_batches(since, until, batch_size)))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    async def body():
+        in_flight = None
+        try:
+            while True:
+                # Each fetch and encode of a batch runs on the Postgres bulkhead
+                in_flight = asyncio.ensure_future(run_postgres(next, stream, None))
+                chunk = await asyncio.shield(in_flight)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # The client may have gone away mid-batch, with the stream still
+            # executing on a worker thread
+            _close_export_stream(stream, in_flight if in_flight is not None and not in_flight.done() else None)
+
+    return StreamingResponse(body(), media_type="application/vnd.apache.arrow.stream",
+                             headers={"X-Export-Until": until.isoformat()})
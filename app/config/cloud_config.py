@@ -1,10 +1,13 @@
 import os
 import json
 import logging
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud import secretmanager
-from google.oauth2 import service_account
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from app.services.se_metrics import time_upstream
+
+# The Google SDKs below are imported inside the functions that use them:
+# together they add several hundred milliseconds to a cold start.
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -13,6 +16,52 @@ logger = logging.getLogger(__name__)
 # GCP Project Configuration
 GCP_PROJECT_ID = "gcpxmlb25"
 
+class LazySingleton:
+    """
+    Thread-safe, lazily built value.
+
+    The factory runs on first access only; concurrent callers block on the
+    same lock and share the result. A failed build is not cached, so the
+    next caller retries. Every instance is reset in forked children (see
+    _reset_singletons_after_fork), since clients holding gRPC channels or
+    threads are not usable across fork.
+    """
+
+    _instances: "weakref.WeakSet[LazySingleton]" = weakref.WeakSet()
+
+    def __init__(self, factory, name: str):
+        self._factory = factory
+        self._name = name
+        self._lock = threading.Lock()
+        self._value = None
+        self._ready = False
+        LazySingleton._instances.add(self)
+
+    def get(self):
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                logger.info(f"Initializing {self._name}")
+                self._value = self._factory()
+                self._ready = True
+        return self._value
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def reset(self):
+        """Drop the cached value so the next access rebuilds it."""
+        self._lock = threading.Lock()
+        self._value = None
+        self._ready = False
+
+def _reset_singletons_after_fork():
+    for singleton in list(LazySingleton._instances):
+        singleton.reset()
+
+os.register_at_fork(after_in_child=_reset_singletons_after_fork)
+
 # Step 1: Initialize service account credentials
 def initialize_service_account():
     """
@@ -31,6 +80,8 @@ def initialize_service_account():
     if not credentials_path:
         raise ValueError("GOOGLE_APPLICATION_CREDENTIALS environment variable is not set for local environment")
     
+    from google.oauth2 import service_account
+
     try:
         # Read and log the service account info
         with open(credentials_path, 'r') as f:
@@ -43,19 +94,46 @@ def initialize_service_account():
         logger.error(f"Failed to initialize service account: {str(e)}")
         raise RuntimeError(f"Failed to initialize service account: {str(e)}")
 
-# Initialize service account credentials
-service_account_creds = initialize_service_account()
+_service_account_creds = LazySingleton(initialize_service_account, "service account credentials")
+
+def get_service_account_creds():
+    """Get the service account credentials, loading them on first use."""
+    return _service_account_creds.get()
 
 # Step 2: Set up Secret Manager client
-def get_secret_manager_client():
+def _build_secret_manager_client(transport: str = None):
     """
-    Get a Secret Manager client using the service account credentials.
+    Build a Secret Manager client using the service account credentials.
     """
+    from google.cloud import secretmanager
+
+    service_account_creds = get_service_account_creds()
     if service_account_creds:
-        return secretmanager.SecretManagerServiceClient(credentials=service_account_creds)
-    return secretmanager.SecretManagerServiceClient()  # Use default credentials in Cloud Run
+        return secretmanager.SecretManagerServiceClient(credentials=service_account_creds, transport=transport)
+    return secretmanager.SecretManagerServiceClient(transport=transport)  # Use default credentials in Cloud Run
 
-secret_client = get_secret_manager_client()
+_secret_client = LazySingleton(_build_secret_manager_client, "Secret Manager client")
+
+def get_secret_manager_client():
+    """
+    Get the shared Secret Manager client, creating it on first use.
+    """
+    return _secret_client.get()
+
+# Secrets fetched once by the serving supervisor before it forks workers
+# (see preload_secrets); rotating one of these needs a restart
+PRELOAD_SECRET_IDS = ("gemini-api-key", "psql_password", "firebase-auth-credentials", "firestore-credentials")
+_preloaded_secrets = {}
+
+def _access_secret(client, secret_id):
+    name = f"projects/{GCP_PROJECT_ID}/secrets/{secret_id}/versions/latest"
+    try:
+        with time_upstream("secret_manager", "access_secret_version"):
+            response = client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+    except Exception as e:
+        logger.error(f"Failed to access secret {secret_id} in project {GCP_PROJECT_ID}: {str(e)}")
+        raise RuntimeError(f"Failed to access secret {secret_id}: {str(e)}")
 
 def get_secret(secret_id):
     """
@@ -67,13 +145,31 @@ def get_secret(secret_id):
     Returns:
         str: The secret value
     """
-    name = f"projects/{GCP_PROJECT_ID}/secrets/{secret_id}/versions/latest"
+    preloaded = _preloaded_secrets.get(secret_id)
+    if preloaded is not None:
+        return preloaded
+    return _access_secret(get_secret_manager_client(), secret_id)
+
+def preload_secrets(secret_ids=PRELOAD_SECRET_IDS):
+    """
+    Fetch secrets once, before forking worker processes, so workers start
+    without Secret Manager round trips.
+
+    Uses a throwaway REST client: a gRPC channel opened before fork is not
+    safe to use in the children.
+
+    Args:
+        secret_ids: IDs of the secrets to fetch
+
+    Raises:
+        RuntimeError: If a secret cannot be fetched
+    """
+    client = _build_secret_manager_client(transport="rest")
     try:
-        response = secret_client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
-    except Exception as e:
-        logger.error(f"Failed to access secret {secret_id} in project {GCP_PROJECT_ID}: {str(e)}")
-        raise RuntimeError(f"Failed to access secret {secret_id}: {str(e)}")
+        for secret_id in secret_ids:
+            _preloaded_secrets[secret_id] = _access_secret(client, secret_id)
+    finally:
+        client.transport.close()
 
 # Step 3: Set up Firebase and other services
 # Firebase Configuration
@@ -82,34 +178,93 @@ FIRESTORE_DATABASE_NAME = "lingoforge"
 def initialize_firebase_apps():
     """
     Initialize Firebase Auth and Firestore using credentials from Secret Manager.
+    Both secrets are fetched concurrently.
     """
+    import firebase_admin
+    from firebase_admin import credentials
+
     try:
-        # Initialize Firebase Auth
-        if not firebase_admin._apps:
-            auth_cred_json = get_secret("firebase-auth-credentials")
-            auth_cred = credentials.Certificate(json.loads(auth_cred_json))
-            firebase_admin.initialize_app(auth_cred, name='auth')
-        
-        # Initialize Firestore
-        firestore_cred_json = get_secret("firestore-credentials")
-        db_cred = credentials.Certificate(json.loads(firestore_cred_json))
-        return firebase_admin.initialize_app(db_cred, name='db')
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="firebase-init") as pool:
+            auth_future = pool.submit(get_secret, "firebase-auth-credentials") if not firebase_admin._apps else None
+            firestore_future = pool.submit(get_secret, "firestore-credentials")
+
+            # Initialize Firebase Auth
+            if auth_future is not None:
+                auth_cred = credentials.Certificate(json.loads(auth_future.result()))
+                firebase_admin.initialize_app(auth_cred, name='auth')
+
+            # Initialize Firestore
+            db_cred = credentials.Certificate(json.loads(firestore_future.result()))
+            return firebase_admin.initialize_app(db_cred, name='db')
     except Exception as e:
         raise RuntimeError(f"Failed to initialize Firebase apps: {str(e)}")
 
-# Initialize Firebase apps
-db_app = initialize_firebase_apps()
+_db_app = LazySingleton(initialize_firebase_apps, "Firebase apps")
+
+def get_db_app():
+    """Get the Firestore Firebase app, initializing Firebase on first use."""
+    return _db_app.get()
 
 def get_firestore_client():
     """
     Get a Firestore client with the configured database name.
     
+    firebase_admin builds it once per app and database and returns the same
+    client afterwards.
+    
     Returns:
         firestore.Client: A Firestore client instance
     """
-    db = firestore.client(app=db_app)
-    db._database = FIRESTORE_DATABASE_NAME
-    return db
+    from firebase_admin import firestore
+
+    return firestore.client(app=get_db_app(), database_id=FIRESTORE_DATABASE_NAME)
+
+def _build_async_firestore_client():
+    from google.cloud import firestore
+
+    app = get_db_app()
+    return firestore.AsyncClient(
+        project=app.project_id,
+        credentials=app.credential.get_credential(),
+        database=FIRESTORE_DATABASE_NAME,
+    )
+
+# One per process: its gRPC channel is opened on first use, on the event loop
+# of the worker serving requests, and dropped in forked children
+_async_firestore_client = LazySingleton(_build_async_firestore_client, "async Firestore client")
+
+def get_async_firestore_client():
+    """
+    Get the async Firestore client bound to the configured database.
+    
+    The first call initializes Firebase and blocks; async code should make
+    it off the event loop (see async_firestore_client_ready).
+    
+    Returns:
+        firestore.AsyncClient: The shared async client
+    """
+    return _async_firestore_client.get()
+
+def async_firestore_client_ready() -> bool:
+    """True once get_async_firestore_client() returns without blocking."""
+    return _async_firestore_client.is_ready()
+
+def warm_up():
+    """
+    Build the Secret Manager client, Firebase apps and the async Firestore
+    client concurrently.
+
+    Called from the FastAPI lifespan in the background so startup does not
+    wait on network calls. Failures are logged and retried on first use.
+    """
+    def _warm(singleton):
+        try:
+            singleton.get()
+        except Exception as e:
+            logger.warning(f"Warm-up of {singleton._name} failed, will retry on first use: {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="warm-up") as pool:
+        list(pool.map(_warm, [_secret_client, _db_app, _async_firestore_client]))
 
 # API Keys and other secrets
 def get_gemini_api_key():
@@ -134,5 +289,33 @@ def get_psql_connection_string():
     Returns:
         str: PostgreSQL connection string
     """
+    dsn = os.getenv("SE_PSQL_DSN")
+    if dsn:
+        return dsn
     password = get_psql_password()
-    return f"postgresql://{PSQL_USER}:{password}@{PSQL_HOST}:{PSQL_PORT}/{PSQL_DB}" 
\ No newline at end of file
+    return f"postgresql://{PSQL_USER}:{password}@{PSQL_HOST}:{PSQL_PORT}/{PSQL_DB}"
+
+def get_psql_replica_connection_strings():
+    """
+    Get connection strings for the PostgreSQL read replicas.
+    
+    SE_PSQL_REPLICA_DSNS takes full, comma-separated connection strings
+    (e.g. two local instances); otherwise SE_PSQL_REPLICA_HOSTS lists
+    host[:port] entries that share the primary's user, password and database.
+    
+    Returns:
+        List[str]: Replica connection strings, empty when none are configured
+    """
+    dsns = os.getenv("SE_PSQL_REPLICA_DSNS")
+    if dsns:
+        return [dsn.strip() for dsn in dsns.split(",") if dsn.strip()]
+    hosts = [host.strip() for host in os.getenv("SE_PSQL_REPLICA_HOSTS", "").split(",") if host.strip()]
+    if not hosts:
+        return []
+    password = get_psql_password()
+    strings = []
+    for host in hosts:
+        name, _, port = host.partition(":")
+        strings.append(f"postgresql://{PSQL_USER}:{password}@{name}:{port or PSQL_PORT}/{PSQL_DB}")
+    return strings
+
@@ -0,0 +1,147 @@
+import os
+import json
+import atexit
+import queue
+import random
+import logging
+import logging.handlers
+from typing import Optional
+
+# Log files live in <project root>/logs
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs")
+APP_LOG_FILE = os.path.join(LOG_DIR, "app.log")
+PSQL_LOG_FILE = os.path.join(LOG_DIR, "se_psql.log")
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Access log settings
+ACCESS_LOGGER_NAME = "app.access"
+# Fraction of successful, fast requests to log (errors and slow requests are always logged)
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("SE_ACCESS_LOG_SAMPLE_RATE", "1.0"))
+# Requests at or above this duration are always logged
+SLOW_REQUEST_MS = float(os.getenv("SE_SLOW_REQUEST_MS", "1000"))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Format access records as one JSON object per line and everything else
+    with the regular text format.
+
+    Runs on the background writer thread, so JSON encoding stays off the
+    request path.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "access", None)
+        if fields is None:
+            return super().format(record)
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+        }
+        entry.update(fields)
+        return json.dumps(entry, default=str)
+
+def setup_logging(level: int = logging.INFO) -> str:
+    """
+    Route all logging through a queue drained by a background writer thread.
+
+    The root logger gets a single QueueHandler; the file and console handlers
+    run on the QueueListener thread, so disk I/O never happens on the request
+    path. Safe to call more than once.
+
+    Args:
+        level (int): Root log level
+
+    Returns:
+        str: Path of the application log file
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return APP_LOG_FILE
+
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+
+    formatter = StructuredFormatter(LOG_FORMAT)
+
+    file_handler = logging.FileHandler(APP_LOG_FILE)
+    console_handler = logging.StreamHandler()
+
+    # PostgreSQL operations also get their own file, as before
+    psql_file_handler = logging.FileHandler(PSQL_LOG_FILE)
+    psql_file_handler.addFilter(logging.Filter("se_psql"))
+
+    for handler in (file_handler, console_handler, psql_file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, psql_file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    return APP_LOG_FILE
+
+def _restart_writer_after_fork():
+    """
+    The writer thread does not survive fork (app/serve.py workers), so a
+    child gets its own queue and writer over the same handlers.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    _queue_handler.queue = log_queue
+
+os.register_at_fork(after_in_child=_restart_writer_after_fork)
+
+def stop_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def should_log_access(status_code: int, duration_ms: float, sample_rate: float = None) -> bool:
+    """
+    Decide whether a request gets an access log line.
+
+    Errors (status >= 400) and slow requests are always logged; everything
+    else is sampled at ``sample_rate``.
+    """
+    if status_code >= 400 or duration_ms >= SLOW_REQUEST_MS:
+        return True
+    rate = ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    return rate >= 1.0 or random.random() < rate
+
+def log_access(logger: logging.Logger, method: str, path: str, status_code: int, duration_ms: float, **fields):
+    """
+    Emit a structured access log record, subject to sampling.
+
+    Only a dict is built here; JSON encoding happens on the writer thread.
+    """
+    if not should_log_access(status_code, duration_ms):
+        return
+    access = {
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration_ms, 3),
+        "slow": duration_ms >= SLOW_REQUEST_MS,
+    }
+    access.update(fields)
+    level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+    logger.log(level, "access", extra={"access": access})
@@ -1,29 +1,51 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
 import logging
 from typing import Dict, List
 from datetime import datetime
 # from app.config.cloud_config import get_firestore_client
+from app.config.logging_config import ACCESS_LOGGER_NAME, setup_logging, log_access
+from app.services.se_metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, render_metrics
+from app.services.se_timing import start_request_timing, end_request_timing, summarize_spans, server_timing_header
 
-# Set up logging
-log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-log_file = os.path.join(log_dir, "app.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+# Set up logging (queue-based: file and console writes happen on a background thread)
+log_file = setup_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
 logger.info(f"Log file location: {log_file}")
 
-app = FastAPI(title="SpeakEase", description="A language translation API using FastAPI and Gemini")
+# Imported after logging is configured so cloud_config's basicConfig is a no-op
+from app.config.cloud_config import warm_up
+from app.services.se_executor import shutdown_bulkheads
+from app.services.se_proxy import close_proxy_client
+from app.services.se_serialization import FastJSONResponse
+from app.services.se_admission import build_admission_controller, end_admitted_request, get_route_policy, start_admitted_request
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm Secret Manager and Firebase in the background so the server can
+    # accept requests immediately; routes that need them block on first use.
+    warm_up_task = None
+    if os.getenv("SE_SKIP_WARMUP") != "1":
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    shutdown_bulkheads()
+    await close_proxy_client()
+
+app = FastAPI(
+    title="SpeakEase",
+    description="A language translation API using FastAPI and Gemini",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -32,23 +54,84 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Read-After"],
 )
 
+def match_route(request: Request):
+    """
+    Resolve the route template (e.g. /apps/se/users/{uid}) and path params
+    for a request before routing. Cached on the ASGI scope so every
+    middleware shares one lookup.
+    """
+    matched = request.scope.get("se.route")
+    if matched is None:
+        matched = ("unmatched", {})
+        for route in app.router.routes:
+            match, child_scope = route.matches(request.scope)
+            if match == Match.FULL:
+                matched = (route.path, child_scope.get("path_params", {}))
+                break
+        request.scope["se.route"] = matched
+    return matched
+
+def route_template(request: Request) -> str:
+    """Route template for a request, keeping metric label cardinality bounded."""
+    return match_route(request)[0]
+
+# Per-user rate limits and priority load shedding
+admission = build_admission_controller()
+# Live WebSocket sessions admit each operation through the same controller
+app.state.admission = admission
+
+# Add admission control middleware (inside the logging middleware, so rejections are logged)
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    if request.method == "OPTIONS":
+        return await call_next(request)
+
+    route, path_params = match_route(request)
+    route_class, priority = get_route_policy(route)
+    # Limit per uid; routes without one fall back to the client address, which
+    # uvicorn takes from X-Forwarded-For when the peer is a trusted proxy
+    # (SE_FORWARDED_ALLOW_IPS in app.serve). Never a client-chosen header.
+    client_key = path_params.get("uid") or (request.client.host if request.client else "anonymous")
+    rejection = await admission.admit(route_class, priority, client_key)
+    if rejection is not None:
+        status_code, retry_after, reason = rejection
+        detail = "Too many requests" if reason == "rate_limited" else "Server busy, please retry"
+        return JSONResponse(status_code=status_code, content={"detail": detail}, headers={"Retry-After": str(retry_after)})
+
+    admission.started()
+    admitted = start_admitted_request(admission, route_class, client_key)
+    try:
+        return await call_next(request)
+    finally:
+        end_admitted_request(admitted)
+        admission.finished()
+
 # Add logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = datetime.now()
-    response = await call_next(request)
-    duration = datetime.now() - start_time
-    
-    # Log the request details
-    logger.info(
-        f"API Call - Method: {request.method}, "
-        f"Path: {request.url.path}, "
-        f"Status: {response.status_code}, "
-        f"Duration: {duration.total_seconds():.3f}s"
-    )
-    
+    start_time = time.perf_counter()
+    route = route_template(request)
+    status_code = 500
+    HTTP_REQUESTS_IN_FLIGHT.inc(request.method, route)
+    # Collect per-upstream spans (Secret Manager, token refresh, Gemini, Firestore, Postgres)
+    timing_token = start_request_timing()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        timings = summarize_spans(end_request_timing(timing_token))
+        elapsed = time.perf_counter() - start_time
+        HTTP_REQUESTS_IN_FLIGHT.dec(request.method, route)
+        HTTP_REQUEST_DURATION.observe(request.method, route, status_code, value=elapsed)
+
+        # Structured, sampled access log; errors and slow requests are always kept
+        # and carry the per-upstream timing breakdown
+        log_access(access_logger, request.method, request.url.path, status_code, elapsed * 1000, route=route, timings=timings)
+
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed * 1000)
     return response
 
 # Import and include routers
@@ -63,3 +146,8 @@ app.include_router(se.router, prefix="/apps/se", tags=["se-services"])
 async def root():
     return {"message": "Welcome to SpeakEase API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose request and upstream metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,248 @@
+"""
+Production entry point: a small prefork supervisor around uvicorn.
+
+The supervisor imports the app and the SDKs it otherwise imports lazily
+(PRELOAD_MODULES), and unless SE_SKIP_WARMUP=1 fetches secrets, once; it
+binds the listening socket, then forks worker processes that each run
+uvicorn on the shared socket. Imported modules and preloaded secrets are
+shared copy-on-write; per-process clients, thread pools and
+caches are reset in each child by os.register_at_fork hooks in the modules
+that own them.
+
+On SIGTERM or SIGINT the supervisor forwards SIGTERM to the workers, which
+stop accepting connections and finish in-flight requests for up to
+SE_GRACEFUL_TIMEOUT_SECONDS before the supervisor kills what is left.
+Workers that die unexpectedly are replaced.
+
+Usage:
+    python -m app.serve [--workers N] [--host 0.0.0.0] [--port 8010]
+"""
+import argparse
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("app.serve")
+
+DEFAULT_PORT = int(os.getenv("PORT", "8010"))
+# Cloud Run sends SIGKILL 10 seconds after SIGTERM
+GRACEFUL_TIMEOUT_SECONDS = float(os.getenv("SE_GRACEFUL_TIMEOUT_SECONDS", "8"))
+# Workers that exit within this many seconds of starting count as crashes;
+# restarts of crashing workers are delayed so a broken build does not spin
+MIN_WORKER_UPTIME_SECONDS = 5.0
+RESTART_BACKOFF_SECONDS = 1.0
+# Peers whose X-Forwarded-For is trusted for the client address (rate-limit
+# key of routes without a uid): Cloud Run's front end connects from
+# link-local addresses, Google load balancers from 35.191.0.0/16 and
+# 130.211.0.0/22. uvicorn takes the rightmost address not in this list, so
+# entries a client prepends are ignored. Never "*": uvicorn would then use
+# the leftmost, client-supplied, entry.
+FORWARDED_ALLOW_IPS = os.getenv("SE_FORWARDED_ALLOW_IPS", "127.0.0.1,169.254.0.0/16,35.191.0.0/16,130.211.0.0/22")
+# SDKs the app imports lazily on first use (to keep `import app.main` fast).
+# The supervisor imports them before forking so the workers share them
+# copy-on-write instead of each importing them on its first request.
+PRELOAD_MODULES = (
+    "google.generativeai",
+    "google.cloud.firestore",
+    "google.cloud.secretmanager",
+    "firebase_admin",
+    "firebase_admin.firestore",
+    "google.oauth2.service_account",
+    "google.auth.transport.requests",
+)
+
+def cpu_limit(cgroup_cpu_max: str = "/sys/fs/cgroup/cpu.max") -> int:
+    """
+    CPUs this process may use: the scheduler affinity, capped by a cgroup v2
+    CPU quota when the container runtime sets one.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open(cgroup_cpu_max) as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def worker_count(cpus: Optional[int] = None) -> int:
+    """Workers to run: SE_WEB_CONCURRENCY or WEB_CONCURRENCY if set, else one per CPU."""
+    configured = os.getenv("SE_WEB_CONCURRENCY") or os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return cpu_limit() if cpus is None else max(1, cpus)
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Listening socket shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def preload(app_path: str, load_secrets: bool, modules=PRELOAD_MODULES):
+    """Import the app and the SDKs it loads lazily, and optionally fetch secrets, before forking."""
+    import importlib
+    from uvicorn.importer import import_from_string
+
+    app = import_from_string(app_path)
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Could not preload {module}, workers will import it on first use: {str(e)}")
+    if load_secrets:
+        from app.config.cloud_config import preload_secrets
+        try:
+            preload_secrets()
+        except Exception as e:
+            logger.warning(f"Preloading secrets failed, workers will fetch them on first use: {str(e)}")
+    return app
+
+def worker_config(app, graceful_timeout: float):
+    """uvicorn settings for one worker."""
+    import uvicorn
+
+    return uvicorn.Config(
+        app,
+        log_config=None,
+        access_log=False,
+        timeout_graceful_shutdown=graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        # Not "auto": without the websockets package uvicorn would start and
+        # then refuse every /apps/se/live upgrade; fail at startup instead
+        ws="websockets",
+    )
+
+def run_worker(app, sock: socket.socket, graceful_timeout: float):
+    """Serve on the shared socket until SIGTERM, draining in-flight requests."""
+    import uvicorn
+
+    uvicorn.Server(worker_config(app, graceful_timeout)).run(sockets=[sock])
+
+class Supervisor:
+    """Forks, watches and stops the worker processes."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, graceful_timeout: float = GRACEFUL_TIMEOUT_SECONDS):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._child()
+        self.children[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def _child(self):
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            run_worker(self.app, self.sock, self.graceful_timeout)
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+            code = 1
+        finally:
+            from app.config.logging_config import stop_logging
+            stop_logging()
+            # Skip the supervisor's atexit handlers and stack
+            os._exit(code)
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    def reap(self) -> int:
+        """Collect exited workers and replace them unless stopping."""
+        reaped = 0
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            reaped += 1
+            if self.stopping:
+                continue
+            logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                time.sleep(RESTART_BACKOFF_SECONDS)
+            self.spawn()
+        return reaped
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(f"Serving with {self.workers} workers (supervisor {os.getpid()})")
+        while not self.stopping:
+            self.reap()
+            time.sleep(0.2)
+        return self.shutdown()
+
+    def shutdown(self) -> int:
+        """Ask workers to drain, then kill any still running after the graceful timeout."""
+        logger.info(f"Stopping {len(self.children)} workers")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout + 1
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            logger.warning(f"Worker {pid} did not drain in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        killed = len(self.children)
+        self.children.clear()
+        self.sock.close()
+        return 1 if killed else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--app", default="app.main:app", help="ASGI app as module:attribute")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to one per available CPU")
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT_SECONDS)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or worker_count()
+    # Read at import by modules whose in-process state is per worker (rate limits)
+    os.environ["SE_WORKER_PROCESSES"] = str(workers)
+    app = preload(args.app, load_secrets=os.getenv("SE_SKIP_WARMUP") != "1")
+    sock = bind_socket(args.host, args.port)
+    if workers == 1:
+        run_worker(app, sock, args.graceful_timeout)
+        return 0
+    return Supervisor(app, sock, workers, args.graceful_timeout).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
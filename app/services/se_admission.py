@@ -0,0 +1,281 @@
+import os
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from app.services.se_metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Priorities, lowest first: under load, LOW routes are shed before NORMAL,
+# and NORMAL before HIGH. CRITICAL routes (health check, metrics) are never shed.
+LOW, NORMAL, HIGH, CRITICAL = 0, 1, 2, 3
+
+# Route template -> (route class, priority). The route class selects the rate limit.
+ROUTE_POLICIES: Dict[str, Tuple[str, int]] = {
+    "/": ("health", CRITICAL),
+    "/metrics": ("health", CRITICAL),
+    "/apps/se/outgoing_paraphrase": ("gemini", HIGH),
+    "/apps/se/incoming_paraphrase": ("gemini", HIGH),
+    "/apps/se/run_agent/{uid}/{session_id}": ("agent", HIGH),
+    "/apps/se/run_agent_stream/{uid}/{session_id}": ("agent", HIGH),
+    "/apps/se/initialize_session/{uid}/{session_id}": ("agent", HIGH),
+    "/apps/se/users/{uid}": ("user", NORMAL),
+    "/apps/se/text_logs/{uid}/{session_id}": ("textlog", NORMAL),
+    "/apps/se/latest_text_logs/{uid}": ("textlog_poll", LOW),
+    "/apps/se/fetch_usage_summary/{uid}": ("textlog_poll", LOW),
+    "/apps/se/export/text_logs": ("export", LOW),
+}
+DEFAULT_POLICY = ("default", NORMAL)
+
+# Token bucket per (uid, route class): (refill rate per second, burst size).
+# Override with SE_RATE_LIMIT_<CLASS>="rate:burst"; a rate of 0 disables the limit.
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "health": (0, 0),
+    "gemini": (1.0, 10),
+    "agent": (0.5, 5),
+    "user": (5.0, 20),
+    "textlog": (5.0, 30),
+    "textlog_poll": (2.0, 10),
+    "export": (0.05, 2),
+    "default": (10.0, 50),
+}
+
+# Global in-flight thresholds at which each priority starts being shed
+SHED_THRESHOLDS = {
+    LOW: int(os.getenv("SE_SHED_LOW_AT", "48")),
+    NORMAL: int(os.getenv("SE_SHED_NORMAL_AT", "64")),
+    HIGH: int(os.getenv("SE_SHED_HIGH_AT", "80")),
+}
+SHED_RETRY_AFTER_SECONDS = 1
+
+# Upper bound on buckets kept in memory; least recently used keys are evicted
+MAX_BUCKETS = int(os.getenv("SE_RATE_LIMIT_MAX_KEYS", "10000"))
+
+ADMISSION_REJECTED = Counter(
+    "se_admission_rejected_total",
+    "Requests rejected by admission control, by route class and reason (rate_limited, shed).",
+    ("route_class", "reason"),
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "se_admission_in_flight",
+    "Requests currently admitted and being served.",
+)
+
+def _load_rate_limits() -> Dict[str, Tuple[float, float]]:
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for route_class in limits:
+        override = os.getenv(f"SE_RATE_LIMIT_{route_class.upper()}")
+        if override:
+            rate, burst = override.split(":")
+            limits[route_class] = (float(rate), float(burst))
+    return limits
+
+class InMemoryTokenBucketBackend:
+    """Token buckets kept in this process, with LRU eviction."""
+
+    def __init__(self, max_keys: int = MAX_BUCKETS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float, tokens: float = 1) -> float:
+        return self.take_sync(key, rate, burst, tokens)
+
+    def take_sync(self, key: str, rate: float, burst: float, tokens: float = 1) -> float:
+        """
+        Take ``tokens`` tokens (at most ``burst``), or none.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise seconds until the tokens are available
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= tokens:
+                bucket[0] -= tokens
+                return 0.0
+            return (tokens - bucket[0]) / rate
+
+class RedisTokenBucketBackend:
+    """
+    Token buckets shared by every instance through Redis.
+
+    Optional: requires the ``redis`` package and SE_RATE_LIMIT_REDIS_URL.
+    """
+
+    # KEYS[1] = bucket key; ARGV = rate, burst, now (seconds), tokens
+    _SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[3])
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local take = tonumber(ARGV[4])
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= take then
+  tokens = tokens - take
+else
+  wait = (take - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("SE_RATE_LIMIT_REDIS_URL is set but the redis package is not installed") from e
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, tokens: float = 1) -> float:
+        wait = await self._script(keys=[f"se:ratelimit:{key}"], args=[rate, burst, time.time(), tokens])
+        return float(wait)
+
+class AdmissionController:
+    """
+    Per-user rate limiting plus priority-based load shedding.
+
+    ``admit`` returns None when a request may proceed, or a
+    (status code, retry-after seconds, reason) tuple when it must be rejected.
+    """
+
+    def __init__(self, backend=None, rate_limits: Optional[Dict[str, Tuple[float, float]]] = None, shed_thresholds: Optional[Dict[int, int]] = None):
+        self.backend = backend or InMemoryTokenBucketBackend()
+        self.rate_limits = rate_limits or _load_rate_limits()
+        self.shed_thresholds = shed_thresholds or dict(SHED_THRESHOLDS)
+        self.in_flight = 0
+
+    async def admit(self, route_class: str, priority: int, client_key: str) -> Optional[Tuple[int, int, str]]:
+        threshold = self.shed_thresholds.get(priority)
+        if threshold is not None and self.in_flight >= threshold:
+            ADMISSION_REJECTED.inc(route_class, "shed")
+            return 503, SHED_RETRY_AFTER_SECONDS, "shed"
+
+        rate, burst = self.rate_limits.get(route_class, self.rate_limits["default"])
+        if rate > 0:
+            try:
+                wait = await self.backend.take(f"{client_key}:{route_class}", rate, burst)
+            except Exception as e:
+                # Fail open: a broken shared backend must not take the API down
+                logger.error(f"Rate limit backend error: {str(e)}")
+                wait = 0.0
+            if wait > 0:
+                ADMISSION_REJECTED.inc(route_class, "rate_limited")
+                return 429, max(1, math.ceil(wait)), "rate_limited"
+        return None
+
+    async def charge(self, route_class: str, client_key: str, tokens: float) -> Optional[Tuple[int, int, str]]:
+        """
+        Take ``tokens`` more from the client's bucket for work an admitted
+        request fans out (capped at what a full bucket holds after ``admit``
+        took its token, so one request can always run when the bucket is
+        full). Same result as ``admit``.
+        """
+        rate, burst = self.rate_limits.get(route_class, self.rate_limits["default"])
+        tokens = min(tokens, burst - 1)
+        if rate <= 0 or tokens <= 0:
+            return None
+        try:
+            wait = await self.backend.take(f"{client_key}:{route_class}", rate, burst, tokens)
+        except Exception as e:
+            logger.error(f"Rate limit backend error: {str(e)}")
+            return None
+        if wait > 0:
+            ADMISSION_REJECTED.inc(route_class, "rate_limited")
+            return 429, max(1, math.ceil(wait)), "rate_limited"
+        return None
+
+    def started(self):
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.inc()
+
+    def finished(self):
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec()
+
+# The request being served: (controller, route class, client key). Set by
+# whoever admitted it, so the work it fans out is charged to the same bucket.
+_admitted_request: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("se_admitted_request", default=None)
+
+class RateLimitedError(HTTPException):
+    """The admitted request asked for more work than the client's bucket allows."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(status_code=429, detail="Too many requests", headers={"Retry-After": str(retry_after)})
+        self.retry_after = retry_after
+
+def start_admitted_request(controller: AdmissionController, route_class: str, client_key: str) -> contextvars.Token:
+    """Record the request just admitted in this context; pass the token to end_admitted_request."""
+    return _admitted_request.set((controller, route_class, client_key))
+
+def end_admitted_request(token: contextvars.Token):
+    _admitted_request.reset(token)
+
+async def charge_admitted_request(tokens: float):
+    """
+    Charge extra work (e.g. one token per additional Gemini call) to the
+    current request's rate-limit bucket. Does nothing outside an admitted
+    request.
+
+    Raises:
+        RateLimitedError: If the bucket does not hold that many tokens
+    """
+    admitted = _admitted_request.get()
+    if admitted is None or tokens <= 0:
+        return
+    controller, route_class, client_key = admitted
+    rejection = await controller.charge(route_class, client_key, tokens)
+    if rejection is not None:
+        raise RateLimitedError(rejection[1])
+
+def get_route_policy(route: str) -> Tuple[str, int]:
+    """Route class and priority for a route template."""
+    return ROUTE_POLICIES.get(route, DEFAULT_POLICY)
+
+def per_worker_rate_limits(limits: Dict[str, Tuple[float, float]], workers: int) -> Dict[str, Tuple[float, float]]:
+    """
+    Split rate limits between worker processes that each keep their own
+    buckets. Only the refill rate is divided: connections are spread over
+    the workers by the kernel, so a client gets about its configured rate in
+    total, never N times it. The burst is kept whole so that one request,
+    and the work it fans out, still fits a full bucket; a client can burst
+    up to N times in total, once per worker.
+    """
+    if workers <= 1:
+        return dict(limits)
+    return {route_class: (rate / workers, burst) for route_class, (rate, burst) in limits.items()}
+
+def build_admission_controller() -> AdmissionController:
+    """
+    Build the controller, using Redis when SE_RATE_LIMIT_REDIS_URL is set.
+
+    In-process refill rates are divided by SE_WORKER_PROCESSES (set by
+    app.serve) so that running several workers does not multiply every
+    limit; use Redis for exact limits across workers and servers.
+    """
+    redis_url = os.getenv("SE_RATE_LIMIT_REDIS_URL")
+    if redis_url:
+        return AdmissionController(RedisTokenBucketBackend(redis_url))
+    workers = int(os.getenv("SE_WORKER_PROCESSES", "1"))
+    if workers > 1:
+        logger.warning(f"Dividing in-process rate limits between {workers} workers (a client held on one worker gets 1/{workers} of its rate); set SE_RATE_LIMIT_REDIS_URL for exact limits")
+    return AdmissionController(InMemoryTokenBucketBackend(), rate_limits=per_worker_rate_limits(_load_rate_limits(), workers))
@@ -1,21 +1,35 @@
-import requests
-import json
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
+import os
+from typing import Iterator
 from app.config.cloud_config import GCP_PROJECT_ID
+from app.services.se_agent_events import AgentError, AgentEvent, TextDelta, decode_sse_lines
+from app.services.se_metrics import time_upstream
 
 LOCATION = "us-central1"
 AGENT_ENGINE_ID = "638851440109944832"
 SERVICE_ACCOUNT_FILE = "gcpxmlb25-e063bdf91528.json"
 
+# Vertex AI endpoints; SE_AGENT_API_BASE_URL points both at another host (e.g. a local stub)
+AGENT_API_BASE_URL = os.getenv("SE_AGENT_API_BASE_URL")
+SESSIONS_BASE_URL = AGENT_API_BASE_URL or "https://aiplatform.googleapis.com"
+STREAM_QUERY_BASE_URL = AGENT_API_BASE_URL or f"https://{LOCATION}-aiplatform.googleapis.com"
+
+def _requests():
+    """Import requests on first use to keep cold starts fast."""
+    import requests
+    return requests
+
 def get_google_auth_token():
     """Get OAuth2 token using service account credentials"""
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request
+
     try:
         credentials = service_account.Credentials.from_service_account_file(
             SERVICE_ACCOUNT_FILE,
             scopes=['https://www.googleapis.com/auth/cloud-platform']
         )
-        credentials.refresh(Request())
+        with time_upstream("google_auth", "token_refresh"):
+            credentials.refresh(Request())
         print("\nAuthentication successful!")
         print(f"Service Account Email: {credentials.service_account_email}")
         print(f"Token State: {credentials.token_state}")
@@ -26,8 +40,10 @@ def get_google_auth_token():
 
 def initialize_session(uid: str, session_id: str) -> str:
     """Initialize a session with the agent server."""
-    url = f"https://aiplatform.googleapis.com/v1beta1/projects/{GCP_PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}/sessions"
+    url = f"{SESSIONS_BASE_URL}/v1beta1/projects/{GCP_PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}/sessions"
     
+    requests = _requests()
+
     # Get authentication token
     token = get_google_auth_token()
     headers = {
@@ -41,8 +57,9 @@ def initialize_session(uid: str, session_id: str) -> str:
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
+        with time_upstream("reasoning_engine", "create_session"):
+            response = requests.post(url, headers=headers, json=payload)
+            response.raise_for_status()
         
         response_json = response.json()
         if 'name' in response_json:
@@ -59,30 +76,19 @@ def initialize_session(uid: str, session_id: str) -> str:
         print(f"Failed to parse response: {e}")
         raise
 
-def extract_texts(obj):
-    results = []
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            if k == 'text':
-                results.append(v)
-            else:
-                results.extend(extract_texts(v))
-    elif isinstance(obj, list):
-        for item in obj:
-            results.extend(extract_texts(item))
-    return results
-
-def run_agent(question: str, uid: str, session_id: str) -> list:
+def stream_agent(question: str, uid: str, session_id: str) -> Iterator[AgentEvent]:
     """Send a question to the agent server using the streaming query endpoint.
     Args:
         question (str): The question to ask the agent
         uid (str): The user id
         session_id (str): The session id
-    Returns:
-        list: List of text responses from the agent
+    Yields:
+        AgentEvent: Typed records (text, tool calls and results, usage, errors) as they arrive
     """
-    url = f"https://{LOCATION}-aiplatform.googleapis.com/v1/projects/{GCP_PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}:streamQuery?alt=sse"
+    url = f"{STREAM_QUERY_BASE_URL}/v1/projects/{GCP_PROJECT_ID}/locations/{LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}:streamQuery?alt=sse"
     
+    requests = _requests()
+
     # Get authentication token
     token = get_google_auth_token()
     headers = {
@@ -100,31 +106,36 @@ def run_agent(question: str, uid: str, session_id: str) -> list:
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload, stream=True)
-        response.raise_for_status()
-        
-        texts = []
-        for line in response.iter_lines():
-            if line:
-                # Decode the line and remove the "data: " prefix if present
-                line_text = line.decode('utf-8')
-                if line_text.startswith('data: '):
-                    line_text = line_text[6:]  # Remove "data: " prefix
-                try:
-                    event = json.loads(line_text)
-                    if "content" in event:
-                        if "parts" in event["content"]:
-                            parts = event["content"]["parts"]
-                            for part in parts:
-                                if "text" in part:
-                                    texts.append(part["text"])
-                except json.JSONDecodeError:
-                    print(f"Raw line: {line_text}")
-        
-        return texts
+        with time_upstream("reasoning_engine", "stream_query"):
+            with requests.post(url, headers=headers, json=payload, stream=True) as response:
+                response.raise_for_status()
+                yield from decode_sse_lines(response.iter_lines())
     except requests.exceptions.RequestException as e:
         print(f"Error communicating with the agent server: {e}")
         raise
     except ValueError as e:
         print(f"Failed to parse response: {e}")
         raise
+
+def run_agent(question: str, uid: str, session_id: str) -> list:
+    """Send a question to the agent server and collect the text of its reply.
+    Args:
+        question (str): The question to ask the agent
+        uid (str): The user id
+        session_id (str): The session id
+    Returns:
+        list: List of text responses from the agent
+    Raises:
+        RuntimeError: If the agent reported an error and produced no text
+    """
+    texts = []
+    errors = []
+    for record in stream_agent(question, uid, session_id):
+        if isinstance(record, TextDelta):
+            texts.append(record.text)
+        elif isinstance(record, AgentError):
+            print(f"Agent error {record.code}: {record.message}")
+            errors.append(record)
+    if errors and not texts:
+        raise RuntimeError(f"Agent error {errors[0].code}: {errors[0].message}")
+    return texts
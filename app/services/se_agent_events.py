@@ -0,0 +1,124 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+# Typed records decoded from reasoning-engine (ADK) events. ``kind`` is a
+# plain class attribute, not a field, and names the record on the wire.
+
+class TextDelta(NamedTuple):
+    text: str
+    author: Optional[str] = None
+    kind = "text"
+
+class ToolCall(NamedTuple):
+    name: str
+    args: Dict[str, Any]
+    id: Optional[str] = None
+    kind = "tool_call"
+
+class ToolResult(NamedTuple):
+    name: str
+    response: Any
+    id: Optional[str] = None
+    kind = "tool_result"
+
+class Usage(NamedTuple):
+    prompt_tokens: int = 0
+    candidates_tokens: int = 0
+    total_tokens: int = 0
+    kind = "usage"
+
+class AgentError(NamedTuple):
+    code: Optional[str]
+    message: str
+    kind = "error"
+
+AgentEvent = Union[TextDelta, ToolCall, ToolResult, Usage, AgentError]
+
+def _get(obj: Dict[str, Any], snake: str, camel: str):
+    """Read a key that the API may return in snake_case or camelCase."""
+    value = obj.get(snake)
+    return obj.get(camel) if value is None else value
+
+def decode_event(event: Dict[str, Any]) -> Iterator[AgentEvent]:
+    """
+    Turn one reasoning-engine event into typed records.
+
+    Walks the event's parts in a single pass without building intermediate
+    lists, so the extra memory per event is constant.
+
+    Args:
+        event (Dict[str, Any]): A decoded streamQuery event
+
+    Yields:
+        AgentEvent: Text deltas, tool calls and results, usage and errors, in event order
+    """
+    if not isinstance(event, dict):
+        return
+
+    error_code = _get(event, "error_code", "errorCode")
+    error_message = _get(event, "error_message", "errorMessage")
+    if error_code is not None or error_message is not None:
+        yield AgentError(None if error_code is None else str(error_code), error_message or "")
+
+    content = event.get("content")
+    if isinstance(content, dict):
+        author = event.get("author")
+        for part in content.get("parts") or ():
+            if not isinstance(part, dict):
+                continue
+            text = part.get("text")
+            if text is not None:
+                yield TextDelta(text, author)
+            call = _get(part, "function_call", "functionCall")
+            if call is not None:
+                yield ToolCall(call.get("name", ""), call.get("args") or {}, call.get("id"))
+            result = _get(part, "function_response", "functionResponse")
+            if result is not None:
+                yield ToolResult(result.get("name", ""), result.get("response"), result.get("id"))
+
+    usage = _get(event, "usage_metadata", "usageMetadata")
+    if isinstance(usage, dict):
+        yield Usage(
+            _get(usage, "prompt_token_count", "promptTokenCount") or 0,
+            _get(usage, "candidates_token_count", "candidatesTokenCount") or 0,
+            _get(usage, "total_token_count", "totalTokenCount") or 0,
+        )
+
+def decode_events(events: Iterable[Dict[str, Any]]) -> Iterator[AgentEvent]:
+    """Decode a sequence of already-parsed events, lazily."""
+    for event in events:
+        yield from decode_event(event)
+
+def parse_sse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """Decode one SSE line into an event dict.
+
+    Args:
+        line (bytes): A raw line from the streamQuery response
+
+    Returns:
+        dict | None: The decoded event, or None for blank or non-JSON lines
+    """
+    if not line:
+        return None
+    # Decode the line and remove the "data: " prefix if present
+    line_text = line.decode('utf-8')
+    if line_text.startswith('data: '):
+        line_text = line_text[6:]  # Remove "data: " prefix
+    try:
+        return json.loads(line_text)
+    except json.JSONDecodeError:
+        print(f"Raw line: {line_text}")
+        return None
+
+def decode_sse_lines(lines: Iterable[bytes]) -> Iterator[AgentEvent]:
+    """Decode raw SSE lines from a streamQuery response into typed records."""
+    for line in lines:
+        event = parse_sse_line(line)
+        if event is not None:
+            yield from decode_event(event)
+
+def event_to_dict(record: AgentEvent) -> Dict[str, Any]:
+    """Serializable form of a record, tagged with its ``type``."""
+    data = record._asdict()
+    data["type"] = record.kind
+    return data
@@ -0,0 +1,94 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, NamedTuple, Optional
+
+# A sentence ends at . ! ? or … (optionally followed by closing quotes or
+# brackets) and whitespace, or at a line break
+_SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*(\s+)|(\n\s*)""")
+
+class Chunk(NamedTuple):
+    """One sentence and the whitespace that followed it in the original text."""
+    text: str
+    separator: str
+
+def split_sentences(text: str) -> List[Chunk]:
+    """
+    Split text into sentence-sized chunks.
+
+    Joining every chunk's text and separator gives back the original text
+    (apart from leading whitespace), so results can be stitched in order.
+
+    Args:
+        text (str): The text to split
+
+    Returns:
+        List[Chunk]: Non-empty sentences in order
+    """
+    text = text.lstrip()
+    chunks = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        group = 1 if match.group(1) is not None else 2
+        body_end = match.start(group)
+        if text[start:body_end].strip():
+            chunks.append(Chunk(text[start:body_end], match.group(group)))
+            start = match.end()
+    if text[start:].strip():
+        chunks.append(Chunk(text[start:], ""))
+    return chunks
+
+def joiner(separator: str) -> str:
+    """Normalized separator: a paragraph break, a line break or a single space."""
+    if not separator:
+        return ""
+    if separator.count("\n") > 1:
+        return "\n\n"
+    return "\n" if "\n" in separator else " "
+
+def stitch(chunks: List[Chunk], results: List[str]) -> str:
+    """Join per-chunk results in order, keeping paragraph breaks and single spaces between sentences."""
+    return "".join(result.strip() + joiner(chunk.separator) for chunk, result in zip(chunks, results)).strip()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    Args:
+        max_entries (int): Least recently used entries are evicted past this
+        ttl (float): Seconds an entry stays valid
+    """
+
+    def __init__(self, max_entries: int, ttl: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,121 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from fastapi import Response
+from app.services.se_metrics import Counter
+from app.services.se_write_stamps import WriteStamps
+
+# How long a known ETag may answer If-None-Match without re-checking the
+# backing store. Writes through any worker of this server invalidate
+# immediately; this bounds staleness for writes made on other servers.
+ETAG_CACHE_TTL_SECONDS = float(os.getenv("SE_ETAG_CACHE_TTL_SECONDS", "5"))
+ETAG_CACHE_MAX_KEYS = int(os.getenv("SE_ETAG_CACHE_MAX_KEYS", "10000"))
+
+CONDITIONAL_REQUESTS = Counter(
+    "se_conditional_requests_total",
+    "Conditional GETs by resource and outcome (cached_304, checked_304, modified).",
+    ("resource", "outcome"),
+)
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the parts that identify one version of a resource."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    If-None-Match check (weak comparison, as RFC 9110 requires for it).
+
+    Args:
+        if_none_match (Optional[str]): The request header value
+        etag (Optional[str]): The current ETag
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+class ETagCache:
+    """
+    Last known ETag per resource, grouped by owner (uid) so one write can
+    invalidate every listing of that user. Entries expire after ``ttl``
+    seconds; least recently used owners are evicted past ``max_keys``.
+
+    Invalidation reaches every worker forked from the process that created
+    the cache: each entry keeps the owner's write stamp (see WriteStamps)
+    read before the version was looked up, and is dropped once another
+    worker has bumped it.
+    """
+
+    def __init__(self, ttl: float = ETAG_CACHE_TTL_SECONDS, max_keys: int = ETAG_CACHE_MAX_KEYS, clock=time.monotonic,
+                 stamps: Optional[WriteStamps] = None):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._clock = clock
+        self._stamps = stamps or WriteStamps()
+        self._groups: "OrderedDict[Hashable, Dict[Hashable, Tuple[str, float, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stamp(self, owner: Hashable) -> int:
+        """The owner's write stamp; read it before looking up a version to ``set``."""
+        return self._stamps.current(owner)
+
+    def get(self, owner: Hashable, key: Hashable = None) -> Optional[str]:
+        with self._lock:
+            group = self._groups.get(owner)
+            if group is None:
+                return None
+            entry = group.get(key)
+            if entry is None:
+                return None
+            etag, expires_at, stamp = entry
+            if self._clock() >= expires_at or self._stamps.current(owner) != stamp:
+                del group[key]
+                return None
+            self._groups.move_to_end(owner)
+            return etag
+
+    def set(self, owner: Hashable, key: Hashable, etag: str, stamp: Optional[int] = None):
+        """
+        Remember an ETag.
+
+        Args:
+            owner (Hashable): Owner the resource belongs to (uid)
+            key (Hashable): Resource within the owner
+            etag (str): The ETag
+            stamp (int, optional): ``stamp(owner)`` from before the version was read; now if omitted
+        """
+        if stamp is None:
+            stamp = self._stamps.current(owner)
+        with self._lock:
+            group = self._groups.get(owner)
+            if group is None:
+                group = self._groups[owner] = {}
+                if len(self._groups) > self.max_keys:
+                    self._groups.popitem(last=False)
+            else:
+                self._groups.move_to_end(owner)
+            group[key] = (etag, self._clock() + self.ttl, stamp)
+
+    def invalidate(self, owner: Hashable):
+        """Forget the owner's ETags here and in the other workers."""
+        self._stamps.bump(owner)
+        with self._lock:
+            self._groups.pop(owner, None)
@@ -0,0 +1,175 @@
+import os
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+from fastapi import HTTPException
+from app.services.se_metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Bulkheads: each blocking upstream family runs on its own bounded thread
+# pool, so a stall in one (e.g. Firestore) cannot exhaust the event loop or
+# the threads serving the others. Sizes can be overridden with
+# SE_BULKHEAD_<NAME>_WORKERS and SE_BULKHEAD_<NAME>_QUEUE.
+DEFAULT_BULKHEADS = {
+    # name: (max_workers, max_queue)
+    "firestore": (8, 32),
+    "postgres": (4, 16),
+    "gemini": (16, 64),
+    "reasoning_engine": (8, 32),
+}
+
+# Seconds clients are asked to wait before retrying a rejected call
+RETRY_AFTER_SECONDS = 1
+
+BULKHEAD_PENDING = Gauge(
+    "se_bulkhead_pending",
+    "Calls running or queued on a bulkhead thread pool.",
+    ("bulkhead",),
+)
+BULKHEAD_REJECTED = Counter(
+    "se_bulkhead_rejected_total",
+    "Calls rejected because a bulkhead queue was full.",
+    ("bulkhead",),
+)
+
+class BulkheadFullError(HTTPException):
+    """Raised when a bulkhead has no free worker and its queue is full (HTTP 503)."""
+
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=503,
+            detail=f"Service busy: too many pending {name} calls, please retry",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+        self.name = name
+
+class Bulkhead:
+    """
+    A bounded thread pool for one family of blocking upstream calls.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait; anything beyond that is rejected immediately with BulkheadFullError
+    instead of piling up.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"bulkhead-{self.name}"
+                    )
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+        BULKHEAD_PENDING.dec(self.name)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a blocking function on this bulkhead without waiting for it,
+        e.g. from a thread that fans work out. A caller that is itself on
+        this bulkhead must not block on a future that has not started
+        (cancel it and run the work inline instead), or it could wait on
+        work queued behind it.
+
+        The caller's contextvars (request timing spans) are carried into the
+        worker thread.
+
+        Raises:
+            BulkheadFullError: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                BULKHEAD_REJECTED.inc(self.name)
+                logger.warning(f"Bulkhead {self.name} full ({self._pending} pending), rejecting call")
+                raise BulkheadFullError(self.name)
+            self._pending += 1
+        BULKHEAD_PENDING.inc(self.name)
+
+        context = contextvars.copy_context()
+        try:
+            future = self._get_executor().submit(context.run, partial(func, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking function on this bulkhead and await its result.
+
+        Raises:
+            BulkheadFullError: If all workers are busy and the queue is full
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Stop the worker threads; a new pool is created on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def _build_bulkheads() -> Dict[str, Bulkhead]:
+    bulkheads = {}
+    for name, (workers, queue) in DEFAULT_BULKHEADS.items():
+        workers = int(os.getenv(f"SE_BULKHEAD_{name.upper()}_WORKERS", workers))
+        queue = int(os.getenv(f"SE_BULKHEAD_{name.upper()}_QUEUE", queue))
+        bulkheads[name] = Bulkhead(name, workers, queue)
+    return bulkheads
+
+bulkheads = _build_bulkheads()
+
+def _reset_after_fork():
+    # Worker threads do not survive fork; forked workers start empty pools
+    for bulkhead in bulkheads.values():
+        bulkhead._executor = None
+        bulkhead._pending = 0
+        bulkhead._lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Get the bulkhead for an upstream family."""
+    return bulkheads[name]
+
+async def run_firestore(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking Firestore call on the Firestore bulkhead."""
+    return await bulkheads["firestore"].run(func, *args, **kwargs)
+
+async def run_postgres(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking Postgres call on the Postgres bulkhead."""
+    return await bulkheads["postgres"].run(func, *args, **kwargs)
+
+async def run_gemini(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking Gemini call on the Gemini bulkhead."""
+    return await bulkheads["gemini"].run(func, *args, **kwargs)
+
+async def run_reasoning_engine(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking reasoning-engine call on its bulkhead."""
+    return await bulkheads["reasoning_engine"].run(func, *args, **kwargs)
+
+def shutdown_bulkheads():
+    """Shut down every bulkhead thread pool."""
+    for bulkhead in bulkheads.values():
+        bulkhead.shutdown()
@@ -0,0 +1,238 @@
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.se_metrics import Counter
+
+# Answer short inputs that are only idioms from the lexicon, without Gemini
+IDIOM_FAST_PATH = os.getenv("SE_IDIOM_FAST_PATH", "1") == "1"
+IDIOM_FAST_PATH_MAX_CHARS = int(os.getenv("SE_IDIOM_FAST_PATH_MAX_CHARS", "120"))
+
+IDIOM_LOOKUPS = Counter(
+    "se_idiom_lookups_total",
+    "Incoming paraphrases by idiom lexicon outcome: answered, hinted, no_match.",
+    ("outcome",),
+)
+
+# Curated idiom -> literal meaning. Keys are lower case; inflected forms are
+# listed as separate keys. Literals must read correctly in place of the idiom.
+IDIOM_LEXICON: Dict[str, str] = {
+    "raining cats and dogs": "raining very heavily",
+    "rains cats and dogs": "rains very heavily",
+    "rained cats and dogs": "rained very heavily",
+    "spill the beans": "tell the secret",
+    "spilled the beans": "told the secret",
+    "break a leg": "good luck",
+    "piece of cake": "very easy",
+    "a piece of cake": "very easy",
+    "under the weather": "sick",
+    "feeling under the weather": "feeling sick",
+    "hit the sack": "go to bed",
+    "hit the hay": "go to bed",
+    "call it a day": "stop working for today",
+    "let's call it a day": "let's stop working for today",
+    "once in a blue moon": "very rarely",
+    "cost an arm and a leg": "cost a lot of money",
+    "costs an arm and a leg": "costs a lot of money",
+    "the ball is in your court": "it is your turn to decide",
+    "ball is in your court": "it is your turn to decide",
+    "bite the bullet": "do the hard thing you have been avoiding",
+    "hang in there": "keep going, don't give up",
+    "keep your chin up": "stay positive",
+    "chin up": "stay positive",
+    "get cold feet": "feel too nervous to do it",
+    "got cold feet": "felt too nervous to do it",
+    "cold feet": "nervousness about doing something",
+    "let the cat out of the bag": "tell the secret by accident",
+    "a blessing in disguise": "something that seemed bad but turned out good",
+    "blessing in disguise": "something that seemed bad but turned out good",
+    "beat around the bush": "avoid saying something directly",
+    "stop beating around the bush": "say it directly",
+    "the best of both worlds": "the good parts of both choices",
+    "best of both worlds": "the good parts of both choices",
+    "on cloud nine": "very happy",
+    "over the moon": "very happy",
+    "down in the dumps": "sad",
+    "in hot water": "in trouble",
+    "in the same boat": "in the same situation",
+    "we're in the same boat": "we are in the same situation",
+    "give me a hand": "help me",
+    "give someone a hand": "help someone",
+    "lend me a hand": "help me",
+    "break the ice": "start a friendly conversation",
+    "kill two birds with one stone": "get two things done with one action",
+    "it's not rocket science": "it is not hard to understand",
+    "not rocket science": "not hard to understand",
+    "hold your horses": "wait a moment",
+    "pull someone's leg": "joke with someone",
+    "pulling my leg": "joking with me",
+    "pulling your leg": "joking with you",
+    "you're pulling my leg": "you are joking with me",
+    "i'm pulling your leg": "I am joking with you",
+    "cut it out": "stop doing that",
+    "knock it off": "stop doing that",
+    "time flies": "time passes quickly",
+    "time flies when you're having fun": "time passes quickly when you are having fun",
+    "the elephant in the room": "the big problem nobody is talking about",
+    "elephant in the room": "the big problem nobody is talking about",
+    "when pigs fly": "never",
+    "it's a small world": "it is surprising to meet someone you know here",
+    "my lips are sealed": "I will keep the secret",
+    "lips are sealed": "will keep the secret",
+    "you can say that again": "I agree with you",
+    "no pain no gain": "you have to work hard to get good results",
+    "better late than never": "it is better to do it late than not at all",
+    "easier said than done": "harder to do than it sounds",
+    "it's easier said than done": "it is harder to do than it sounds",
+    "sit tight": "wait patiently",
+    "on the same page": "agreeing and understanding each other",
+    "get out of hand": "become out of control",
+    "got out of hand": "became out of control",
+    "see eye to eye": "agree",
+    "don't count your chickens before they hatch": "don't plan on something good before it happens",
+    "every cloud has a silver lining": "something good can come from a bad situation",
+    "the last straw": "the final problem that makes someone give up",
+    "a taste of your own medicine": "the same bad treatment you gave others",
+    "miss the boat": "miss the chance",
+    "missed the boat": "missed the chance",
+    "get the ball rolling": "get started",
+    "let's get the ball rolling": "let's get started",
+    "butterflies in my stomach": "nervous feelings",
+    "i have butterflies in my stomach": "I feel nervous",
+    "head in the clouds": "not paying attention",
+    "cat got your tongue": "why aren't you talking",
+    "has the cat got your tongue": "why aren't you talking",
+    "crack me up": "make me laugh",
+    "cracks me up": "makes me laugh",
+    "you crack me up": "you make me laugh a lot",
+    "out of the blue": "suddenly and unexpectedly",
+    "hit the books": "study",
+    "in a nutshell": "in short",
+    "keep an eye on": "watch",
+    "keep an eye on it": "watch it",
+    "zip it": "stop talking",
+    "chill out": "calm down",
+}
+
+# Words that may surround an idiom in an input the lexicon fully answers,
+# e.g. "It's raining cats and dogs!" or "Wow, break a leg"
+FILLER_WORDS = frozenset({
+    "it's", "it", "is", "was", "that's", "that", "this", "you're", "you", "are", "i'm", "i", "am",
+    "we're", "we", "they're", "they", "he's", "he", "she's", "she", "so", "really", "just", "oh",
+    "wow", "well", "hey", "ok", "okay", "please", "now", "today", "again", "totally", "all", "and",
+})
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_END = object()
+
+class IdiomMatch(NamedTuple):
+    start: int
+    end: int
+    idiom: str
+    literal: str
+
+def _build_trie(lexicon: Dict[str, str]) -> dict:
+    trie: dict = {}
+    for idiom, literal in lexicon.items():
+        node = trie
+        for token in _TOKEN.findall(idiom):
+            node = node.setdefault(token, {})
+        node[_END] = (idiom, literal)
+    return trie
+
+_TRIE = _build_trie(IDIOM_LEXICON)
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    # Lower-casing and straightening apostrophes keep character offsets
+    # unchanged, except for the few characters that lower-case to two
+    normalized = text.lower()
+    if len(normalized) != len(text):
+        normalized = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+    normalized = normalized.replace("’", "'")
+    return [(m.group(0), m.start(), m.end()) for m in _TOKEN.finditer(normalized)]
+
+def find_idioms(text: str, trie: Optional[dict] = None) -> List[IdiomMatch]:
+    """
+    Find lexicon idioms in text in one left-to-right pass.
+
+    Matching is word-based and case-insensitive; at each position the longest
+    idiom wins and matches do not overlap.
+
+    Args:
+        text (str): Text to scan
+        trie (dict, optional): Word trie of the lexicon; defaults to IDIOM_LEXICON
+
+    Returns:
+        List[IdiomMatch]: Matches in text order, with character offsets into ``text``
+    """
+    trie = _TRIE if trie is None else trie
+    tokens = _tokens(text)
+    matches = []
+    index = 0
+    while index < len(tokens):
+        node = trie.get(tokens[index][0])
+        best = None
+        cursor = index
+        while node is not None:
+            cursor += 1
+            if _END in node:
+                best = (cursor, node[_END])
+            if cursor == len(tokens):
+                break
+            node = node.get(tokens[cursor][0])
+        if best is None:
+            index += 1
+            continue
+        end, (idiom, literal) = best
+        matches.append(IdiomMatch(tokens[index][1], tokens[end - 1][2], idiom, literal))
+        index = end
+    return matches
+
+def _replace(text: str, matches: List[IdiomMatch]) -> str:
+    parts = []
+    position = 0
+    for match in matches:
+        literal = match.literal
+        if text[match.start].isupper():
+            literal = literal[0].upper() + literal[1:]
+        parts.append(text[position:match.start])
+        parts.append(literal)
+        position = match.end
+    parts.append(text[position:])
+    return "".join(parts)
+
+def literal_answer(text: str, matches: Optional[List[IdiomMatch]] = None) -> Optional[str]:
+    """
+    Answer an incoming paraphrase locally if the text is only idioms.
+
+    Args:
+        text (str): The text to explain
+        matches (List[IdiomMatch], optional): Result of find_idioms, if already computed
+
+    Returns:
+        Optional[str]: The text with each idiom replaced by its literal
+        meaning, or None if it is too long or has words outside the idioms
+        (other than filler words like "it's" or "wow")
+    """
+    if len(text) > IDIOM_FAST_PATH_MAX_CHARS:
+        return None
+    matches = find_idioms(text) if matches is None else matches
+    if not matches:
+        return None
+    spans = iter(matches)
+    span = next(spans, None)
+    for token, start, end in _tokens(text):
+        while span is not None and span.end <= start:
+            span = next(spans, None)
+        if span is not None and span.start <= start:
+            continue
+        if token not in FILLER_WORDS:
+            return None
+    return _replace(text, matches)
+
+def idiom_hints(matches: List[IdiomMatch]) -> Optional[str]:
+    """Prompt lines telling the model what the matched idioms mean."""
+    if not matches:
+        return None
+    seen = dict.fromkeys(f'"{m.idiom}" means "{m.literal}"' for m in matches)
+    return "Idioms in this text: " + "; ".join(seen) + "."
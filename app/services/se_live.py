@@ -0,0 +1,203 @@
+import os
+import json
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+from fastapi import HTTPException, WebSocket
+from app.services.se_admission import start_admitted_request
+from app.services.se_metrics import Counter, Gauge
+from app.services.se_serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Operations one connection may run at once; further messages are not read
+# from the socket until one finishes, so a fast client is slowed by TCP
+LIVE_MAX_IN_FLIGHT = int(os.getenv("SE_LIVE_MAX_IN_FLIGHT", "4"))
+# Outgoing frames buffered per connection; producers wait when it is full,
+# so a slow reader pauses Gemini and agent streams instead of growing memory
+LIVE_SEND_QUEUE_SIZE = int(os.getenv("SE_LIVE_SEND_QUEUE_SIZE", "32"))
+LIVE_MAX_MESSAGE_BYTES = int(os.getenv("SE_LIVE_MAX_MESSAGE_BYTES", "16384"))
+
+LIVE_CONNECTIONS = Gauge(
+    "se_live_connections",
+    "Open live-session WebSocket connections.",
+)
+LIVE_MESSAGES = Counter(
+    "se_live_messages_total",
+    "Live-session operations by type and outcome (ok, error, rate_limited, shed).",
+    ("type", "outcome"),
+)
+
+# An operation handler gets the message and yields (frame type, data)
+# pairs: any number of partial frames, ending with one "result"
+Handler = Callable[[Dict[str, Any]], AsyncIterator[Tuple[str, Any]]]
+
+# WebSocket close code for oversized messages (RFC 6455)
+MESSAGE_TOO_BIG = 1009
+
+# Operation type -> (route class, priority, rate-limit key), as the
+# equivalent REST request would be admitted
+Policies = Dict[str, Tuple[str, int, str]]
+
+class LiveConnection:
+    """
+    One live-session WebSocket, multiplexing typed operations.
+
+    Client messages are JSON objects ``{"id": ..., "type": ..., ...}``.
+    Every frame sent back carries the message's id: partial frames
+    ("chunk", "event") followed by exactly one "result" or "error". A
+    ``{"type": "ping"}`` message is answered with "pong".
+
+    With an admission controller, every operation is rate limited and shed
+    like its REST route and counts towards the in-flight total while it
+    runs; a rejected one gets an "error" frame with status 429 or 503 and
+    ``retry_after``.
+
+    Args:
+        websocket (WebSocket): The accepted connection
+        handlers (Dict[str, Handler]): Operation type -> handler
+        admission (AdmissionController): Controller shared with the HTTP middleware, or None
+        policies (Policies): Operation type -> (route class, priority, rate-limit key)
+        max_in_flight (int): Operations run concurrently
+        send_queue_size (int): Frames buffered before producers wait
+    """
+
+    def __init__(self, websocket: WebSocket, handlers: Dict[str, Handler], admission=None, policies: Optional[Policies] = None,
+                 max_in_flight: int = LIVE_MAX_IN_FLIGHT, send_queue_size: int = LIVE_SEND_QUEUE_SIZE,
+                 max_message_bytes: int = LIVE_MAX_MESSAGE_BYTES):
+        self.websocket = websocket
+        self.handlers = handlers
+        self.admission = admission
+        self.policies = policies or {}
+        self.max_message_bytes = max_message_bytes
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._outbox: "asyncio.Queue[str]" = asyncio.Queue(maxsize=send_queue_size)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def send(self, frame: Dict[str, Any]):
+        """Queue a frame; waits while the client is not keeping up."""
+        await self._outbox.put(dumps(frame).decode("utf-8"))
+
+    async def _write(self):
+        while True:
+            await self.websocket.send_text(await self._outbox.get())
+
+    async def run(self):
+        """Serve the connection until the client disconnects."""
+        writer = asyncio.create_task(self._write())
+        LIVE_CONNECTIONS.inc()
+        try:
+            await self._read(writer)
+        finally:
+            LIVE_CONNECTIONS.dec()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _read(self, writer: asyncio.Task):
+        while not writer.done():
+            await self._slots.acquire()
+            received = await self.websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                return
+            text = received.get("text")
+            if text is None:
+                text = (received.get("bytes") or b"").decode("utf-8", errors="replace")
+            if len(text) > self.max_message_bytes:
+                await self.websocket.close(code=MESSAGE_TOO_BIG, reason="Message too big")
+                return
+            message = self._parse(text)
+            if message is None:
+                self._slots.release()
+                await self.send({"id": None, "type": "error", "status": 400, "detail": "Messages must be JSON objects with a type"})
+                continue
+            if message["type"] == "ping":
+                self._slots.release()
+                await self.send({"id": message.get("id"), "type": "pong"})
+                continue
+            task = asyncio.create_task(self._operate(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(message, dict) or not isinstance(message.get("type"), str):
+            return None
+        return message
+
+    async def _operate(self, message: Dict[str, Any]):
+        message_id = message.get("id")
+        message_type = message["type"]
+        admitted = False
+        try:
+            handler = self.handlers.get(message_type)
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unknown message type: {message_type}")
+            policy = self.policies.get(message_type)
+            if self.admission is not None and policy is not None:
+                rejection = await self.admission.admit(*policy)
+                if rejection is not None:
+                    status, retry_after, reason = rejection
+                    LIVE_MESSAGES.inc(message_type, reason)
+                    detail = "Too many requests" if reason == "rate_limited" else "Server busy, please retry"
+                    await self.send({"id": message_id, "type": "error", "status": status, "detail": detail, "retry_after": retry_after})
+                    return
+                self.admission.started()
+                admitted = True
+                # Each operation runs in its own task, so this context is its own:
+                # work it fans out is charged to the same bucket
+                route_class, _, client_key = policy
+                start_admitted_request(self.admission, route_class, client_key)
+            async with aclosing(handler(message)) as frames:
+                async for frame_type, data in frames:
+                    await self.send({"id": message_id, "type": frame_type, "data": data})
+            LIVE_MESSAGES.inc(message_type, "ok")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LIVE_MESSAGES.inc(message_type, "error")
+            status, detail = _error_status(e)
+            if status >= 500:
+                logger.error(f"Live {message_type} operation failed: {str(e)}")
+            await self.send({"id": message_id, "type": "error", "status": status, "detail": detail})
+        finally:
+            if admitted:
+                self.admission.finished()
+            self._slots.release()
+
+def _error_status(error: Exception) -> Tuple[int, str]:
+    """The HTTP status and detail the equivalent REST endpoint would return."""
+    if isinstance(error, HTTPException):
+        return error.status_code, str(error.detail)
+    if isinstance(error, (ValueError, KeyError, TypeError)):
+        return 422, str(error)
+    return 500, str(error)
+
+async def iterate_blocking(run: Callable[..., Awaitable[Any]], iterator) -> AsyncIterator[Any]:
+    """
+    Drain a blocking iterator one item at a time on a bulkhead (``run``),
+    e.g. run_reasoning_engine. Stops reading when the consumer stops, so a
+    slow client pauses the upstream.
+    """
+    try:
+        while True:
+            item = await run(next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        try:
+            if hasattr(iterator, "close"):
+                iterator.close()
+        except ValueError:
+            # Still executing on a worker thread (connection closed mid-read)
+            pass
+
+_DONE = object()
@@ -1,22 +1,100 @@
 import os
-import google.generativeai as genai
-from typing import Optional
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
 import logging
 from app.config.cloud_config import get_gemini_api_key
+from app.services.se_chunking import Chunk, TTLCache, joiner, split_sentences, stitch
+from app.services.se_executor import BulkheadFullError, get_bulkhead
+from app.services.se_idioms import IDIOM_FAST_PATH, IDIOM_LOOKUPS, find_idioms, idiom_hints, literal_answer
+from app.services.se_metrics import Counter, time_upstream
+from app.services.se_resilience import HedgedCaller, LatencyTracker, get_circuit_breaker
 
 logger = logging.getLogger(__name__)
 
-def get_outgoing_paraphrase_prompt(text_content: str) -> str:
-    """
-    Generate the prompt template for outgoing paraphrase.
-    
-    Args:
-        text_content (str): The text to be paraphrased
-        
-    Returns:
-        str: The constructed prompt template
-    """
-    return f"""You are a friendly and supportive language coach helping a young student with autism communicate more clearly and naturally. The student will give you a sentence or short paragraph. Your job is to gently rephrase it to sound more conversational and socially appropriate, while keeping the original meaning.
+# Gemini models: the secondary model is used when the primary's circuit
+# breaker is open or its call fails. Set SE_GEMINI_FALLBACK_MODEL="" to disable.
+GEMINI_MODEL = os.getenv("SE_GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_FALLBACK_MODEL = os.getenv("SE_GEMINI_FALLBACK_MODEL", "gemini-1.5-flash-8b")
+# Overall deadline for one model, including any hedged attempt
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("SE_GEMINI_TIMEOUT_SECONDS", "20"))
+# A hedged second request is sent once the first passes this latency percentile
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("SE_GEMINI_HEDGE_PERCENTILE", "95"))
+# Consecutive failures that open a model's breaker, and how long it stays open
+GEMINI_BREAKER_FAILURES = int(os.getenv("SE_GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("SE_GEMINI_BREAKER_RESET_SECONDS", "30"))
+# Store the fixed prompt prefixes as provider-side cached content (see _build_model)
+GEMINI_CONTEXT_CACHE = os.getenv("SE_GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("SE_GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Paraphrase long inputs sentence by sentence, concurrently, caching each
+# sentence's result (see paraphrase_in_chunks)
+PARAPHRASE_CHUNKING = os.getenv("SE_PARAPHRASE_CHUNKING", "0") == "1"
+PARAPHRASE_CHUNK_MIN_CHARS = int(os.getenv("SE_PARAPHRASE_CHUNK_MIN_CHARS", "200"))
+# Sentences of one request paraphrased at once (on the gemini bulkhead,
+# counting the one the request's own thread runs)
+PARAPHRASE_CHUNK_FAN_OUT = int(os.getenv("SE_PARAPHRASE_CHUNK_FAN_OUT", "4"))
+PARAPHRASE_CHUNK_CACHE_SIZE = int(os.getenv("SE_PARAPHRASE_CHUNK_CACHE_SIZE", "4096"))
+PARAPHRASE_CHUNK_CACHE_TTL_SECONDS = float(os.getenv("SE_PARAPHRASE_CHUNK_CACHE_TTL_SECONDS", "3600"))
+
+GEMINI_DECISIONS = Counter(
+    "se_gemini_decisions_total",
+    "Gemini routing decisions: primary, fallback, hedged, breaker_open, error.",
+    ("model", "decision"),
+)
+GEMINI_HEDGE_WINS = Counter(
+    "se_gemini_hedge_wins_total",
+    "Which attempt won when a Gemini call was hedged.",
+    ("model", "winner"),
+)
+
+PARAPHRASE_CHUNKS = Counter(
+    "se_paraphrase_chunks_total",
+    "Sentence chunks of chunked paraphrases by outcome: cache_hit, generated, failed.",
+    ("kind", "outcome"),
+)
+PROMPT_PREFIX_EVENTS = Counter(
+    "se_gemini_prompt_prefix_total",
+    "Model handles built per prompt prefix mode: cache_created, cache_deleted, cache_unavailable, system_instruction.",
+    ("model", "event"),
+)
+
+_hedger = HedgedCaller("gemini")
+# (model name, prefix name) -> (model handle, monotonic expiry or None)
+_models: Dict[tuple, tuple] = {}
+# (model name, prefix name) -> the CachedContent behind the current handle
+_cached_contents: Dict[tuple, object] = {}
+# (model name, prefix name) -> lock held while that handle is (re)built
+_model_builds: Dict[tuple, threading.Lock] = {}
+_models_lock = threading.Lock()
+_latency_trackers: Dict[str, LatencyTracker] = {}
+_latency_trackers_lock = threading.Lock()
+_chunk_cache = TTLCache(PARAPHRASE_CHUNK_CACHE_SIZE, PARAPHRASE_CHUNK_CACHE_TTL_SECONDS)
+
+def _reset_after_fork():
+    """Model handles and thread pools are per process; forked workers rebuild their own."""
+    global _hedger, _models_lock
+    _hedger = HedgedCaller("gemini")
+    _models.clear()
+    _cached_contents.clear()
+    _model_builds.clear()
+    _models_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _genai():
+    """Import google.generativeai on first use; it dominates cold import time."""
+    import google.generativeai as genai
+    return genai
+
+class PromptPrefix(NamedTuple):
+    """Fixed instructions and examples shared by every request of one kind."""
+    name: str
+    system_instruction: str
+
+OUTGOING_PARAPHRASE_PREFIX = PromptPrefix("outgoing_paraphrase", """You are a friendly and supportive language coach helping a young student with autism communicate more clearly and naturally. The student will give you a sentence or short paragraph. Your job is to gently rephrase it to sound more conversational and socially appropriate, while keeping the original meaning.
 
 Respond with only the improved version, without commentary.
 
@@ -34,24 +112,9 @@ User input:
 Say it better:
 "I love dinosaurs—they're so big and exciting!"
 
-Now, please improve this text:
----
-{text_content}
----
-
-Say it better:"""
+Each message is the text to improve, between --- lines.""")
 
-def get_incoming_paraphrase_prompt(text_content: str) -> str:
-    """
-    Generate the prompt template for incoming paraphrase.
-    
-    Args:
-        text_content (str): The text to be paraphrased
-        
-    Returns:
-        str: The constructed prompt template
-    """
-    return f"""You are a helpful and patient communication assistant for a young student with autism. The student may not understand figurative language, sarcasm, or complex expressions. Your job is to rephrase their input into simple, literal, and clear language that makes it easier to understand.
+INCOMING_PARAPHRASE_PREFIX = PromptPrefix("incoming_paraphrase", """You are a helpful and patient communication assistant for a young student with autism. The student may not understand figurative language, sarcasm, or complex expressions. Your job is to rephrase their input into simple, literal, and clear language that makes it easier to understand.
 
 Avoid figurative language, idioms, or metaphors in your output. Use plain English.
 
@@ -69,19 +132,233 @@ User input:
 Explain it to me:
 "Don't tell anyone about the surprise party."
 
-Now, please explain this text:
+Each message is the text to explain, between --- lines, sometimes followed by the meanings of idioms it contains.""")
+
+def get_outgoing_paraphrase_prompt(text_content: str) -> str:
+    """
+    Generate the per-request prompt for outgoing paraphrase. The fixed
+    instructions are sent separately as OUTGOING_PARAPHRASE_PREFIX.
+    
+    Args:
+        text_content (str): The text to be paraphrased
+        
+    Returns:
+        str: The constructed prompt
+    """
+    return f"""---
+{text_content}
+---
+
+Say it better:"""
+
+def get_incoming_paraphrase_prompt(text_content: str, hints: Optional[str] = None) -> str:
+    """
+    Generate the per-request prompt for incoming paraphrase. The fixed
+    instructions are sent separately as INCOMING_PARAPHRASE_PREFIX.
+    
+    Args:
+        text_content (str): The text to be paraphrased
+        hints (str, optional): Meanings of idioms found in the text
+        
+    Returns:
+        str: The constructed prompt
+    """
+    if hints:
+        return f"""---
+{text_content}
 ---
+
+{hints}
+
+Explain it to me:"""
+    return f"""---
 {text_content}
 ---
 
 Explain it to me:"""
 
-def get_prompt_results(prompt: str) -> Optional[str]:
+def _incoming_prompt_with_hints(text_content: str) -> str:
+    """Incoming prompt that also passes on the meanings of any lexicon idioms."""
+    hints = idiom_hints(find_idioms(text_content)) if IDIOM_FAST_PATH else None
+    return get_incoming_paraphrase_prompt(text_content, hints)
+
+def _build_model(model_name: str, prefix: Optional[PromptPrefix]):
+    """
+    Build a model handle carrying the prompt prefix.
+
+    With SE_GEMINI_CONTEXT_CACHE=1 the prefix is stored once as provider-side
+    cached content, so requests send only the user text; this needs a model
+    version that supports caching and a prefix above the provider's minimum
+    size. Otherwise (or if creating the cache fails) the prefix is set as the
+    model's system instruction.
+
+    Returns:
+        Tuple of the model, the monotonic time it must be rebuilt by and the
+        CachedContent it uses (None without one)
+    """
+    genai = _genai()
+    if prefix is None:
+        return genai.GenerativeModel(model_name), None, None
+    if GEMINI_CONTEXT_CACHE:
+        try:
+            with time_upstream("gemini", "create_cached_content"):
+                cached = genai.caching.CachedContent.create(
+                    model=model_name,
+                    display_name=f"se-{prefix.name}",
+                    system_instruction=prefix.system_instruction,
+                    ttl=timedelta(seconds=GEMINI_CONTEXT_CACHE_TTL_SECONDS),
+                )
+            PROMPT_PREFIX_EVENTS.inc(model_name, "cache_created")
+            # Rebuild a little before the provider expires the cache
+            expires_at = time.monotonic() + GEMINI_CONTEXT_CACHE_TTL_SECONDS * 0.9
+            return genai.GenerativeModel.from_cached_content(cached_content=cached), expires_at, cached
+        except Exception as e:
+            PROMPT_PREFIX_EVENTS.inc(model_name, "cache_unavailable")
+            logger.warning(f'Context cache unavailable for {model_name}, using a system instruction: {str(e)}')
+            return (
+                genai.GenerativeModel(model_name, system_instruction=prefix.system_instruction),
+                time.monotonic() + GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+                None,
+            )
+    PROMPT_PREFIX_EVENTS.inc(model_name, "system_instruction")
+    return genai.GenerativeModel(model_name, system_instruction=prefix.system_instruction), None, None
+
+def _delete_cached_content(model_name: str, cached):
+    """Delete superseded cached content so it stops accruing storage until its TTL."""
+    try:
+        with time_upstream("gemini", "delete_cached_content"):
+            cached.delete()
+        PROMPT_PREFIX_EVENTS.inc(model_name, "cache_deleted")
+    except Exception as e:
+        logger.warning(f'Could not delete cached content for {model_name}: {str(e)}')
+
+def _current_model(key: tuple):
+    with _models_lock:
+        entry = _models.get(key)
+    if entry is not None and (entry[1] is None or time.monotonic() < entry[1]):
+        return entry[0]
+    return None
+
+def _get_model(model_name: str, prefix: Optional[PromptPrefix]):
+    """
+    Model handle for (model, prefix), created once and rebuilt when it expires.
+
+    One thread per key builds the handle while the others wait for it, so an
+    expiry under load creates a single CachedContent. The one it replaces is
+    deleted once requests that may still be using it have timed out.
+    """
+    key = (model_name, prefix.name if prefix else None)
+    model = _current_model(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        build_lock = _model_builds.setdefault(key, threading.Lock())
+    with build_lock:
+        # Another thread may have built it while this one waited
+        model = _current_model(key)
+        if model is not None:
+            return model
+        model, expires_at, cached = _build_model(model_name, prefix)
+        with _models_lock:
+            _models[key] = (model, expires_at)
+            previous = _cached_contents.pop(key, None)
+            if cached is not None:
+                _cached_contents[key] = cached
+    if previous is not None:
+        timer = threading.Timer(GEMINI_TIMEOUT_SECONDS, _delete_cached_content, (model_name, previous))
+        timer.daemon = True
+        timer.start()
+    return model
+
+def _forget_model(model_name: str, prefix: Optional[PromptPrefix], model=None):
+    """
+    Drop a model handle, e.g. after its cached content disappeared early.
+
+    With ``model``, only drop the handle if it is still that one, so a late
+    failure of a replaced handle does not discard its replacement.
+    """
+    key = (model_name, prefix.name if prefix else None)
+    with _models_lock:
+        entry = _models.get(key)
+        if entry is not None and (model is None or entry[0] is model):
+            del _models[key]
+            _cached_contents.pop(key, None)
+
+def _get_latency_tracker(model_name: str) -> LatencyTracker:
+    with _latency_trackers_lock:
+        tracker = _latency_trackers.get(model_name)
+        if tracker is None:
+            tracker = _latency_trackers[model_name] = LatencyTracker()
+        return tracker
+
+def _generate_content(model_name: str, prompt: str, prefix: Optional[PromptPrefix] = None) -> str:
+    """Make one Gemini call and record its latency for hedging decisions."""
+    model = _get_model(model_name, prefix)
+    start = time.perf_counter()
+    try:
+        with time_upstream("gemini", "generate_content"):
+            response = model.generate_content(prompt, request_options={"timeout": GEMINI_TIMEOUT_SECONDS})
+    except Exception as e:
+        if type(e).__name__ in ("NotFound", "PermissionDenied"):
+            # The cached content was deleted or expired early; recreate it next time
+            _forget_model(model_name, prefix, model)
+        raise
+    _get_latency_tracker(model_name).record(time.perf_counter() - start)
+    return response.text
+
+def _generate_content_stream(model_name: str, prompt: str, prefix: Optional[PromptPrefix] = None) -> Iterator[str]:
+    """Make one streaming Gemini call, yielding each text delta as it arrives."""
+    model = _get_model(model_name, prefix)
+    start = time.perf_counter()
+    try:
+        with time_upstream("gemini", "generate_content_stream"):
+            response = model.generate_content(prompt, stream=True, request_options={"timeout": GEMINI_TIMEOUT_SECONDS})
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:  # A chunk without text parts (e.g. only a finish reason)
+                continue
+            if text:
+                yield text
+    except Exception as e:
+        if type(e).__name__ in ("NotFound", "PermissionDenied"):
+            _forget_model(model_name, prefix, model)
+        raise
+    _get_latency_tracker(model_name).record(time.perf_counter() - start)
+
+def _call_model(model_name: str, prompt: str, prefix: Optional[PromptPrefix] = None) -> str:
+    """
+    Call one model, hedging with a second request if the first is slower
+    than the model's observed p95.
+    """
+    hedge_after = _get_latency_tracker(model_name).percentile(GEMINI_HEDGE_PERCENTILE)
+    text, winner, hedged = _hedger.call(
+        lambda: _generate_content(model_name, prompt, prefix), hedge_after, GEMINI_TIMEOUT_SECONDS
+    )
+    if hedged:
+        GEMINI_DECISIONS.inc(model_name, "hedged")
+        GEMINI_HEDGE_WINS.inc(model_name, winner)
+    return text
+
+def _model_names() -> List[str]:
+    """Models to try, in order: the primary, then the fallback."""
+    models = [GEMINI_MODEL]
+    if GEMINI_FALLBACK_MODEL and GEMINI_FALLBACK_MODEL != GEMINI_MODEL:
+        models.append(GEMINI_FALLBACK_MODEL)
+    return models
+
+def get_prompt_results(prompt: str, prefix: Optional[PromptPrefix] = None) -> Optional[str]:
     """
     Send the prompt to Gemini API and get the results.
+
+    The primary model is called through its circuit breaker with a hedged
+    second request on slow calls; if the breaker is open or the call fails,
+    the configured fallback model is tried.
     
     Args:
         prompt (str): The prompt to send to the API
+        prefix (PromptPrefix, optional): Fixed instructions, sent as a system
+            instruction or cached content rather than with every prompt
         
     Returns:
         Optional[str]: Generated response on success, None on error
@@ -94,25 +371,227 @@ def get_prompt_results(prompt: str) -> Optional[str]:
             return None
             
         # Configure Gemini
+        genai = _genai()
         genai.configure(api_key=api_key)
         
-        # Choose the model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        # model = genai.GenerativeModel('gemini-pro')  # Alternative model
-        
-        # Generate response
-        response = model.generate_content(prompt)
-        
-        if not response.text:
-            logger.error('No response text received from Gemini API')
-            return None
+        for index, model_name in enumerate(_model_names()):
+            breaker = get_circuit_breaker(
+                f"gemini:{model_name}", GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS
+            )
+            if not breaker.allow():
+                GEMINI_DECISIONS.inc(model_name, "breaker_open")
+                logger.warning(f'Circuit breaker open for {model_name}, skipping')
+                continue
+            
+            GEMINI_DECISIONS.inc(model_name, "primary" if index == 0 else "fallback")
+            try:
+                # Generate response
+                text = _call_model(model_name, prompt, prefix)
+            except Exception as e:
+                breaker.record_failure()
+                GEMINI_DECISIONS.inc(model_name, "error")
+                logger.error(f'Error generating paraphrase with {model_name}: {str(e)}')
+                continue
+            breaker.record_success()
             
-        return response.text
+            if not text:
+                logger.error('No response text received from Gemini API')
+                return None
+                
+            return text
+        
+        logger.error('No Gemini model available to generate paraphrase')
+        return None
         
     except Exception as e:
         logger.error(f'Error generating paraphrase: {str(e)}')
         return None
 
+def stream_prompt_results(prompt: str, prefix: Optional[PromptPrefix] = None) -> Iterator[str]:
+    """
+    Like get_prompt_results, but yields the response text in the deltas
+    Gemini streams it in.
+
+    Calls go through the same circuit breakers. The fallback model is only
+    tried if the primary fails before producing any text; a stream is not
+    hedged, since its first delta already arrives early.
+
+    Raises:
+        RuntimeError: If no model produced a response, or a stream broke off
+    """
+    api_key = get_gemini_api_key()
+    if not api_key:
+        raise RuntimeError("Failed to retrieve Gemini API key from Secret Manager")
+    _genai().configure(api_key=api_key)
+
+    for index, model_name in enumerate(_model_names()):
+        breaker = get_circuit_breaker(
+            f"gemini:{model_name}", GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS
+        )
+        if not breaker.allow():
+            GEMINI_DECISIONS.inc(model_name, "breaker_open")
+            logger.warning(f'Circuit breaker open for {model_name}, skipping')
+            continue
+
+        GEMINI_DECISIONS.inc(model_name, "primary" if index == 0 else "fallback")
+        produced = False
+        try:
+            for text in _generate_content_stream(model_name, prompt, prefix):
+                produced = True
+                yield text
+        except GeneratorExit:
+            # The consumer went away; the model was answering
+            breaker.record_success()
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            GEMINI_DECISIONS.inc(model_name, "error")
+            logger.error(f'Error streaming paraphrase with {model_name}: {str(e)}')
+            if produced:
+                raise RuntimeError("Paraphrase stream broke off") from e
+            continue
+        breaker.record_success()
+        if not produced:
+            raise RuntimeError("No response text received from Gemini API")
+        return
+
+    raise RuntimeError("No Gemini model available to generate paraphrase")
+
+def _iter_chunk_results(chunks: List[Chunk], build_prompt: Callable[[str], str], prefix: PromptPrefix) -> Iterator[Optional[str]]:
+    """
+    Per-sentence results in order, each yielded once it and every sentence
+    before it are done; None for a sentence that failed. Cached sentences
+    are not sent again.
+
+    At most PARAPHRASE_CHUNK_FAN_OUT sentences are in flight: the one this
+    thread is waiting for, which it runs itself, and the next few, queued on
+    the gemini bulkhead. Sentences the bulkhead has no room for, or that
+    have not started by the time they are needed, also run on this thread.
+    """
+    results = [_chunk_cache.get((prefix.name, chunk.text.strip())) for chunk in chunks]
+    missing = deque(index for index, result in enumerate(results) if result is None)
+    PARAPHRASE_CHUNKS.inc(prefix.name, "cache_hit", amount=len(chunks) - len(missing))
+
+    bulkhead = get_bulkhead("gemini")
+    futures: Dict[int, Future] = {}
+
+    def fan_out():
+        while missing and len(futures) < PARAPHRASE_CHUNK_FAN_OUT - 1:
+            index = missing[0]
+            try:
+                futures[index] = bulkhead.submit(get_prompt_results, build_prompt(chunks[index].text), prefix)
+            except BulkheadFullError:
+                return
+            missing.popleft()
+
+    try:
+        for index, chunk in enumerate(chunks):
+            if results[index] is not None:
+                yield results[index]
+                continue
+            if missing and missing[0] == index:
+                missing.popleft()
+                future = None
+            else:
+                future = futures.pop(index)
+            fan_out()
+            if future is not None and not future.cancel():
+                result = future.result()
+            else:
+                # Not started: waiting could mean waiting on work queued behind this thread
+                result = get_prompt_results(build_prompt(chunk.text), prefix)
+            if not result:
+                PARAPHRASE_CHUNKS.inc(prefix.name, "failed")
+                logger.error(f'Paraphrasing sentence {index + 1} of {len(chunks)} failed')
+                yield None
+                continue
+            PARAPHRASE_CHUNKS.inc(prefix.name, "generated")
+            # Cached even if another sentence failed, so a retry only redoes that one
+            _chunk_cache.set((prefix.name, chunk.text.strip()), result)
+            yield result
+    finally:
+        # Abandoned early (e.g. a failed sentence ends a stream): drop queued sentences
+        for future in futures.values():
+            future.cancel()
+
+def paraphrase_in_chunks(text_content: str, build_prompt: Callable[[str], str], prefix: PromptPrefix) -> Optional[str]:
+    """
+    Paraphrase text one sentence at a time and stitch the results in order.
+
+    Sentences are sent to Gemini concurrently (up to
+    PARAPHRASE_CHUNK_FAN_OUT at a time), so latency follows the longest
+    sentence rather than the whole text. Each sentence's result is
+    cached on its own, so editing one sentence of a long message only
+    re-paraphrases that sentence. Sentences are paraphrased without the
+    rest of the message as context.
+
+    Args:
+        text_content (str): The text to be paraphrased
+        build_prompt (Callable[[str], str]): Per-request prompt builder for one sentence
+        prefix (PromptPrefix): Fixed instructions for this kind of paraphrase
+
+    Returns:
+        Optional[str]: The stitched paraphrase, or None if any sentence failed
+    """
+    chunks = split_sentences(text_content)
+    results = list(_iter_chunk_results(chunks, build_prompt, prefix))
+    if any(result is None for result in results):
+        return None
+    return stitch(chunks, results)
+
+def _chunks_for(text_content: str) -> Optional[List[Chunk]]:
+    """Sentences to paraphrase separately, or None to send the text as one prompt."""
+    if PARAPHRASE_CHUNKING and len(text_content) >= PARAPHRASE_CHUNK_MIN_CHARS:
+        chunks = split_sentences(text_content)
+        if len(chunks) > 1:
+            return chunks
+    return None
+
+def paraphrase_call_count(text_content: str, prefix: PromptPrefix) -> int:
+    """
+    Gemini calls a paraphrase of the text would make: one per sentence not
+    in the chunk cache when the text is chunked, otherwise one.
+    """
+    chunks = _chunks_for(text_content)
+    if chunks is None:
+        return 1
+    return sum(1 for chunk in chunks if _chunk_cache.get((prefix.name, chunk.text.strip())) is None)
+
+def _paraphrase(text_content: str, build_prompt: Callable[[str], str], prefix: PromptPrefix) -> Optional[str]:
+    """Paraphrase as one prompt, or sentence by sentence for long texts when chunking is on."""
+    if _chunks_for(text_content) is not None:
+        return paraphrase_in_chunks(text_content, build_prompt, prefix)
+    return get_prompt_results(build_prompt(text_content), prefix)
+
+def _stream_paraphrase(text_content: str, build_prompt: Callable[[str], str], prefix: PromptPrefix) -> Iterator[str]:
+    chunks = _chunks_for(text_content)
+    if chunks is None:
+        yield from stream_prompt_results(build_prompt(text_content), prefix)
+        return
+    for chunk, result in zip(chunks, _iter_chunk_results(chunks, build_prompt, prefix)):
+        if result is None:
+            raise RuntimeError("Failed to generate paraphrase")
+        yield result.strip() + joiner(chunk.separator)
+
+def _validate_length(text_content: str):
+    content_length = len(text_content.strip())
+    if content_length < 1:
+        raise ValueError("Text content is too short. Minimum length is 1 character.")
+    if content_length > 1000:
+        raise ValueError("Text content is too long. Maximum length is 1,000 characters.")
+
+def _incoming_fast_path(text_content: str) -> Optional[str]:
+    """Literal answer from the idiom lexicon, if the text is only idioms."""
+    if not IDIOM_FAST_PATH:
+        return None
+    matches = find_idioms(text_content)
+    answer = literal_answer(text_content, matches)
+    if answer is not None:
+        IDIOM_LOOKUPS.inc("answered")
+        return answer
+    IDIOM_LOOKUPS.inc("hinted" if matches else "no_match")
+    return None
+
 def get_outgoing_paraphrase(text_content: str) -> Optional[str]:
     """
     Generate a more conversational paraphrase for the given text using the Gemini API.
@@ -128,19 +607,18 @@ def get_outgoing_paraphrase(text_content: str) -> Optional[str]:
         ValueError: If text content length is invalid
     """
     # Validate text content length
-    content_length = len(text_content.strip())
-    if content_length < 1:
-        raise ValueError("Text content is too short. Minimum length is 1 character.")
-    if content_length > 1000:
-        raise ValueError("Text content is too long. Maximum length is 1,000 characters.")
+    _validate_length(text_content)
     
-    prompt = get_outgoing_paraphrase_prompt(text_content)
-    return get_prompt_results(prompt)
+    return _paraphrase(text_content, get_outgoing_paraphrase_prompt, OUTGOING_PARAPHRASE_PREFIX)
 
 def get_incoming_paraphrase(text_content: str) -> Optional[str]:
     """
     Generate a simplified, literal paraphrase for the given text using the Gemini API.
     This is a convenience function that combines get_incoming_paraphrase_prompt and get_prompt_results.
+
+    Short texts made up only of idioms from the local lexicon are answered
+    without calling Gemini; for other texts, the meanings of any idioms found
+    are passed to the model as hints.
     
     Args:
         text_content (str): The text to be paraphrased (1-1000 characters)
@@ -152,11 +630,38 @@ def get_incoming_paraphrase(text_content: str) -> Optional[str]:
         ValueError: If text content length is invalid
     """
     # Validate text content length
-    content_length = len(text_content.strip())
-    if content_length < 1:
-        raise ValueError("Text content is too short. Minimum length is 1 character.")
-    if content_length > 1000:
-        raise ValueError("Text content is too long. Maximum length is 1,000 characters.")
+    _validate_length(text_content)
     
-    prompt = get_incoming_paraphrase_prompt(text_content)
-    return get_prompt_results(prompt) 
\ No newline at end of file
+    answer = _incoming_fast_path(text_content)
+    if answer is not None:
+        return answer
+    return _paraphrase(text_content, _incoming_prompt_with_hints, INCOMING_PARAPHRASE_PREFIX)
+
+def stream_outgoing_paraphrase(text_content: str) -> Iterator[str]:
+    """
+    Like get_outgoing_paraphrase, but yields the paraphrase in pieces: one
+    per sentence, in order, when the text is chunked, otherwise the deltas
+    Gemini streams. Concatenating the pieces gives the full paraphrase.
+
+    Raises:
+        ValueError: If text content length is invalid (on the first next())
+        RuntimeError: If the paraphrase (or one of its sentences) failed
+    """
+    _validate_length(text_content)
+    yield from _stream_paraphrase(text_content, get_outgoing_paraphrase_prompt, OUTGOING_PARAPHRASE_PREFIX)
+
+def stream_incoming_paraphrase(text_content: str) -> Iterator[str]:
+    """
+    Like get_incoming_paraphrase, but yields the paraphrase in pieces (see
+    stream_outgoing_paraphrase). Idiom-only texts are answered in one piece.
+
+    Raises:
+        ValueError: If text content length is invalid (on the first next())
+        RuntimeError: If the paraphrase (or one of its sentences) failed
+    """
+    _validate_length(text_content)
+    answer = _incoming_fast_path(text_content)
+    if answer is not None:
+        yield answer
+        return
+    yield from _stream_paraphrase(text_content, _incoming_prompt_with_hints, INCOMING_PARAPHRASE_PREFIX)
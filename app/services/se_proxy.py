@@ -0,0 +1,132 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Hop-by-hop headers (RFC 9110 7.6.1) apply to a single connection and must
+# not be forwarded. Host is set by the client for the upstream connection.
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+})
+
+PROXY_TIMEOUT_SECONDS = float(os.getenv("SE_PROXY_TIMEOUT_SECONDS", "30"))
+PROXY_MAX_CONNECTIONS = int(os.getenv("SE_PROXY_MAX_CONNECTIONS", "100"))
+
+_client = None
+_client_loop = None
+
+def _get_client():
+    """
+    Shared upstream client, so connections to the text-log server are reused.
+    Its pool belongs to one event loop; a new loop (e.g. a new worker or test
+    client) gets a fresh client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        import httpx
+        _client = httpx.AsyncClient(
+            timeout=PROXY_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=PROXY_MAX_CONNECTIONS),
+        )
+        _client_loop = loop
+    return _client
+
+async def close_proxy_client():
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+def filter_headers(headers) -> Dict[str, str]:
+    """
+    Drop hop-by-hop headers, including any named in the Connection header.
+
+    Args:
+        headers: Incoming or upstream headers (any mapping of name -> value)
+
+    Returns:
+        Dict[str, str]: Headers safe to forward
+    """
+    connection_tokens = {
+        token.strip().lower()
+        for name, value in headers.items()
+        if name.lower() == "connection"
+        for token in value.split(",")
+        if token.strip()
+    }
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in connection_tokens
+    }
+
+async def post_json(url: str, payload: Dict, headers: Optional[Dict[str, str]] = None):
+    """
+    POST a JSON body upstream over the shared client and read the whole reply.
+
+    Returns:
+        httpx.Response: The upstream response, body already read
+    """
+    return await _get_client().post(url, json=payload, headers=headers)
+
+async def proxy_request(request: Request, url: str, extra_headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Forward a request to ``url`` and stream the upstream reply back.
+
+    The request body is streamed to the upstream and the response body is
+    passed through as raw bytes (still compressed, if it was), so nothing
+    is parsed or buffered here. Status and end-to-end headers are kept.
+
+    Args:
+        request (Request): The incoming request
+        url (str): Full upstream URL, including any query string
+        extra_headers (Dict[str, str], optional): Headers to add or override
+
+    Returns:
+        StreamingResponse: The upstream response; the upstream connection is
+        released once the body has been sent
+    """
+    headers = filter_headers(request.headers)
+    if extra_headers:
+        headers.update(extra_headers)
+
+    client = _get_client()
+    has_body = request.method not in ("GET", "HEAD")
+    upstream_request = client.build_request(
+        request.method,
+        url,
+        headers=headers,
+        content=request.stream() if has_body else None,
+    )
+    upstream = await client.send(upstream_request, stream=True)
+
+    response = StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        background=BackgroundTask(upstream.aclose),
+    )
+    # Keep repeated headers (e.g. Set-Cookie) as separate lines
+    forwarded = filter_headers(upstream.headers)
+    response.raw_headers = [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in upstream.headers.multi_items()
+        if name in forwarded
+    ]
+    return response
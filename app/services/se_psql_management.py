@@ -1,41 +1,104 @@
 import os
-import sys
-import psycopg2
+import threading
 from datetime import datetime
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from app.config.cloud_config import get_psql_connection_string
+from app.config.cloud_config import LazySingleton, get_psql_connection_string, get_psql_replica_connection_strings
+from app.services.se_metrics import time_upstream
+from app.services.se_psql_pool import ConnectionPool
+from app.services.se_psql_routing import ReadRouter, RecentWrites, WRITE_POSITION_QUERY
+from app.services.se_psql_statements import (
+    TEXTLOG_INSERT,
+    TEXTLOG_LATEST,
+    TEXTLOG_LATEST_MARK,
+    TEXTLOG_SESSION,
+    TEXTLOG_SESSION_BY_TYPE,
+    TEXTLOG_SESSION_BY_TYPE_MARK,
+    TEXTLOG_SESSION_MARK,
+    execute_prepared
+)
 
-# Set up logging
-log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs")
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-psql_log_file = os.path.join(log_dir, 'se_psql.log')
-
-# Create a separate logger for PostgreSQL operations
+# Separate logger for PostgreSQL operations; setup_logging() also writes
+# its records to logs/se_psql.log from the background log writer
 logger = logging.getLogger('se_psql')
 logger.setLevel(logging.INFO)
 
-# Create file handler
-file_handler = logging.FileHandler(psql_log_file)
-file_handler.setLevel(logging.INFO)
+def _psycopg2():
+    """Import psycopg2 on first use to keep cold starts fast."""
+    import psycopg2
+    return psycopg2
+
+# One pool per server (primary and each replica), keyed by connection string
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+# Connections inherited across fork: closing them in the child would end the
+# parent's server sessions, so they are only kept from being collected
+_inherited_pools: List[ConnectionPool] = []
+
+def _connection(dsn: str):
+    """A pooled connection to ``dsn``; commits on success, rolls back on error."""
+    pool = _pools.get(dsn)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(dsn, ConnectionPool(dsn, lambda dsn: _psycopg2().connect(dsn)))
+    return pool.connection()
+
+def primary_connection():
+    """A pooled connection to the primary; commits on success, rolls back on error (or when closed early)."""
+    return _connection(get_psql_connection_string())
+
+def _reset_after_fork():
+    """Pooled connections belong to the parent; forked workers open their own."""
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
-# Create console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+# Sessions that just wrote; their reads must not come from a lagging replica
+recent_text_log_writes = RecentWrites()
 
-# Create formatter
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
+def _build_read_router() -> ReadRouter:
+    return ReadRouter(
+        get_psql_connection_string(),
+        get_psql_replica_connection_strings(),
+        _connection,
+        recent_text_log_writes,
+    )
 
-# Add handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Routes reads to the replicas in SE_PSQL_REPLICA_DSNS / SE_PSQL_REPLICA_HOSTS
+_read_router = LazySingleton(_build_read_router, "Postgres read router")
+
+def note_text_log_write(uid: str, session_id: str):
+    """
+    Record a text log written elsewhere (e.g. through the text-log server),
+    so this process reads the session from the primary until replicas catch up.
+    Other processes rely on the read-after token returned to the client.
+    
+    Args:
+        uid (str): User ID
+        session_id (str): Session ID
+    """
+    recent_text_log_writes.note(uid, session_id)
 
-def add_text_log(uid: str, session_id: str, text_content: str, text_type: str = "others") -> bool:
+def rows_to_dicts(description, rows) -> List[Dict[str, Any]]:
+    """
+    Convert cursor rows to dicts keyed by column name.
+    
+    Args:
+        description: cursor.description of the executed query
+        rows: Rows returned by fetchall()
+        
+    Returns:
+        List[Dict[str, Any]]: One dict per row
+    """
+    columns = [desc[0] for desc in description]
+    return [dict(zip(columns, row)) for row in rows]
+
+def add_text_log(uid: str, session_id: str, text_content: str, text_type: str = "others") -> Optional[datetime]:
     """
     Add a single text log to the database.
     
@@ -46,29 +109,32 @@ def add_text_log(uid: str, session_id: str, text_content: str, text_type: str =
         text_type (str, optional): Type of text. Defaults to "others"
         
     Returns:
-        bool: True if successful, False otherwise
+        Optional[datetime]: The timestamp stored for the row, or None on failure
     """
     try:
         conn_string = get_psql_connection_string()
-        with psycopg2.connect(conn_string) as conn:
+        with time_upstream("postgres", "add_text_log"), _connection(conn_string) as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO textlog (uid, session_id, timestamp, text_type, text_content)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
+                execute_prepared(cur, TEXTLOG_INSERT, (
                     uid,
                     session_id,
                     datetime.now(),
                     text_type,
                     text_content
                 ))
+                stored_at = cur.fetchone()[0]
                 conn.commit()
-                return True
+                position = None
+                if _read_router.get().replicas:
+                    cur.execute(WRITE_POSITION_QUERY)
+                    position = cur.fetchone()[0]
+                recent_text_log_writes.note(uid, session_id, position)
+                return stored_at
     except Exception as e:
         logger.error(f"Error adding text log: {str(e)}")
-        return False
+        return None
 
-def get_session_text_logs(uid: str, session_id: str, text_type: Optional[str] = None) -> List[Dict[str, Any]]:
+def get_session_text_logs(uid: str, session_id: str, text_type: Optional[str] = None, read_after: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Get all text logs for a specific user and session.
     
@@ -76,33 +142,22 @@ def get_session_text_logs(uid: str, session_id: str, text_type: Optional[str] =
         uid (str): User ID
         session_id (str): Session ID
         text_type (str, optional): Filter by text type
+        read_after (str, optional): The client's read-after token (X-Read-After)
         
     Returns:
         List[Dict[str, Any]]: List of text log entries
     """
     try:
-        conn_string = get_psql_connection_string()
-        with psycopg2.connect(conn_string) as conn:
-            with conn.cursor() as cur:
-                query = """
-                    SELECT uid, session_id, timestamp, text_type, text_content
-                    FROM textlog
-                    WHERE uid = %s AND session_id = %s
-                """
-                params = [uid, session_id]
-                
-                if text_type:
-                    query += " AND text_type = %s"
-                    params.append(text_type)
-                
-                query += " ORDER BY timestamp ASC"
-                
-                cur.execute(query, params)
-                columns = [desc[0] for desc in cur.description]
-                results = []
-                for row in cur.fetchall():
-                    results.append(dict(zip(columns, row)))
-                return results
+        if text_type:
+            statement, params = TEXTLOG_SESSION_BY_TYPE, (uid, session_id, text_type)
+        else:
+            statement, params = TEXTLOG_SESSION, (uid, session_id)
+        
+        def fetch(cur):
+            execute_prepared(cur, statement, params)
+            return rows_to_dicts(cur.description, cur.fetchall())
+        
+        return _read_router.get().read("get_session_text_logs", fetch, uid, session_id, read_after)
     except Exception as e:
         logger.error(f"Error fetching session text logs: {str(e)}")
         return []
@@ -119,25 +174,72 @@ def get_latest_text_logs(uid: str, limit: int = 10) -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: List of text log entries
     """
     try:
-        conn_string = get_psql_connection_string()
-        with psycopg2.connect(conn_string) as conn:
-            with conn.cursor() as cur:
-                query = """
-                    SELECT uid, session_id, timestamp, text_type, text_content
-                    FROM textlog
-                    WHERE uid = %s
-                """
-                params = [uid]
-                
-                query += " ORDER BY timestamp DESC LIMIT %s"
-                params.append(limit)
-                
-                cur.execute(query, params)
-                columns = [desc[0] for desc in cur.description]
-                results = []
-                for row in cur.fetchall():
-                    results.append(dict(zip(columns, row)))
-                return results
+        return fetch_latest_text_logs(uid, limit)
     except Exception as e:
         logger.error(f"Error fetching latest text logs: {str(e)}")
         return []
+
+def fetch_latest_text_logs(uid: str, limit: int = 10, read_after: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get the latest text logs for a specific user, newest first.
+    
+    Unlike get_latest_text_logs, database errors are raised rather than
+    returned as an empty list, so callers that cache the result can tell
+    "no logs" from "no answer".
+    
+    Args:
+        uid (str): User ID
+        limit (int, optional): Number of latest logs to return. Defaults to 10
+        read_after (str, optional): The client's read-after token (X-Read-After)
+        
+    Returns:
+        List[Dict[str, Any]]: List of text log entries
+        
+    Raises:
+        Exception: Whatever the database driver raised
+    """
+    def fetch(cur):
+        execute_prepared(cur, TEXTLOG_LATEST, (uid, limit))
+        return rows_to_dicts(cur.description, cur.fetchall())
+    
+    return _read_router.get().read("get_latest_text_logs", fetch, uid, read_after=read_after)
+
+def get_text_log_high_water_mark(uid: str, session_id: Optional[str] = None, text_type: Optional[str] = None,
+                                  read_after: Optional[str] = None, limit: Optional[int] = None) -> Optional[Tuple[Any, int]]:
+    """
+    Get the newest timestamp and row count of a session's text logs, or of a user's latest ones.
+    
+    Rows are only ever appended, with the time they were written, so together
+    these change whenever the listing does and can version it for ETags.
+    For a session the count covers every matching row, which costs about as
+    much as reading the listing; for the latest-N view only the newest
+    ``limit`` rows are read, through the same index as the listing.
+    
+    Args:
+        uid (str): User ID
+        session_id (str, optional): The session, for a session listing
+        text_type (str, optional): Filter a session listing by text type
+        read_after (str, optional): The client's read-after token (X-Read-After)
+        limit (int, optional): Without a session, only consider the newest ``limit`` rows (all if None)
+        
+    Returns:
+        Optional[Tuple[Any, int]]: (latest timestamp or None, row count), or None on error
+    """
+    try:
+        if session_id and text_type:
+            statement, params = TEXTLOG_SESSION_BY_TYPE_MARK, (uid, session_id, text_type)
+        elif session_id:
+            statement, params = TEXTLOG_SESSION_MARK, (uid, session_id)
+        else:
+            # LIMIT NULL reads every row
+            statement, params = TEXTLOG_LATEST_MARK, (uid, limit)
+        
+        def fetch(cur):
+            execute_prepared(cur, statement, params)
+            latest, count = cur.fetchone()
+            return latest, count
+        
+        return _read_router.get().read("get_text_log_high_water_mark", fetch, uid, session_id, read_after)
+    except Exception as e:
+        logger.error(f"Error fetching text log high-water mark: {str(e)}")
+        return None
@@ -0,0 +1,109 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Tuple
+
+from app.services.se_metrics import Counter
+
+logger = logging.getLogger('se_psql')
+
+# Idle connections kept per server and process. Concurrency is already
+# bounded by the postgres bulkhead (se_executor), so the pool only caps
+# what it keeps open between calls.
+PSQL_POOL_MAX_IDLE = int(os.getenv("SE_PSQL_POOL_MAX_IDLE", "8"))
+# Idle connections older than this are closed rather than reused, before
+# a server or proxy idle timeout can drop them under us
+PSQL_POOL_IDLE_SECONDS = float(os.getenv("SE_PSQL_POOL_IDLE_SECONDS", "300"))
+
+PSQL_CONNECTIONS_OPENED = Counter(
+    "se_psql_connections_opened_total",
+    "Postgres connections opened by the connection pools.",
+)
+
+class ConnectionPool:
+    """
+    Reuses connections to one Postgres server across calls, so connection
+    setup and per-connection state (prepared statements) are paid once.
+
+    ``connection()`` checks out the most recently used idle connection (or
+    opens one), commits when the block succeeds and rolls back when it
+    raises. Connections that are closed or fail to roll back are dropped.
+
+    Args:
+        dsn (str): Connection string
+        connect (Callable[[str], Any]): Opens a DB-API connection, e.g. psycopg2.connect
+        max_idle (int): Idle connections kept
+        max_idle_seconds (float): Idle connections older than this are closed
+    """
+
+    def __init__(self, dsn: str, connect: Callable[[str], Any], max_idle: int = PSQL_POOL_MAX_IDLE,
+                 max_idle_seconds: float = PSQL_POOL_IDLE_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.dsn = dsn
+        self.max_idle = max_idle
+        self.max_idle_seconds = max_idle_seconds
+        self._connect = connect
+        self._clock = clock
+        self._idle: List[Tuple[Any, float]] = []  # (connection, returned at), newest last
+        self._lock = threading.Lock()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                _close(conn)
+            raise
+        finally:
+            self._checkin(conn)
+
+    def _checkout(self) -> Any:
+        stale = []
+        conn = None
+        with self._lock:
+            now = self._clock()
+            while self._idle:
+                candidate, returned_at = self._idle.pop()
+                if now - returned_at >= self.max_idle_seconds or getattr(candidate, "closed", False):
+                    stale.append(candidate)
+                    continue
+                conn = candidate
+                break
+        for candidate in stale:
+            _close(candidate)
+        if conn is None:
+            conn = self._connect(self.dsn)
+            PSQL_CONNECTIONS_OPENED.inc()
+        return conn
+
+    def _checkin(self, conn: Any):
+        if getattr(conn, "closed", False):
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((conn, self._clock()))
+                return
+        _close(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close(conn)
+
+def _close(conn: Any):
+    try:
+        conn.close()
+    except Exception as e:
+        logger.warning(f"Error closing Postgres connection: {str(e)}")
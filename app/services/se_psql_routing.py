@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, List, Optional
+
+from app.services.se_chunking import TTLCache
+from app.services.se_metrics import Counter, time_upstream
+from app.services.se_resilience import CircuitBreaker
+
+logger = logging.getLogger('se_psql')
+
+# Replicas measured further behind the primary than this get no reads
+PSQL_REPLICA_MAX_LAG_SECONDS = float(os.getenv("SE_PSQL_REPLICA_MAX_LAG_SECONDS", "5"))
+# How often a replica's lag is re-measured, on the connection serving a read
+PSQL_REPLICA_CHECK_SECONDS = float(os.getenv("SE_PSQL_REPLICA_CHECK_SECONDS", "10"))
+# After a write, reads of that session (and the user's latest logs) go to the
+# primary for this long, unless a replica has provably replayed the write.
+# Keep it above max lag + check interval, after which any replica still in
+# rotation has caught up.
+PSQL_READ_YOUR_WRITES_SECONDS = float(os.getenv("SE_PSQL_READ_YOUR_WRITES_SECONDS", "30"))
+PSQL_READ_YOUR_WRITES_ENTRIES = 50000
+# Reads without a read-after token go to the primary. The pins above are per
+# process, so with several workers (SE_WORKER_PROCESSES, set by app.serve)
+# a read may land on a worker that never saw the session's write.
+PSQL_REQUIRE_READ_AFTER = os.getenv(
+    "SE_PSQL_REQUIRE_READ_AFTER", "1" if int(os.getenv("SE_WORKER_PROCESSES", "1")) > 1 else "0"
+) == "1"
+
+# Response header on text-log writes; clients send it back on their reads
+READ_AFTER_HEADER = "X-Read-After"
+# Token of a client with no write to wait for
+NO_PENDING_WRITE = "0/0"
+
+PSQL_READS = Counter(
+    "se_psql_reads_total",
+    "Postgres reads by target (replica, primary) and reason (balanced, read_your_writes, unverified, fallback, no_replicas).",
+    ("target", "reason"),
+)
+
+# Seconds the replica is behind; 0 when it has replayed everything it
+# received, or when it is not a standby at all
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0::float8
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0::float8
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8, 'Infinity'::float8)
+    END
+"""
+# False on servers that are not standbys, so those never serve pinned reads
+REPLAYED_QUERY = "SELECT COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, false)"
+WRITE_POSITION_QUERY = "SELECT pg_current_wal_lsn()::text"
+
+# Pin for a write whose WAL position is unknown (e.g. made by another server)
+_UNKNOWN_POSITION = ""
+_SKIPPED = object()
+_LSN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+def _lsn_value(position: str) -> int:
+    high, low = position.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+def read_after_token(position: Optional[str] = None, now: Optional[float] = None) -> str:
+    """
+    The read-after token for a write: its WAL position (pg_lsn text) when
+    known, otherwise the write's wall-clock time as "t=<unix seconds>".
+
+    Args:
+        position (str, optional): The write's WAL position
+        now (float, optional): Write time; defaults to time.time()
+
+    Returns:
+        str: Value for the X-Read-After header
+    """
+    if position:
+        return position
+    return f"t={time.time() if now is None else now:.3f}"
+
+class RecentWrites:
+    """
+    Sessions that wrote in the last ``ttl`` seconds, with the write's WAL
+    position when known. A write also covers the user's latest-logs view
+    (session None). Kept per process; other workers learn of the write
+    from the client's read-after token.
+    """
+
+    def __init__(self, ttl: float = PSQL_READ_YOUR_WRITES_SECONDS, max_entries: int = PSQL_READ_YOUR_WRITES_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self._entries = TTLCache(max_entries, ttl, clock=clock)
+
+    def note(self, uid: str, session_id: str, position: Optional[str] = None):
+        """
+        Record that a session just wrote.
+
+        Args:
+            uid (str): User ID
+            session_id (str): Session ID
+            position (str, optional): The write's WAL position (pg_lsn text), if known
+        """
+        for key in ((uid, session_id), (uid, None)):
+            self._entries.set(key, position or _UNKNOWN_POSITION)
+
+    def get(self, uid: str, session_id: Optional[str] = None) -> Optional[str]:
+        """The pin for a read: None if no recent write, "" if its position is unknown."""
+        return self._entries.get((uid, session_id))
+
+class Replica:
+    """A read replica with its circuit breaker, last measured lag and reads in flight."""
+
+    def __init__(self, name: str, dsn: str):
+        self.name = name
+        self.dsn = dsn
+        self.breaker = CircuitBreaker(f"postgres-{name}", failure_threshold=3, reset_timeout=15.0)
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self.in_flight = 0
+
+class ReadRouter:
+    """
+    Send read-only queries to healthy replicas, falling back to the primary.
+
+    A read goes to the replica with the fewest reads in flight among those
+    whose breaker is closed and whose last measured lag is under
+    ``max_lag``. A replica that fails to connect or query opens its breaker
+    and the read is retried on the next one, then on the primary.
+
+    Read-your-writes: a session in ``recent_writes``, or a read carrying a
+    read-after token, only reads from a replica that has replayed the
+    write's WAL position; when the position is unknown (a time token under
+    ``read_your_writes`` seconds old, or one that does not parse) it reads
+    from the primary. With ``require_read_after``, reads without a token
+    also go to the primary, since the write may have gone through another
+    process.
+
+    Args:
+        primary_dsn (str): Primary connection string
+        replica_dsns (List[str]): Replica connection strings, possibly empty
+        connect (Callable[[str], Any]): Opens a DB-API connection, e.g. psycopg2.connect
+        recent_writes (RecentWrites): Sessions whose reads must see their writes
+        require_read_after (bool): Send reads without a read-after token to the primary
+    """
+
+    def __init__(self, primary_dsn: str, replica_dsns: List[str], connect: Callable[[str], Any],
+                 recent_writes: Optional[RecentWrites] = None, max_lag: float = PSQL_REPLICA_MAX_LAG_SECONDS,
+                 check_interval: float = PSQL_REPLICA_CHECK_SECONDS, clock: Callable[[], float] = time.monotonic,
+                 require_read_after: bool = PSQL_REQUIRE_READ_AFTER, read_your_writes: float = PSQL_READ_YOUR_WRITES_SECONDS,
+                 wall_clock: Callable[[], float] = time.time):
+        self.primary_dsn = primary_dsn
+        self.replicas = [Replica(f"replica{i}", dsn) for i, dsn in enumerate(replica_dsns)]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._connect = connect
+        self._clock = clock
+        self.recent_writes = recent_writes or RecentWrites(clock=clock)
+        self.require_read_after = require_read_after
+        self.read_your_writes = read_your_writes
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+
+    def read(self, operation: str, query: Callable[[Any], Any], uid: str, session_id: Optional[str] = None,
+             read_after: Optional[str] = None) -> Any:
+        """
+        Run ``query(cursor)`` on a replica if one may serve it, else on the primary.
+
+        Args:
+            operation (str): Operation name for metrics
+            query (Callable[[Any], Any]): Executes the statement and returns the result
+            uid (str): User ID the read is for
+            session_id (str, optional): Session the read is for; None for user-wide reads
+            read_after (str, optional): The client's read-after token (see read_after_token)
+
+        Returns:
+            Any: What ``query`` returned
+        """
+        if not self.replicas:
+            return self._on_primary(operation, query, "no_replicas")
+        pin = self.recent_writes.get(uid, session_id)
+        if read_after is None:
+            if pin is None and self.require_read_after:
+                return self._on_primary(operation, query, "unverified")
+        else:
+            pin = self._later(pin, self._token_pin(read_after))
+        if pin == _UNKNOWN_POSITION:
+            return self._on_primary(operation, query, "read_your_writes")
+        for replica in self._candidates():
+            if not replica.breaker.allow():
+                continue
+            result = self._on_replica(replica, operation, query, pin)
+            if result is not _SKIPPED:
+                PSQL_READS.inc("replica", "balanced")
+                return result
+        return self._on_primary(operation, query, "read_your_writes" if pin else "fallback")
+
+    def _token_pin(self, token: str) -> Optional[str]:
+        """The pin a read-after token asks for: None, a WAL position, or unknown."""
+        token = token.strip()
+        if _LSN.match(token):
+            return None if _lsn_value(token) == 0 else token
+        if token.startswith("t="):
+            try:
+                written_at = float(token[2:])
+            except ValueError:
+                return _UNKNOWN_POSITION
+            return _UNKNOWN_POSITION if self._wall_clock() - written_at < self.read_your_writes else None
+        return _UNKNOWN_POSITION  # Can't be verified
+
+    @staticmethod
+    def _later(pin: Optional[str], other: Optional[str]) -> Optional[str]:
+        """The stricter of two pins."""
+        if pin is None or other is None:
+            return other if pin is None else pin
+        if _UNKNOWN_POSITION in (pin, other):
+            return _UNKNOWN_POSITION
+        return pin if _lsn_value(pin) >= _lsn_value(other) else other
+
+    def _candidates(self) -> List[Replica]:
+        """Replicas not known to lag, least busy first, ties in random order."""
+        now = self._clock()
+        with self._lock:
+            usable = [
+                replica for replica in self.replicas
+                if replica.lag is None or replica.lag <= self.max_lag or now - replica.checked_at >= self.check_interval
+            ]
+            return sorted(usable, key=lambda replica: (replica.in_flight, random.random()))
+
+    def _on_primary(self, operation: str, query: Callable[[Any], Any], reason: str) -> Any:
+        PSQL_READS.inc("primary", reason)
+        with time_upstream("postgres", operation), self._connect(self.primary_dsn) as conn:
+            with conn.cursor() as cur:
+                return query(cur)
+
+    def _on_replica(self, replica: Replica, operation: str, query: Callable[[Any], Any], pin: Optional[str]) -> Any:
+        with self._lock:
+            replica.in_flight += 1
+        try:
+            with time_upstream("postgres", operation), self._connect(replica.dsn) as conn:
+                with conn.cursor() as cur:
+                    if self._clock() - replica.checked_at >= self.check_interval:
+                        cur.execute(REPLICA_LAG_QUERY)
+                        lag = float(cur.fetchone()[0])
+                        with self._lock:
+                            replica.lag = lag
+                            replica.checked_at = self._clock()
+                        if lag > self.max_lag:
+                            logger.warning(f"Postgres {replica.name} is {lag:.1f}s behind, skipping it")
+                    if replica.lag is not None and replica.lag > self.max_lag:
+                        result = _SKIPPED
+                    elif pin:
+                        cur.execute(REPLAYED_QUERY, (pin,))
+                        result = query(cur) if cur.fetchone()[0] else _SKIPPED
+                    else:
+                        result = query(cur)
+            replica.breaker.record_success()
+            return result
+        except Exception as e:
+            replica.breaker.record_failure()
+            logger.warning(f"Read from Postgres {replica.name} failed, trying elsewhere: {str(e)}")
+            return _SKIPPED
+        finally:
+            with self._lock:
+                replica.in_flight -= 1
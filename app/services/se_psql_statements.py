@@ -0,0 +1,136 @@
+import logging
+import threading
+import weakref
+from typing import Any, NamedTuple, Sequence
+
+from app.services.se_metrics import Counter
+
+logger = logging.getLogger('se_psql')
+
+class Statement(NamedTuple):
+    """A server-side prepared statement: name, parameter types and SQL with $n placeholders."""
+    name: str
+    types: str
+    sql: str
+
+TEXTLOG_INSERT = Statement(
+    "textlog_insert",
+    "text, text, timestamp, text, text",
+    """
+        INSERT INTO textlog (uid, session_id, timestamp, text_type, text_content)
+        VALUES ($1, $2, $3, $4, $5)
+        RETURNING timestamp
+    """,
+)
+TEXTLOG_SESSION = Statement(
+    "textlog_session",
+    "text, text",
+    """
+        SELECT uid, session_id, timestamp, text_type, text_content
+        FROM textlog
+        WHERE uid = $1 AND session_id = $2
+        ORDER BY timestamp ASC
+    """,
+)
+TEXTLOG_SESSION_BY_TYPE = Statement(
+    "textlog_session_by_type",
+    "text, text, text",
+    """
+        SELECT uid, session_id, timestamp, text_type, text_content
+        FROM textlog
+        WHERE uid = $1 AND session_id = $2 AND text_type = $3
+        ORDER BY timestamp ASC
+    """,
+)
+TEXTLOG_LATEST = Statement(
+    "textlog_latest",
+    "text, integer",
+    """
+        SELECT uid, session_id, timestamp, text_type, text_content
+        FROM textlog
+        WHERE uid = $1
+        ORDER BY timestamp DESC
+        LIMIT $2
+    """,
+)
+
+# High-water marks (newest timestamp, row count) of the listings above, for ETags
+TEXTLOG_SESSION_MARK = Statement(
+    "textlog_session_mark",
+    "text, text",
+    """
+        SELECT MAX(timestamp), COUNT(*)
+        FROM textlog
+        WHERE uid = $1 AND session_id = $2
+    """,
+)
+TEXTLOG_SESSION_BY_TYPE_MARK = Statement(
+    "textlog_session_by_type_mark",
+    "text, text, text",
+    """
+        SELECT MAX(timestamp), COUNT(*)
+        FROM textlog
+        WHERE uid = $1 AND session_id = $2 AND text_type = $3
+    """,
+)
+TEXTLOG_LATEST_MARK = Statement(
+    "textlog_latest_mark",
+    "text, integer",
+    """
+        SELECT MAX(timestamp), COUNT(*)
+        FROM (
+            SELECT timestamp
+            FROM textlog
+            WHERE uid = $1
+            ORDER BY timestamp DESC
+            LIMIT $2
+        ) latest
+    """,
+)
+
+TEXTLOG_STATEMENTS = (
+    TEXTLOG_INSERT, TEXTLOG_SESSION, TEXTLOG_SESSION_BY_TYPE, TEXTLOG_LATEST,
+    TEXTLOG_SESSION_MARK, TEXTLOG_SESSION_BY_TYPE_MARK, TEXTLOG_LATEST_MARK,
+)
+
+PREPARED_STATEMENTS = Counter(
+    "se_psql_prepared_statements_total",
+    "Prepared textlog statement executions by statement and whether the connection had to prepare it first (prepared, reused).",
+    ("statement", "outcome"),
+)
+
+# Statement names prepared on each live connection. Prepared statements
+# belong to the server session, so they last as long as the pooled
+# connection does; entries vanish with the connection object.
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+def prepare_sql(statement: Statement) -> str:
+    return f"PREPARE {statement.name} ({statement.types}) AS {statement.sql}"
+
+def execute_sql(statement: Statement) -> str:
+    placeholders = ", ".join(["%s"] * len(statement.types.split(",")))
+    return f"EXECUTE {statement.name} ({placeholders})"
+
+def execute_prepared(cur, statement: Statement, params: Sequence[Any]):
+    """
+    Execute a registered statement, preparing it on the cursor's connection first if needed.
+
+    Postgres parses and plans the statement once per connection; after that
+    each call sends only ``EXECUTE name (...)``, and after a few executions
+    the server switches to a cached generic plan.
+
+    Args:
+        cur: Cursor of a (pooled) connection
+        statement (Statement): One of TEXTLOG_STATEMENTS
+        params (Sequence[Any]): Parameter values, in $n order
+    """
+    with _prepared_lock:
+        names = _prepared.setdefault(cur.connection, set())
+    if statement.name in names:
+        PREPARED_STATEMENTS.inc(statement.name, "reused")
+    else:
+        cur.execute(prepare_sql(statement))
+        names.add(statement.name)
+        PREPARED_STATEMENTS.inc(statement.name, "prepared")
+    cur.execute(execute_sql(statement), params)
@@ -0,0 +1,193 @@
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls pass; ``failure_threshold`` failures in a row open it
+    open      -> calls are refused until ``reset_timeout`` seconds have passed
+    half_open -> one trial call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: allow a single trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit breaker {self.name} opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+class LatencyTracker:
+    """Sliding window of recent latencies used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the given percentile, or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+class HedgedCaller:
+    """
+    Run a blocking call and, if it has not finished after ``hedge_after``
+    seconds, start an identical second attempt and take whichever finishes
+    first with a result.
+
+    The losing attempt cannot be interrupted (the SDKs are blocking); it
+    finishes in the background and its result is discarded. ``max_hedges``
+    caps how many hedge attempts may be outstanding at once, so a slow
+    upstream is not hit with double load.
+
+    Attempts run on ``max_workers`` threads and are never queued there:
+    when every thread is busy (e.g. with losing attempts still running),
+    the call is made on the caller's thread without a hedge or deadline. So
+    at most ``max_workers`` attempts run besides the callers' own threads,
+    which their bulkhead bounds.
+    """
+
+    def __init__(self, name: str, max_workers: int = 32, max_hedges: int = 4):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+        self._worker_slots = threading.BoundedSemaphore(max_workers)
+        self._hedge_slots = threading.BoundedSemaphore(max_hedges)
+
+    def _submit(self, func: Callable[[], Any]):
+        """Start an attempt on a free thread; None if there is none."""
+        if not self._worker_slots.acquire(blocking=False):
+            return None
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, func)
+        except BaseException:
+            self._worker_slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._worker_slots.release())
+        return future
+
+    def call(self, func: Callable[[], Any], hedge_after: Optional[float], timeout: float) -> Tuple[Any, str, bool]:
+        """
+        Args:
+            func (Callable[[], Any]): Blocking call to make
+            hedge_after (Optional[float]): Seconds to wait before hedging; None disables hedging
+            timeout (float): Overall deadline in seconds
+
+        Returns:
+            Tuple[Any, str, bool]: The result, which attempt produced it
+            ("primary" or "hedge"), and whether a hedge was sent
+
+        Raises:
+            TimeoutError: If no attempt finished within ``timeout``
+            Exception: The error of the last attempt if every attempt failed
+        """
+        deadline = time.monotonic() + timeout
+        primary = self._submit(func)
+        if primary is None:
+            logger.debug(f"No free {self.name} hedging thread, calling inline")
+            return func(), "primary", False
+        attempts = {primary: "primary"}
+
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait([primary], timeout=hedge_after)
+            if not done and self._hedge_slots.acquire(blocking=False):
+                hedge = self._submit(func)
+                if hedge is None:
+                    self._hedge_slots.release()
+                else:
+                    hedge.add_done_callback(lambda _f: self._hedge_slots.release())
+                    attempts[hedge] = "hedge"
+
+        pending = set(attempts)
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result(), attempts[future], len(attempts) > 1
+                last_error = error
+        if pending:
+            raise FutureTimeoutError(f"{self.name} call timed out after {timeout:.1f}s")
+        raise last_error
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """Get (or create) the shared circuit breaker for a name, e.g. a model."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return breaker
@@ -0,0 +1,86 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Union
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from app.schemas.se_user import SEUserResponse
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+def _default(obj: Any):
+    """Encode types orjson (or json) does not handle natively, e.g. Firestore's datetime subclass."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact JSON bytes.
+
+    Datetimes are written in ISO 8601, matching FastAPI's default encoder.
+
+    Args:
+        content (Any): Dicts, lists and scalars, possibly containing datetimes
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: renders with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# Validation and serialization schema for SEUserResponse, built once
+_user_response_adapter = TypeAdapter(SEUserResponse)
+
+def dump_user_response(user_data: Union[SEUserResponse, Dict[str, Any]]) -> bytes:
+    """
+    Validate a user as SEUserResponse and serialize it in one step,
+    skipping FastAPI's response_model round trip through jsonable_encoder.
+
+    Args:
+        user_data (Union[SEUserResponse, Dict[str, Any]]): A model (used as is) or a raw user document
+
+    Returns:
+        bytes: The SEUserResponse as JSON
+
+    Raises:
+        ValidationError: If the document does not match SEUserResponse
+    """
+    user = _user_response_adapter.validate_python(user_data)
+    return _user_response_adapter.dump_json(user)
+
+def json_bytes_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response for an already serialized JSON body."""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def user_response(user_data: Union[SEUserResponse, Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response for a user document, serialized by dump_user_response."""
+    return json_bytes_response(dump_user_response(user_data), headers)
+
+def dump_text_log_rows(rows: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Serialize text-log rows (uid, session_id, timestamp, text_type, text_content).
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): Rows as returned by se_psql_management
+
+    Returns:
+        bytes: A JSON array
+    """
+    return dumps(rows if isinstance(rows, list) else list(rows))
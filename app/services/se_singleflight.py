@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.services.se_metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "se_singleflight_calls_total",
+    "Upstream calls actually started by a single-flight group.",
+    ("group",),
+)
+SINGLEFLIGHT_COALESCED = Counter(
+    "se_singleflight_coalesced_total",
+    "Calls that joined an identical in-flight call instead of starting their own.",
+    ("group",),
+)
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same result (or error). Nothing is cached once
+    the call finishes.
+
+    The shared call runs as its own task, so one caller disconnecting does
+    not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run ``await func(*args, **kwargs)``, sharing it with concurrent callers
+        that use the same key.
+
+        Args:
+            key (Hashable): Identity of the call, e.g. a uid
+            func (Callable[..., Awaitable[Any]]): Async function doing the upstream call
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            SINGLEFLIGHT_COALESCED.inc(self.name)
+        else:
+            SINGLEFLIGHT_CALLS.inc(self.name)
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Single-flight {self.name} call failed: {task.exception()}")
@@ -0,0 +1,200 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from app.services.se_metrics import Counter, Gauge
+from app.services.se_write_stamps import WriteStamps
+
+logger = logging.getLogger(__name__)
+
+# Rows kept per user; latest_text_logs with a larger limit goes upstream
+# unless the user has fewer rows than this in total
+LATEST_TEXT_LOG_CAPACITY = int(os.getenv("SE_LATEST_TEXT_LOG_CAPACITY", "50"))
+# Estimated bytes across all users; least recently read users are evicted past it
+LATEST_TEXT_LOG_MAX_BYTES = int(os.getenv("SE_LATEST_TEXT_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+# Buffers are refilled from the database this often, since writes made on
+# other servers (or straight to the text-log server) are not seen here;
+# writes through the other workers are caught by the write stamps. Keep it
+# at most the clients' poll interval; 0 disables
+LATEST_TEXT_LOG_REFRESH_SECONDS = float(os.getenv("SE_LATEST_TEXT_LOG_REFRESH_SECONDS", "5"))
+# Dict, keys, timestamp and short strings of one row, on top of its text
+ROW_OVERHEAD_BYTES = 600
+
+LATEST_TEXT_LOG_READS = Counter(
+    "se_latest_text_log_reads_total",
+    "latest_text_logs requests by source (memory, database, proxy).",
+    ("source",),
+)
+LATEST_TEXT_LOG_BYTES = Gauge(
+    "se_latest_text_log_buffer_bytes",
+    "Estimated memory held by the per-user latest text log buffers.",
+)
+LATEST_TEXT_LOG_USERS = Gauge(
+    "se_latest_text_log_buffer_users",
+    "Users with a latest text log buffer.",
+)
+
+def _row_bytes(row: Dict[str, Any]) -> int:
+    return ROW_OVERHEAD_BYTES + len(row.get("text_content") or "")
+
+class _Ring:
+    __slots__ = ("rows", "bytes", "complete", "filled_at", "stamp")
+
+    def __init__(self, capacity: int, filled_at: float, stamp: int):
+        self.rows: deque = deque(maxlen=capacity)  # Oldest first
+        self.bytes = 0
+        self.complete = False  # Holds every row the user has
+        self.filled_at = filled_at
+        self.stamp = stamp  # The user's write stamp the rows reflect
+
+class LatestTextLogBuffer:
+    """
+    Per-user ring buffers of the newest text logs, serving latest_text_logs
+    polls from memory.
+
+    A user's buffer is filled from the database on first read (``begin_fill``
+    then ``fill``) and appended to on every write made through this process.
+    Every write also bumps the user's stamp in ``stamps``, which the other
+    workers share: a buffer whose stamp moved without this process appending
+    the row (a write through another worker) is dropped and refilled, as is
+    a fill that a write raced with, since the rows read may predate it.
+    Users are kept in least-recently-read order and evicted once the
+    estimated size of all buffers passes ``max_bytes``.
+
+    Args:
+        capacity (int): Rows kept per user
+        max_bytes (int): Estimated size cap across all users
+        refresh_seconds (float): Buffers older than this are refilled; 0 never
+        stamps (WriteStamps, optional): Write stamps shared with the other workers
+    """
+
+    def __init__(self, capacity: int = LATEST_TEXT_LOG_CAPACITY, max_bytes: int = LATEST_TEXT_LOG_MAX_BYTES,
+                 refresh_seconds: float = LATEST_TEXT_LOG_REFRESH_SECONDS, clock=time.monotonic,
+                 stamps: Optional[WriteStamps] = None):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._stamps = stamps or WriteStamps()
+        self._users: "OrderedDict[str, _Ring]" = OrderedDict()
+        self._bytes = 0
+        self._filling: Dict[str, int] = {}  # uid -> write stamp when the fill began
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, uid: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        The user's ``limit`` newest rows, newest first, or None if they are
+        not buffered (or the buffer is due for a refresh, or another worker
+        wrote for the user).
+        """
+        with self._lock:
+            ring = self._users.get(uid)
+            if ring is None:
+                return None
+            if self._stamps.current(uid) != ring.stamp or (
+                    self.refresh_seconds and self._clock() - ring.filled_at >= self.refresh_seconds):
+                self._drop(uid)
+                return None
+            if limit > self.capacity and not ring.complete:
+                return None
+            self._users.move_to_end(uid)
+            rows = ring.rows
+            return [rows[-1 - i] for i in range(min(limit, len(rows)))]
+
+    def begin_fill(self, uid: str):
+        """Mark a database read for the user as started."""
+        with self._lock:
+            self._filling[uid] = self._stamps.current(uid)
+
+    def cancel_fill(self, uid: str):
+        with self._lock:
+            self._filling.pop(uid, None)
+
+    def fill(self, uid: str, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Replace the user's buffer with rows read from the database.
+
+        Args:
+            uid (str): User ID
+            rows (List[Dict[str, Any]]): Up to ``capacity`` newest rows, newest first
+
+        Returns:
+            bool: False if a write arrived since ``begin_fill`` and the rows were not kept
+        """
+        with self._lock:
+            stamp = self._filling.pop(uid, None)
+            if stamp is None or stamp != self._stamps.current(uid):
+                return False
+            ring = _Ring(self.capacity, self._clock(), stamp)
+            for row in reversed(rows[:self.capacity]):
+                ring.rows.append(row)
+                ring.bytes += _row_bytes(row)
+            ring.complete = len(rows) < self.capacity
+            self._drop(uid)
+            self._users[uid] = ring
+            self._bytes += ring.bytes
+            self._evict()
+            return True
+
+    def append(self, uid: str, row: Dict[str, Any]):
+        """Add a row the user just wrote; users without a buffer are left for the next fill."""
+        with self._lock:
+            before, after = self._stamps.bump(uid)
+            ring = self._users.get(uid)
+            if ring is None:
+                return
+            if ring.stamp != before:  # Missed another worker's write
+                self._drop(uid)
+                return
+            ring.stamp = after
+            if len(ring.rows) == self.capacity:
+                dropped = _row_bytes(ring.rows[0])
+                ring.bytes -= dropped
+                self._bytes -= dropped
+                ring.complete = False
+            ring.rows.append(row)
+            added = _row_bytes(row)
+            ring.bytes += added
+            self._bytes += added
+            self._users.move_to_end(uid)
+            self._evict()
+
+    def forget(self, uid: str):
+        """Drop the user's buffer, e.g. after a write whose row is not known here."""
+        with self._lock:
+            self._stamps.bump(uid)
+            self._drop(uid)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._filling.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def _drop(self, uid: str):
+        ring = self._users.pop(uid, None)
+        if ring is not None:
+            self._bytes -= ring.bytes
+        self._update_gauges()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._users:
+            uid, ring = self._users.popitem(last=False)
+            self._bytes -= ring.bytes
+            logger.debug(f"Evicted latest text log buffer of {uid}")
+        self._update_gauges()
+
+    def _update_gauges(self):
+        LATEST_TEXT_LOG_BYTES.set(value=self._bytes)
+        LATEST_TEXT_LOG_USERS.set(value=len(self._users))
@@ -0,0 +1,304 @@
+import os
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.se_metrics import time_upstream
+from app.services.se_psql_management import primary_connection
+
+logger = logging.getLogger('se_psql')
+
+TEXT_LOG_COLUMNS = ("uid", "session_id", "timestamp", "text_type", "text_content")
+TIMESTAMP_INDEX = TEXT_LOG_COLUMNS.index("timestamp")
+
+DEFAULT_BATCH_SIZE = int(os.getenv("SE_EXPORT_BATCH_SIZE", "50000"))
+# Rows are stamped by the writing server before they commit, so a row can
+# become visible after rows with later timestamps were exported. Exports
+# stop this far behind now and resume from there; keep it above the longest
+# insert transaction plus the clock skew between the servers writing logs.
+EXPORT_SAFETY_LAG_SECONDS = float(os.getenv("SE_EXPORT_SAFETY_LAG_SECONDS", "300"))
+WATERMARK_FILE = "_watermark.json"
+FORMATS = {
+    # format: (file extension, compression)
+    "parquet": ("parquet", "zstd"),
+    "arrow": ("arrow", "zstd"),
+}
+
+def _pyarrow():
+    """Import pyarrow on first use; it is only needed for exports (poetry install -E export)."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Text log export needs the pyarrow package (poetry install -E export)") from e
+    return pyarrow
+
+def fetch_text_log_batches(since: Optional[datetime] = None, until: Optional[datetime] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Stream textlog rows in timestamp order, ``batch_size`` rows at a time.
+
+    Uses a server-side cursor on a pooled primary connection, so only one
+    batch is held in memory. Closing the generator ends the cursor's
+    transaction and returns the connection to the pool.
+
+    Args:
+        since (datetime, optional): Export rows strictly after this timestamp (the watermark)
+        until (datetime, optional): Export rows at or before this timestamp
+
+    Yields:
+        List[tuple]: Rows in TEXT_LOG_COLUMNS order
+    """
+    query = """
+        SELECT uid, session_id, timestamp, text_type, text_content
+        FROM textlog
+        WHERE TRUE
+    """
+    params: List[Any] = []
+    if since is not None:
+        query += " AND timestamp > %s"
+        params.append(naive_utc(since))
+    if until is not None:
+        query += " AND timestamp <= %s"
+        params.append(naive_utc(until))
+    query += " ORDER BY timestamp ASC"
+
+    with primary_connection() as conn:
+        with conn.cursor(name="textlog_export") as cur:
+            cur.itersize = batch_size
+            with time_upstream("postgres", "export_text_logs_query"):
+                cur.execute(query, params)
+            while True:
+                with time_upstream("postgres", "export_text_logs_fetch"):
+                    rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+def complete_batches(batches: Iterable[List[tuple]]) -> Iterator[List[tuple]]:
+    """
+    Re-cut timestamp-ordered batches so no timestamp is split across two.
+
+    Rows sharing a batch's last timestamp are carried into the next batch,
+    which makes "everything up to the last written timestamp" an exact
+    resume point. Closing this generator closes ``batches``.
+    """
+    carry: List[tuple] = []
+    try:
+        for batch in batches:
+            rows = carry + batch if carry else batch
+            last = rows[-1][TIMESTAMP_INDEX]
+            cut = len(rows)
+            while cut > 0 and rows[cut - 1][TIMESTAMP_INDEX] == last:
+                cut -= 1
+            if cut == 0:
+                # The whole batch shares one timestamp; keep collecting
+                carry = rows
+                continue
+            carry = rows[cut:]
+            yield rows[:cut]
+        if carry:
+            yield carry
+    finally:
+        _close(batches)
+
+def _close(batches: Iterable):
+    """Close a row source that holds a cursor (a generator); lists need nothing."""
+    close = getattr(batches, "close", None)
+    if close is not None:
+        close()
+
+def split_by_date(rows: List[tuple]) -> Iterator[Tuple[date, List[tuple]]]:
+    """Split timestamp-ordered rows into runs that share a calendar date."""
+    start = 0
+    for index in range(1, len(rows) + 1):
+        if index == len(rows) or rows[index][TIMESTAMP_INDEX].date() != rows[start][TIMESTAMP_INDEX].date():
+            yield rows[start][TIMESTAMP_INDEX].date(), rows[start:index]
+            start = index
+
+def text_log_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("uid", pa.string()),
+        ("session_id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("text_type", pa.string()),
+        ("text_content", pa.string()),
+    ])
+
+def rows_to_table(rows: List[tuple]):
+    """Build a pyarrow Table (one array per column) from rows."""
+    pa = _pyarrow()
+    schema = text_log_schema()
+    columns = list(zip(*rows))
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    A timestamp in the textlog column's convention: naive, in UTC. Aware
+    datetimes (e.g. an ISO query value ending in Z) are converted; naive
+    ones are taken to be UTC already.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def export_cap(until: Optional[datetime] = None, now: Optional[datetime] = None) -> datetime:
+    """
+    The newest timestamp an export may include: ``until``, but no later
+    than EXPORT_SAFETY_LAG_SECONDS before now, so rows still being committed
+    are left for the next run. Naive UTC, like the column.
+    """
+    now = naive_utc(now) if now is not None else datetime.now(timezone.utc).replace(tzinfo=None)
+    cap = now - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS)
+    return cap if until is None else min(naive_utc(until), cap)
+
+def load_watermark(out_dir: str) -> Optional[datetime]:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return datetime.fromisoformat(json.load(f)["watermark"])
+
+def save_watermark(out_dir: str, watermark: datetime, rows: int):
+    """Atomically record the last fully exported timestamp."""
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"watermark": watermark.isoformat(), "rows": rows}, f)
+    os.replace(tmp_path, path)
+
+def write_partition(out_dir: str, day: date, rows: List[tuple], fmt: str = "parquet") -> str:
+    """
+    Write one file under <out_dir>/date=YYYY-MM-DD/.
+
+    The file is named after its first and last timestamps, so re-running an
+    interrupted export overwrites a partial file instead of duplicating it.
+
+    Returns:
+        str: Path of the written file
+    """
+    pa = _pyarrow()
+    extension, compression = FORMATS[fmt]
+    partition_dir = os.path.join(out_dir, f"date={day.isoformat()}")
+    os.makedirs(partition_dir, exist_ok=True)
+    first = rows[0][TIMESTAMP_INDEX].strftime("%H%M%S%f")
+    last = rows[-1][TIMESTAMP_INDEX].strftime("%H%M%S%f")
+    path = os.path.join(partition_dir, f"part-{first}-{last}.{extension}")
+    tmp_path = path + ".tmp"
+
+    table = rows_to_table(rows)
+    if fmt == "parquet":
+        pa.parquet.write_table(table, tmp_path, compression=compression)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+def export_text_logs(out_dir: str, since: Optional[datetime] = None, until: Optional[datetime] = None, fmt: str = "parquet",
+                     batch_size: int = DEFAULT_BATCH_SIZE, batches: Optional[Iterable[List[tuple]]] = None,
+                     writer=write_partition, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Export textlog rows to compressed columnar files partitioned by date.
+
+    Resumes from the watermark saved in ``out_dir`` unless ``since`` is
+    given. Each run stops at ``export_cap(until)`` and saves that cap as the
+    watermark once every row up to it is written. Memory use is bounded by
+    ``batch_size`` rows.
+
+    Args:
+        out_dir (str): Output directory
+        since (datetime, optional): Start after this timestamp (overrides the saved watermark)
+        until (datetime, optional): Stop at this timestamp (capped by the safety lag)
+        fmt (str): "parquet" or "arrow" (Arrow IPC file)
+        batch_size (int): Rows fetched and written per batch
+        batches (Iterable[List[tuple]], optional): Row source; defaults to Postgres
+        writer: Function writing one date partition; defaults to write_partition
+        now (datetime, optional): Current time for the cap; defaults to the current UTC time
+
+    Returns:
+        Dict[str, Any]: Rows and files written, and the final watermark
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    since = naive_utc(since) if since is not None else load_watermark(out_dir)
+    until = export_cap(until, now)
+    if batches is None:
+        batches = fetch_text_log_batches(since, until, batch_size)
+
+    total_rows = 0
+    files = []
+    watermark = since
+    for rows in complete_batches(batches):
+        for day, day_rows in split_by_date(rows):
+            files.append(writer(out_dir, day, day_rows, fmt))
+        total_rows += len(rows)
+        watermark = rows[-1][TIMESTAMP_INDEX]
+        save_watermark(out_dir, watermark, total_rows)
+        logger.info(f"Exported {total_rows} text logs up to {watermark.isoformat()}")
+
+    # Every row up to the cap is written (there may have been none)
+    if since is None or until > since:
+        watermark = until
+        save_watermark(out_dir, watermark, total_rows)
+
+    return {"rows": total_rows, "files": files, "watermark": watermark.isoformat() if watermark else None}
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def arrow_ipc_stream(batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    Encode row batches as a zstd-compressed Arrow IPC stream, one record
+    batch at a time, for streaming over HTTP.
+
+    Args:
+        batches (Iterable[List[tuple]]): Row batches in TEXT_LOG_COLUMNS order
+
+    Returns:
+        Iterator[bytes]: Stream chunks (schema and first batch, one chunk per
+        further batch, then the end marker); closing it closes ``batches``
+
+    Raises:
+        RuntimeError: Immediately, if pyarrow is not installed
+    """
+    pa = _pyarrow()
+
+    def encode():
+        sink = _ChunkSink()
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), text_log_schema(), options=options)
+        try:
+            for rows in batches:
+                writer.write_table(rows_to_table(rows))
+                yield sink.drain()
+        finally:
+            _close(batches)
+        writer.close()
+        yield sink.drain()
+
+    return encode()
@@ -0,0 +1,84 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Per-request list of (name, duration_ms) spans. The request middleware
+# installs a fresh list; anything that runs in the request's context (including
+# threadpool work, which copies the context) appends to the same list.
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("se_request_spans", default=None)
+
+def start_request_timing():
+    """
+    Start collecting spans for the current request.
+
+    Returns:
+        Token: Pass to ``end_request_timing`` to restore the previous context
+    """
+    return _request_spans.set([])
+
+def end_request_timing(token) -> List[Tuple[str, float]]:
+    """
+    Stop collecting spans for the current request.
+
+    Returns:
+        List[Tuple[str, float]]: Spans recorded during the request
+    """
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+def record_span(name: str, duration_ms: float):
+    """Add a finished span to the current request, if one is being timed."""
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration_ms))
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block and record it on the current request.
+
+    Usage:
+        with span("secret_manager"):
+            key = get_secret("gemini-api-key")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, (time.perf_counter() - start) * 1000)
+
+def summarize_spans(spans: List[Tuple[str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate spans by name, preserving first-seen order.
+
+    Returns:
+        Dict[str, Dict[str, float]]: name -> {"ms": total duration, "count": calls}
+    """
+    summary: Dict[str, Dict[str, float]] = {}
+    for name, duration_ms in spans:
+        entry = summary.get(name)
+        if entry is None:
+            summary[name] = {"ms": round(duration_ms, 3), "count": 1}
+        else:
+            entry["ms"] = round(entry["ms"] + duration_ms, 3)
+            entry["count"] += 1
+    return summary
+
+def server_timing_header(summary: Dict[str, Dict[str, float]], total_ms: float) -> str:
+    """
+    Build a Server-Timing header value, e.g. ``gemini;dur=812.4, total;dur=830.1``.
+
+    Args:
+        summary (Dict[str, Dict[str, float]]): Output of ``summarize_spans``
+        total_ms (float): Total request duration in milliseconds
+    """
+    metrics = []
+    for name, entry in summary.items():
+        if entry["count"] > 1:
+            metrics.append(f'{name};dur={entry["ms"]:.1f};desc="{entry["count"]} calls"')
+        else:
+            metrics.append(f'{name};dur={entry["ms"]:.1f}')
+    metrics.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(metrics)
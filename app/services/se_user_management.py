@@ -1,40 +1,88 @@
-from typing import Optional
+import os
+from typing import Optional, Tuple
 import logging
 from datetime import datetime
-from app.config.cloud_config import get_firestore_client
+from app.config.cloud_config import async_firestore_client_ready, get_async_firestore_client
 from app.schemas.se_user import SEUserCreate, SEUserUpdate, SEUserResponse
-from google.cloud import firestore
+from app.services.se_executor import run_firestore
+from app.services.se_metrics import time_upstream
 
 logger = logging.getLogger(__name__)
 
-def get_se_user(uid: str) -> Optional[SEUserResponse]:
+# Deadline for each Firestore call
+FIRESTORE_TIMEOUT_SECONDS = float(os.getenv("SE_FIRESTORE_TIMEOUT_SECONDS", "10"))
+
+def _firestore():
+    """Import google.cloud.firestore on first use to keep cold starts fast."""
+    from google.cloud import firestore
+    return firestore
+
+async def _async_db():
+    """The shared async Firestore client; its first build (Firebase init) runs on the Firestore bulkhead."""
+    if async_firestore_client_ready():
+        return get_async_firestore_client()
+    return await run_firestore(get_async_firestore_client)
+
+def _usage_log_entry(service_type: str, details: dict) -> dict:
+    return {
+        'timestamp': datetime.now(),
+        'service_type': service_type,
+        'grade_level': details.get('grade_level'),
+        'essay_type': details.get('essay_type'),
+        'word_count': details.get('essay_length', 0)  # Using essay_length as word count
+    }
+
+def _usage_summary(entries) -> list:
+    usage_summary = []
+    for entry in entries:
+        entry_data = entry.to_dict()
+        usage_summary.append({
+            'timestamp': entry_data.get('timestamp'),
+            'grade_level': entry_data.get('grade_level'),
+            'essay_type': entry_data.get('essay_type'),
+            'word_count': entry_data.get('word_count')
+        })
+    return usage_summary
+
+async def get_se_user_versioned_async(uid: str) -> Tuple[Optional[SEUserResponse], Optional[datetime]]:
     """
-    Get se user information by UID from Firestore.
+    Get se user information by UID from Firestore, with the document's update time.
     
     Args:
         uid (str): The unique identifier of the user
         
     Returns:
-        Optional[SEUserResponse]: User information if found, None if not found
+        Tuple[Optional[SEUserResponse], Optional[datetime]]: User information (None if not found)
+        and the document's last update time (None if not found or not reported)
     """
     try:
-        db = get_firestore_client()
+        db = await _async_db()
         user_ref = db.collection('se_users').document(uid)
-        user_doc = user_ref.get()
+        with time_upstream("firestore", "get_user"):
+            user_doc = await user_ref.get(timeout=FIRESTORE_TIMEOUT_SECONDS)
         
         if user_doc.exists:
-            user_data = user_doc.to_dict()
             logger.info(f"Successfully retrieved se user data for UID: {uid}")
-            return SEUserResponse(**user_data)
-        else:
-            logger.warning(f"No se user found with UID: {uid}")
-            return None
-            
+            return SEUserResponse(**user_doc.to_dict()), getattr(user_doc, "update_time", None)
+        logger.warning(f"No se user found with UID: {uid}")
+        return None, None
     except Exception as e:
         logger.error(f"Error retrieving se user data: {str(e)}")
         raise
 
-def create_se_user(uid: str, user_data: SEUserCreate) -> SEUserResponse:
+async def get_se_user_async(uid: str) -> Optional[SEUserResponse]:
+    """
+    Get se user information by UID from Firestore.
+    
+    Args:
+        uid (str): The unique identifier of the user
+        
+    Returns:
+        Optional[SEUserResponse]: User information if found, None if not found
+    """
+    return (await get_se_user_versioned_async(uid))[0]
+
+async def create_se_user_async(uid: str, user_data: SEUserCreate) -> SEUserResponse:
     """
     Create a new se user in Firestore.
     
@@ -46,22 +94,19 @@ def create_se_user(uid: str, user_data: SEUserCreate) -> SEUserResponse:
         SEUserResponse: Created user data
     """
     try:
-        db = get_firestore_client()
+        db = await _async_db()
         user_ref = db.collection('se_users').document(uid)
-        
-        # Convert to dict and add created_at
         user_dict = user_data.model_dump()
         user_dict['created_at'] = datetime.now()
-            
-        user_ref.set(user_dict)
+        with time_upstream("firestore", "create_user"):
+            await user_ref.set(user_dict, timeout=FIRESTORE_TIMEOUT_SECONDS)
         logger.info(f"Successfully created se user with UID: {uid}")
         return SEUserResponse(**user_dict)
-        
     except Exception as e:
         logger.error(f"Error creating se user: {str(e)}")
         raise
 
-def update_se_user(uid: str, user_data: SEUserUpdate) -> Optional[SEUserResponse]:
+async def update_se_user_async(uid: str, user_data: SEUserUpdate) -> Optional[SEUserResponse]:
     """
     Update an existing se user in Firestore.
     
@@ -73,28 +118,26 @@ def update_se_user(uid: str, user_data: SEUserUpdate) -> Optional[SEUserResponse
         Optional[SEUserResponse]: Updated user data if successful, None if user not found
     """
     try:
-        db = get_firestore_client()
+        db = await _async_db()
         user_ref = db.collection('se_users').document(uid)
-        
-        # Check if user exists
-        if not user_ref.get().exists:
+        with time_upstream("firestore", "get_user"):
+            user_exists = (await user_ref.get(timeout=FIRESTORE_TIMEOUT_SECONDS)).exists
+        if not user_exists:
             logger.warning(f"No se user found with UID: {uid} to update")
             return None
-            
-        # Convert to dict and remove None values
-        update_data = {k: v for k, v in user_data.model_dump().items() if v is not None}
-        user_ref.update(update_data)
         
-        # Get updated user data
-        updated_user = user_ref.get()
+        update_data = {k: v for k, v in user_data.model_dump().items() if v is not None}
+        with time_upstream("firestore", "update_user"):
+            await user_ref.update(update_data, timeout=FIRESTORE_TIMEOUT_SECONDS)
+        with time_upstream("firestore", "get_user"):
+            updated_user = await user_ref.get(timeout=FIRESTORE_TIMEOUT_SECONDS)
         logger.info(f"Successfully updated se user with UID: {uid}")
         return SEUserResponse(**updated_user.to_dict())
-        
     except Exception as e:
         logger.error(f"Error updating se user: {str(e)}")
         raise
 
-def delete_se_user(uid: str) -> bool:
+async def delete_se_user_async(uid: str) -> bool:
     """
     Delete an se user from Firestore.
     
@@ -105,23 +148,22 @@ def delete_se_user(uid: str) -> bool:
         bool: True if deletion was successful, False if user not found
     """
     try:
-        db = get_firestore_client()
+        db = await _async_db()
         user_ref = db.collection('se_users').document(uid)
-        
-        # Check if user exists
-        if not user_ref.get().exists:
+        with time_upstream("firestore", "get_user"):
+            user_exists = (await user_ref.get(timeout=FIRESTORE_TIMEOUT_SECONDS)).exists
+        if not user_exists:
             logger.warning(f"No se user found with UID: {uid} to delete")
             return False
-            
-        user_ref.delete()
+        with time_upstream("firestore", "delete_user"):
+            await user_ref.delete(timeout=FIRESTORE_TIMEOUT_SECONDS)
         logger.info(f"Successfully deleted se user with UID: {uid}")
         return True
-        
     except Exception as e:
         logger.error(f"Error deleting se user: {str(e)}")
-        raise 
+        raise
 
-def log_usage(uid: str, service_type: str, details: dict) -> bool:
+async def log_usage_async(uid: str, service_type: str, details: dict) -> bool:
     """
     Log the usage of a service by a user in the se_usage_logs collection.
     
@@ -134,31 +176,17 @@ def log_usage(uid: str, service_type: str, details: dict) -> bool:
         bool: True if usage was successfully logged, False otherwise
     """
     try:
-        db = get_firestore_client()
-        
-        # Get the user's usage log document reference
-        usage_log_ref = db.collection('se_usage_logs').document(uid)
-        
-        # Create a new log entry in the subcollection
-        log_entry = {
-            'timestamp': datetime.now(),
-            'service_type': service_type,
-            'grade_level': details.get('grade_level'),
-            'essay_type': details.get('essay_type'),
-            'word_count': details.get('essay_length', 0)  # Using essay_length as word count
-        }
-        
-        # Add the log entry to the subcollection
-        usage_log_ref.collection('entries').add(log_entry)
-        
+        db = await _async_db()
+        entries_ref = db.collection('se_usage_logs').document(uid).collection('entries')
+        with time_upstream("firestore", "log_usage"):
+            await entries_ref.add(_usage_log_entry(service_type, details), timeout=FIRESTORE_TIMEOUT_SECONDS)
         logger.info(f"Successfully logged usage for user {uid}: {service_type}")
         return True
-        
     except Exception as e:
         logger.error(f"Error logging usage for user {uid}: {str(e)}")
-        return False 
+        return False
 
-def fetch_usage_summary(uid: str) -> list:
+async def fetch_usage_summary_async(uid: str) -> list:
     """
     Fetch the latest 20 usage entries for a user.
     
@@ -169,33 +197,17 @@ def fetch_usage_summary(uid: str) -> list:
         list: List of usage entries, each containing timestamp, grade_level, essay_type, and word_count
     """
     try:
-        db = get_firestore_client()
-        
-        # Get the user's usage log document reference
-        usage_log_ref = db.collection('se_usage_logs').document(uid)
-        
-        # Query the entries subcollection, ordered by timestamp descending, limited to 20
-        entries = (
-            usage_log_ref.collection('entries')
-            .order_by('timestamp', direction=firestore.Query.DESCENDING)
-            .limit(20)
-            .get()
-        )
-        
-        # Format the results
-        usage_summary = []
-        for entry in entries:
-            entry_data = entry.to_dict()
-            usage_summary.append({
-                'timestamp': entry_data.get('timestamp'),
-                'grade_level': entry_data.get('grade_level'),
-                'essay_type': entry_data.get('essay_type'),
-                'word_count': entry_data.get('word_count')
-            })
-        
+        db = await _async_db()
+        entries_ref = db.collection('se_usage_logs').document(uid).collection('entries')
+        with time_upstream("firestore", "fetch_usage_summary"):
+            entries = await (
+                entries_ref
+                .order_by('timestamp', direction=_firestore().Query.DESCENDING)
+                .limit(20)
+                .get(timeout=FIRESTORE_TIMEOUT_SECONDS)
+            )
         logger.info(f"Successfully fetched usage summary for user {uid}")
-        return usage_summary
-        
+        return _usage_summary(entries)
     except Exception as e:
         logger.error(f"Error fetching usage summary for user {uid}: {str(e)}")
-        return [] 
\ No newline at end of file
+        return []
@@ -0,0 +1,61 @@
+import os
+import mmap
+import time
+import struct
+import threading
+from typing import Hashable, Tuple
+
+# Slots in each table; owners that hash to the same slot only cause
+# spurious invalidations
+WRITE_STAMP_SLOTS = int(os.getenv("SE_WRITE_STAMP_SLOTS", "65536"))
+
+_STAMP = struct.Struct("Q")
+_MASK = (1 << 64) - 1
+
+def _process_lock():
+    """A lock that also excludes the other workers forked from this process."""
+    try:
+        import multiprocessing
+        return multiprocessing.Lock()
+    except (ImportError, OSError):  # No POSIX semaphores (e.g. some sandboxes)
+        return threading.Lock()
+
+class WriteStamps:
+    """
+    Per-owner "last written" stamps in memory shared with forked workers.
+
+    The table is an anonymous shared mapping, so it must be created before
+    app.serve forks (at import, which the supervisor does when preloading
+    the app). A worker that writes for an owner ``bump``s its stamp; any
+    worker holding something derived from that owner's data compares the
+    stamp it saw before reading with ``current`` and drops the copy when
+    they differ. Reads take no lock.
+    """
+
+    def __init__(self, slots: int = WRITE_STAMP_SLOTS):
+        self.slots = slots
+        self._map = mmap.mmap(-1, slots * _STAMP.size)
+        self._lock = _process_lock()
+
+    def _offset(self, owner: Hashable) -> int:
+        # hash() is the same in forked workers: they share the parent's seed
+        return (hash(owner) % self.slots) * _STAMP.size
+
+    def current(self, owner: Hashable) -> int:
+        """The owner's stamp; 0 if nothing was written for it yet."""
+        return _STAMP.unpack_from(self._map, self._offset(owner))[0]
+
+    def bump(self, owner: Hashable) -> Tuple[int, int]:
+        """
+        Record a write for the owner.
+
+        Returns:
+            Tuple[int, int]: The stamp before and after this write
+        """
+        offset = self._offset(owner)
+        # Unique per write: wall time in ns with the pid in the low bits
+        stamp = ((time.time_ns() << 16) | (os.getpid() & 0xFFFF)) & _MASK or 1
+        with self._lock:
+            before = _STAMP.unpack_from(self._map, offset)[0]
+            _STAMP.pack_into(self._map, offset, stamp)
+        return before, stamp
@@ -0,0 +1,286 @@
+"""
+Load-test the API against local stub upstreams.
+
+Starts a fake Gemini, a fake SSE reasoning engine, a fake text-log server
+(with the textlog table the app reads directly) and an in-memory Firestore
+double, serves app.main:app with uvicorn, drives
+it at a target request rate and reports latency percentiles and throughput
+per route.
+
+Usage:
+    python benchmarks/load_test.py --rps 50 --duration 30
+    python benchmarks/load_test.py --routes outgoing_paraphrase,get_user --gemini-latency-ms 800 --gemini-failure-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("SE_SKIP_WARMUP", "1")
+
+import httpx
+
+from benchmarks.stubs import (
+    BackgroundServer,
+    FakeFirestoreClient,
+    FakeTextLogDatabase,
+    LatencyProfile,
+    build_reasoning_engine_app,
+    build_text_log_app,
+    make_fake_gemini,
+)
+
+class RouteSpec(NamedTuple):
+    name: str
+    method: str
+    path: Callable[[str, str], str]  # (uid, session_id) -> path
+    body: Optional[Callable[[], dict]]
+    weight: float
+
+PHRASES = [
+    "I like trains. Trains are fun. I like trains.",
+    "It's raining cats and dogs!",
+    "Don't spill the beans about the surprise party.",
+    "My favorite thing is dinosaurs because they are big and scary and I like them.",
+]
+
+ROUTES: List[RouteSpec] = [
+    RouteSpec("outgoing_paraphrase", "POST", lambda u, s: "/apps/se/outgoing_paraphrase",
+              lambda: {"text_content": random.choice(PHRASES)}, 3),
+    RouteSpec("incoming_paraphrase", "POST", lambda u, s: "/apps/se/incoming_paraphrase",
+              lambda: {"text_content": random.choice(PHRASES)}, 3),
+    RouteSpec("get_user", "GET", lambda u, s: f"/apps/se/users/{u}", None, 2),
+    RouteSpec("fetch_usage_summary", "GET", lambda u, s: f"/apps/se/fetch_usage_summary/{u}", None, 1),
+    RouteSpec("add_text_log", "POST", lambda u, s: f"/apps/se/text_logs/{u}/{s}",
+              lambda: {"text_content": random.choice(PHRASES), "text_type": "others"}, 2),
+    RouteSpec("session_text_logs", "GET", lambda u, s: f"/apps/se/text_logs/{u}/{s}", None, 1),
+    RouteSpec("latest_text_logs", "GET", lambda u, s: f"/apps/se/latest_text_logs/{u}?limit=10", None, 3),
+    RouteSpec("run_agent", "POST", lambda u, s: f"/apps/se/run_agent/{u}/{s}",
+              lambda: {"question": "I feel panic, what should I do?"}, 1),
+]
+
+class StubEnvironment:
+    """Start the stubs and point the app's service modules at them."""
+
+    def __init__(self, args):
+        self.args = args
+        self.servers: List[BackgroundServer] = []
+        self._originals: List[tuple] = []
+        self.firestore = FakeFirestoreClient(LatencyProfile(args.firestore_latency_ms, args.firestore_jitter_ms, args.firestore_failure_rate))
+
+    def start(self, users: List[str]):
+        from app.api import se
+        from app.services import se_agent, se_prompt, se_user_management
+        from app.services.se_etag import ETagCache
+        from app.services.se_text_log_buffer import LatestTextLogBuffer
+
+        engine = BackgroundServer(build_reasoning_engine_app(
+            LatencyProfile(self.args.agent_latency_ms, self.args.agent_jitter_ms, self.args.agent_failure_rate)
+        )).start()
+        database = FakeTextLogDatabase(
+            LatencyProfile(self.args.postgres_latency_ms, self.args.postgres_jitter_ms, self.args.postgres_failure_rate)
+        )
+        text_logs = BackgroundServer(build_text_log_app(
+            LatencyProfile(self.args.textlog_latency_ms, self.args.textlog_jitter_ms, self.args.textlog_failure_rate),
+            database,
+        )).start()
+        self.servers += [engine, text_logs]
+
+        class _NoopGenai:
+            @staticmethod
+            def configure(**kwargs):
+                pass
+
+        self._patch(se_prompt, "_generate_content", make_fake_gemini(
+            LatencyProfile(self.args.gemini_latency_ms, self.args.gemini_jitter_ms, self.args.gemini_failure_rate)
+        ))
+        self._patch(se_prompt, "_genai", lambda: _NoopGenai)
+        self._patch(se_prompt, "get_gemini_api_key", lambda: "stub-key")
+        self._patch(se_agent, "get_google_auth_token", lambda: "stub-token")
+        self._patch(se_agent, "SESSIONS_BASE_URL", engine.url)
+        self._patch(se_agent, "STREAM_QUERY_BASE_URL", engine.url)
+        async_firestore = self.firestore.async_client()
+        self._patch(se_user_management, "async_firestore_client_ready", lambda: True)
+        self._patch(se_user_management, "get_async_firestore_client", lambda: async_firestore)
+        self._patch(se, "TEXT_LOG_SERVER_URL", text_logs.url)
+        # The textlog table behind the text-log stub answers the app's own
+        # reads: ETag high-water marks and latest_text_logs buffer fills
+        self._patch(se, "get_text_log_high_water_mark", database.get_text_log_high_water_mark)
+        self._patch(se, "fetch_latest_text_logs", database.fetch_latest_text_logs)
+        self._patch(se, "latest_text_logs", LatestTextLogBuffer())
+        self._patch(se, "text_log_etags", ETagCache())
+
+        for uid in users:
+            self.firestore.seed_user(uid)
+
+    def _patch(self, module, name: str, value):
+        self._originals.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def stop(self):
+        for server in self.servers:
+            server.stop()
+        for module, name, original in reversed(self._originals):
+            setattr(module, name, original)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(results: Dict[str, List[tuple]], duration: float) -> Dict[str, dict]:
+    """Per-route latency percentiles (ms), throughput and error counts."""
+    report = {}
+    for name, samples in results.items():
+        latencies = sorted(latency for latency, _ in samples)
+        statuses: Dict[str, int] = {}
+        for _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = sum(1 for _, status in samples if isinstance(status, int) and status < 400)
+        report[name] = {
+            "requests": len(samples),
+            "ok": ok,
+            "errors": len(samples) - ok,
+            "throughput_rps": round(ok / duration, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p90_ms": round(percentile(latencies, 90), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else float("nan"),
+            "statuses": statuses,
+        }
+    return report
+
+async def drive(base_url: str, routes: List[RouteSpec], rps: float, duration: float, users: List[str], timeout: float) -> Dict[str, List[tuple]]:
+    """
+    Open-loop load: requests are started on a fixed schedule regardless of
+    how long earlier ones take, so queueing shows up in the latencies.
+
+    Like the app's clients, each user polls with If-None-Match (its last
+    ETag for that path) and sends back the X-Read-After token of its last
+    write, so the 304 and buffer paths are measured too.
+    """
+    results: Dict[str, List[tuple]] = {route.name: [] for route in routes}
+    weights = [route.weight for route in routes]
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    client_addresses = {uid: f"10.0.{i // 256 % 256}.{i % 256}" for i, uid in enumerate(users)}
+    etags: Dict[str, str] = {}
+    read_after: Dict[str, str] = {}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one(route: RouteSpec):
+            uid = random.choice(users)
+            session_id = f"session-{uid}"
+            path = route.path(uid, session_id)
+            # Each simulated user behind the (trusted, local) proxy gets its own address
+            headers = {"X-Forwarded-For": client_addresses[uid]}
+            if route.method == "GET":
+                if path in etags:
+                    headers["If-None-Match"] = etags[path]
+                if uid in read_after:
+                    headers["X-Read-After"] = read_after[uid]
+            start = time.perf_counter()
+            try:
+                response = await client.request(route.method, path, json=route.body() if route.body else None, headers=headers)
+                status = response.status_code
+                if "etag" in response.headers:
+                    etags[path] = response.headers["etag"]
+                if "x-read-after" in response.headers:
+                    read_after[uid] = response.headers["x-read-after"]
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            results[route.name].append(((time.perf_counter() - start) * 1000, status))
+
+        tasks = []
+        interval = 1.0 / rps
+        start = time.perf_counter()
+        sent = 0
+        while True:
+            next_at = start + sent * interval
+            if next_at - start >= duration:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            route = random.choices(routes, weights)[0]
+            tasks.append(asyncio.ensure_future(one(route)))
+            sent += 1
+        await asyncio.gather(*tasks)
+    return results
+
+def run_load_test(args) -> Dict[str, dict]:
+    """Start stubs and the app, drive load and return the per-route report."""
+    from app import main
+    from app.config import logging_config
+
+    # setup_logging() runs on import; quieten it afterwards so the report is readable
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    saved = (logging_config.ACCESS_LOG_SAMPLE_RATE, main.admission.rate_limits, main.admission.shed_thresholds)
+    logging_config.ACCESS_LOG_SAMPLE_RATE = args.access_log_sample_rate
+    if not args.with_admission:
+        main.admission.rate_limits = {route_class: (0, 0) for route_class in main.admission.rate_limits}
+        main.admission.shed_thresholds = {}
+
+    users = [f"load-user-{i}" for i in range(args.users)]
+    stubs = StubEnvironment(args)
+    stubs.start(users)
+    api = BackgroundServer(main.app).start()
+    try:
+        selected = args.routes.split(",") if args.routes != "all" else [route.name for route in ROUTES]
+        routes = [route for route in ROUTES if route.name in selected]
+        if not routes:
+            raise SystemExit(f"No known routes in --routes={args.routes}")
+        results = asyncio.run(drive(api.url, routes, args.rps, args.duration, users, args.timeout))
+    finally:
+        api.stop()
+        stubs.stop()
+        logging_config.ACCESS_LOG_SAMPLE_RATE, main.admission.rate_limits, main.admission.shed_thresholds = saved
+    return summarize(results, args.duration)
+
+def print_report(report: Dict[str, dict]):
+    header = f"{'route':<22}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report.items():
+        print(f"{name:<22}{row['requests']:>7}{row['errors']:>8}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p90_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test the SpeakEase API against local stub upstreams")
+    parser.add_argument("--rps", type=float, default=20, help="Target requests per second across all routes")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to generate load")
+    parser.add_argument("--routes", default="all", help="Comma-separated route names or 'all'")
+    parser.add_argument("--users", type=int, default=50, help="Number of distinct uids")
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout per request in seconds")
+    parser.add_argument("--with-admission", action="store_true", help="Keep rate limits and load shedding enabled")
+    parser.add_argument("--access-log-sample-rate", type=float, default=0.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="Write the report to this file")
+    for upstream, latency in (("gemini", 400), ("agent", 300), ("textlog", 30), ("firestore", 20), ("postgres", 5)):
+        parser.add_argument(f"--{upstream}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{upstream}-jitter-ms", type=float, default=latency / 4)
+        parser.add_argument(f"--{upstream}-failure-rate", type=float, default=0.0)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    report = run_load_test(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Microbenchmarks for the pure-Python code that runs on every request.
+
+Each case is timed with timeit and divided by a fixed calibration workload,
+timed alongside it in every round, so the stored baselines are ratios that
+carry over between machines better than raw timings. tests/test_microbench.py
+runs in the default test suite and fails when a case gets slower than its
+baseline by more than SE_BENCH_THRESHOLD (default 3.0x, wide enough for
+shared CI hosts; real regressions on these paths are larger).
+
+Usage:
+    python benchmarks/microbench.py                 # compare with baselines
+    python benchmarks/microbench.py --update        # rewrite baselines
+    python benchmarks/microbench.py --filter prompt
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baselines.json")
+DEFAULT_THRESHOLD = float(os.getenv("SE_BENCH_THRESHOLD", "3.0"))
+
+class BenchResult(NamedTuple):
+    name: str
+    per_call_us: float
+    relative: float
+
+# ---------------------------------------------------------------- Fixtures
+
+def sample_agent_event(index: int = 0) -> dict:
+    """A streamQuery event shaped like the reasoning engine's output."""
+    return {
+        "content": {
+            "parts": [
+                {"text": f"Step {index}: take a slow breath and count to four."},
+                {"function_call": {"name": "lookup_strategy", "args": {"topic": "panic", "depth": 2}}},
+            ],
+            "role": "model",
+        },
+        "usage_metadata": {"prompt_token_count": 512, "candidates_token_count": 48, "total_token_count": 560},
+        "invocation_id": "e-5f1c2a",
+        "author": "root_agent",
+        "actions": {"state_delta": {}, "artifact_delta": {}, "requested_auth_configs": {}},
+        "id": f"evt-{index}",
+        "timestamp": 1748000000.0 + index,
+    }
+
+def sample_sse_lines(count: int = 50) -> list:
+    lines = []
+    for i in range(count):
+        lines.append(b"data: " + json.dumps(sample_agent_event(i)).encode("utf-8"))
+        lines.append(b"")
+    return lines
+
+SAMPLE_TEXT = (
+    "My favorite thing is dinosaurs because they are big. It's raining cats and dogs today, "
+    "so we can't go outside for recess and I don't like that at all. "
+) * 3
+
+def sample_rows(count: int = 100):
+    description = [("uid",), ("session_id",), ("timestamp",), ("text_type",), ("text_content",)]
+    rows = [("student1", "session-1", datetime(2025, 5, 1, 12, 0, i % 60), "others", f"message {i}") for i in range(count)]
+    return description, rows
+
+SAMPLE_USER = {
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "grade_level": 5,
+    "group_ids": ["g1", "g2"],
+    "language": "en",
+    "preferred_type": "text",
+    "created_at": datetime(2025, 1, 1, 9, 30),
+}
+
+# ---------------------------------------------------------------- Cases
+
+def _calibration() -> Callable[[], object]:
+    """Fixed pure-Python workload that the case timings are divided by."""
+    data = {str(i): i for i in range(200)}
+    keys = list(data)
+
+    def run():
+        total = 0
+        for key in keys:
+            total += data[key]
+        return [k.upper() for k in keys], total
+    return run
+
+def _sse_parse():
+    from app.services.se_agent_events import parse_sse_line
+    lines = sample_sse_lines()
+
+    def run():
+        return [parse_sse_line(line) for line in lines]
+    return run
+
+def _decode_events():
+    from app.services.se_agent_events import decode_events
+    events = [sample_agent_event(i) for i in range(20)]
+    return lambda: list(decode_events(events))
+
+def _outgoing_prompt():
+    from app.services.se_prompt import get_outgoing_paraphrase_prompt
+    return lambda: get_outgoing_paraphrase_prompt(SAMPLE_TEXT)
+
+def _incoming_prompt():
+    from app.services.se_prompt import get_incoming_paraphrase_prompt
+    return lambda: get_incoming_paraphrase_prompt(SAMPLE_TEXT)
+
+# 1,000 characters of chat text with a few lexicon idioms in it
+IDIOM_TEXT = (
+    "Yesterday it was raining cats and dogs, so we stayed inside and played board games for hours. "
+    "My brother said the puzzle was a piece of cake, but it took us all afternoon to finish it. "
+    "Then Mom told us to hit the books because we have a spelling test on Friday morning. "
+) * 4
+
+def _find_idioms():
+    from app.services.se_idioms import find_idioms
+    text = IDIOM_TEXT[:1000]
+    return lambda: find_idioms(text)
+
+def _rows_to_dicts():
+    from app.services.se_psql_management import rows_to_dicts
+    description, rows = sample_rows()
+    return lambda: rows_to_dicts(description, rows)
+
+def _se_user_response():
+    from app.schemas.se_user import SEUserResponse
+    return lambda: SEUserResponse.model_validate(SAMPLE_USER)
+
+def _stdlib_encode(content) -> bytes:
+    """What FastAPI's default JSONResponse does with a returned value."""
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _user_encode_stdlib():
+    from app.schemas.se_user import SEUserResponse
+    user = SEUserResponse.model_validate(SAMPLE_USER)
+    return lambda: _stdlib_encode(user)
+
+def _user_encode_fast():
+    from app.schemas.se_user import SEUserResponse
+    from app.services.se_serialization import dump_user_response
+    user = SEUserResponse.model_validate(SAMPLE_USER)
+    return lambda: dump_user_response(user)
+
+def _rows_encode_stdlib():
+    from app.services.se_psql_management import rows_to_dicts
+    rows = rows_to_dicts(*sample_rows())
+    return lambda: _stdlib_encode(rows)
+
+def _rows_encode_fast():
+    from app.services.se_psql_management import rows_to_dicts
+    from app.services.se_serialization import dump_text_log_rows
+    rows = rows_to_dicts(*sample_rows())
+    return lambda: dump_text_log_rows(rows)
+
+def sample_usage_summary(count: int = 20) -> dict:
+    entries = [{"action": "outgoing_paraphrase", "timestamp": datetime(2025, 5, 1, 12, i % 60), "text_length": 120} for i in range(count)]
+    return {"status": "success", "usage_summary": entries}
+
+def _usage_encode_stdlib():
+    summary = sample_usage_summary()
+    return lambda: _stdlib_encode(summary)
+
+def _usage_encode_fast():
+    from app.services.se_serialization import dumps
+    summary = sample_usage_summary()
+    return lambda: dumps(summary)
+
+# name -> factory returning the zero-argument callable to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {
+    "sse_parse_50_lines": _sse_parse,
+    "decode_events_20_events": _decode_events,
+    "outgoing_paraphrase_prompt": _outgoing_prompt,
+    "incoming_paraphrase_prompt": _incoming_prompt,
+    "find_idioms_1000_chars": _find_idioms,
+    "rows_to_dicts_100_rows": _rows_to_dicts,
+    "se_user_response_validate": _se_user_response,
+    # Response encoding: FastAPI's default path ("stdlib") vs se_serialization ("fast")
+    "user_response_encode_stdlib": _user_encode_stdlib,
+    "user_response_encode_fast": _user_encode_fast,
+    "text_log_rows_100_encode_stdlib": _rows_encode_stdlib,
+    "text_log_rows_100_encode_fast": _rows_encode_fast,
+    "usage_summary_20_encode_stdlib": _usage_encode_stdlib,
+    "usage_summary_20_encode_fast": _usage_encode_fast,
+}
+
+# ---------------------------------------------------------------- Runner
+
+def _loops_for(timer: timeit.Timer, min_time: float) -> int:
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 2
+    return loops
+
+def time_per_call(func: Callable[[], object], repeat: int = 5, min_time: float = 0.02) -> float:
+    """
+    Best-of-``repeat`` seconds per call.
+
+    Args:
+        func (Callable[[], object]): Zero-argument callable to time
+        repeat (int): Number of timing rounds; the fastest is kept
+        min_time (float): Minimum seconds per round, used to pick the loop count
+
+    Returns:
+        float: Seconds per call
+    """
+    timer = timeit.Timer(func)
+    loops = _loops_for(timer, min_time)
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops
+
+def measure(name: str, repeat: int = 5, min_time: float = 0.02) -> BenchResult:
+    """
+    Time one case against the calibration workload.
+
+    Each round times the calibration and the case back to back and the
+    best ratio wins, so a host slowing down between the two (CPU frequency
+    changes, a noisy neighbour) does not skew the comparison the way one
+    calibration timed up front for every case would.
+    """
+    case = timeit.Timer(CASES[name]())
+    calibration = timeit.Timer(_calibration())
+    case_loops = _loops_for(case, min_time)
+    calibration_loops = _loops_for(calibration, min_time)
+
+    best_ratio = best_seconds = float("inf")
+    for _ in range(repeat):
+        calibration_seconds = calibration.timeit(calibration_loops) / calibration_loops
+        seconds = case.timeit(case_loops) / case_loops
+        best_ratio = min(best_ratio, seconds / calibration_seconds)
+        best_seconds = min(best_seconds, seconds)
+    return BenchResult(name, best_seconds * 1e6, best_ratio)
+
+def run_benchmarks(names: Optional[list] = None, repeat: int = 5) -> Dict[str, BenchResult]:
+    """Time the selected cases (all by default) relative to the calibration workload."""
+    return {name: measure(name, repeat=repeat) for name in CASES if not names or name in names}
+
+def load_baselines(path: str = BASELINES_FILE) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("cases", {})
+
+def save_baselines(results: Dict[str, BenchResult], path: str = BASELINES_FILE):
+    cases = load_baselines(path)
+    for result in results.values():
+        cases[result.name] = {"relative": float(f"{result.relative:.4g}"), "per_call_us": float(f"{result.per_call_us:.4g}")}
+    with open(path, "w") as f:
+        json.dump({"cases": dict(sorted(cases.items()))}, f, indent=2)
+        f.write("\n")
+
+def check_regression(result: BenchResult, baseline: Optional[dict], threshold: float = DEFAULT_THRESHOLD) -> Optional[str]:
+    """Return a failure message if ``result`` is slower than baseline * threshold, else None."""
+    if not baseline:
+        return None
+    limit = baseline["relative"] * threshold
+    if result.relative > limit:
+        return (f"{result.name}: {result.relative:.2f}x calibration "
+                f"(baseline {baseline['relative']:.2f}x, limit {limit:.2f}x, {result.per_call_us:.1f}us/call)")
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the request-path microbenchmarks")
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baselines")
+    parser.add_argument("--filter", help="Only run cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name] if args.filter else None
+    results = run_benchmarks(names, repeat=args.repeat)
+    baselines = load_baselines()
+
+    failures = []
+    print(f"{'case':<32}{'us/call':>12}{'relative':>10}{'baseline':>10}")
+    for result in results.values():
+        baseline = baselines.get(result.name)
+        base = f"{baseline['relative']:.3g}" if baseline else "-"
+        print(f"{result.name:<32}{result.per_call_us:>12.2f}{result.relative:>10.3g}{base:>10}")
+        failure = check_regression(result, baseline, args.threshold)
+        if failure:
+            failures.append(failure)
+
+    if args.update:
+        save_baselines(results)
+        print(f"Baselines written to {BASELINES_FILE}")
+    elif failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Report per-module import cost for the API.
+
+Runs a fresh interpreter with ``python -X importtime`` so nothing is cached,
+then prints the slowest modules and the cost per top-level package.
+
+Usage:
+    python benchmarks/profile_imports.py [--module app.main] [--top 25]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by loading the app
+HEAVY_MODULES = [
+    "google.generativeai",
+    "firebase_admin",
+    "google.cloud.firestore",
+    "google.cloud.secretmanager",
+    "psycopg2",
+    "requests",
+    "httpx",
+]
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+def run_importtime(module: str = "app.main") -> List[ImportRecord]:
+    """
+    Import a module in a fresh interpreter and parse the -X importtime output.
+
+    Args:
+        module (str): Dotted module name to import
+
+    Returns:
+        List[ImportRecord]: One record per imported module, in import order
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["SE_SKIP_WARMUP"] = "1"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Parse the stderr of ``python -X importtime``.
+
+    Args:
+        output (str): Raw stderr text
+
+    Returns:
+        List[ImportRecord]: Parsed records; non-importtime lines are skipped
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped)) // 2
+        records.append(ImportRecord(stripped, int(fields[0]), int(fields[1]), depth))
+    return records
+
+def total_import_ms(records: List[ImportRecord], module: str) -> float:
+    """Cumulative import time of ``module`` in milliseconds."""
+    for record in records:
+        if record.module == module:
+            return record.cumulative_us / 1000
+    raise KeyError(f"{module} not found in importtime output")
+
+def self_time_by_package(records: List[ImportRecord]) -> Dict[str, int]:
+    """Sum self time per top-level package, in microseconds."""
+    totals = defaultdict(int)
+    for record in records:
+        totals[record.module.split(".")[0]] += record.self_us
+    return dict(totals)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the SpeakEase API")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of rows to show")
+    args = parser.parse_args()
+
+    records = run_importtime(args.module)
+    print(f"Total import time for {args.module}: {total_import_ms(records, args.module):.1f} ms\n")
+
+    print(f"Slowest modules by cumulative time (top {args.top}):")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for record in sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:args.top]:
+        print(f"{record.cumulative_us / 1000:>14.1f} {record.self_us / 1000:>9.1f}  {record.module}")
+
+    print(f"\nSelf time by top-level package (top {args.top}):")
+    packages = sorted(self_time_by_package(records).items(), key=lambda kv: kv[1], reverse=True)
+    for package, self_us in packages[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+    imported = {record.module for record in records}
+    eager = [m for m in HEAVY_MODULES if m in imported]
+    if eager:
+        print(f"\nWARNING: heavy modules imported eagerly: {', '.join(eager)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure the input tokens each paraphrase request sends to Gemini.
+
+Runs the paraphrase functions against a local google.generativeai stand-in
+(benchmarks/stubs.py FakeGenAI) in three modes:
+
+- inline: the fixed instructions and examples prepended to every prompt
+- system_instruction: the fixed part set once on the model; the SDK still
+  sends it with each request, but separately from the user text
+- cached_content: the fixed part stored as provider-side cached content
+  (SE_GEMINI_CONTEXT_CACHE=1); requests carry only the user text
+
+Usage:
+    python benchmarks/prompt_tokens.py [--requests 100]
+"""
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.stubs import FakeGenAI
+
+MODES = ("inline", "system_instruction", "cached_content")
+
+SAMPLE_TEXTS = [
+    "I like trains. Trains are fun. I like trains.",
+    "Can you give me a hand with my homework?",
+    "My teacher said I should break a leg at the school play tomorrow.",
+    "I want to go outside now because I am bored of being inside.",
+    "He said it was a piece of cake but it was really hard.",
+]
+
+def measure_prompt_tokens(texts: List[str], mode: str) -> Dict[str, float]:
+    """
+    Send each text through both paraphrase directions in one mode.
+
+    Returns:
+        Dict[str, float]: Requests made, average tokens sent and sent
+        uncached per request, and cached contents created
+    """
+    from app.services import se_prompt
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    genai = FakeGenAI()
+    patched = {
+        "_genai": lambda: genai,
+        "get_gemini_api_key": lambda: "stub-key",
+        "GEMINI_CONTEXT_CACHE": mode == "cached_content",
+        "GEMINI_FALLBACK_MODEL": "",
+    }
+    originals = {name: getattr(se_prompt, name) for name in patched}
+    for name, value in patched.items():
+        setattr(se_prompt, name, value)
+    se_prompt._models.clear()
+    se_prompt._cached_contents.clear()
+    try:
+        for text in texts:
+            if mode == "inline":
+                for prefix, build in (
+                    (se_prompt.OUTGOING_PARAPHRASE_PREFIX, se_prompt.get_outgoing_paraphrase_prompt),
+                    (se_prompt.INCOMING_PARAPHRASE_PREFIX, se_prompt.get_incoming_paraphrase_prompt),
+                ):
+                    se_prompt.get_prompt_results(f"{prefix.system_instruction}\n\n{build(text)}")
+            else:
+                se_prompt.get_outgoing_paraphrase(text)
+                se_prompt.get_incoming_paraphrase(text)
+    finally:
+        for name, value in originals.items():
+            setattr(se_prompt, name, value)
+        se_prompt._models.clear()
+        se_prompt._cached_contents.clear()
+
+    requests = genai.requests
+    return {
+        "requests": len(requests),
+        "sent_per_request": sum(r.prompt + r.system for r in requests) / len(requests),
+        "cached_per_request": sum(r.cached for r in requests) / len(requests),
+        "caches_created": genai.caches_created,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="Texts to paraphrase (each in both directions)")
+    args = parser.parse_args(argv)
+
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(args.requests)]
+    results = {mode: measure_prompt_tokens(texts, mode) for mode in MODES}
+    baseline = results["inline"]["sent_per_request"]
+    print(f"{'mode':<20} {'requests':>8} {'sent/req':>9} {'cached/req':>11} {'caches':>7} {'saved':>7}")
+    for mode, result in results.items():
+        saved = 1 - result["sent_per_request"] / baseline
+        print(f"{mode:<20} {result['requests']:>8} {result['sent_per_request']:>9.1f} "
+              f"{result['cached_per_request']:>11.1f} {result['caches_created']:>7} {saved:>7.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Local stand-ins for the upstreams the API talks to, with configurable
+latency and failure injection. Used by benchmarks/load_test.py.
+
+- Gemini: in-process replacement for se_prompt._generate_content, and a
+  google.generativeai stand-in that counts the tokens each request sends
+- Reasoning engine: HTTP server speaking the sessions / streamQuery SSE API
+- Text-log server: HTTP server with the /apps/se/text_logs endpoints
+- Postgres: in-process replacements for the text-log reads the API makes
+  itself (latest rows, ETag high-water marks), over the text-log server's rows
+- Firestore: in-memory client double holding the documents, and an async
+  view of it returned by get_async_firestore_client()
+"""
+import asyncio
+import copy
+import json
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+class UpstreamFailure(RuntimeError):
+    """Injected upstream failure."""
+
+class LatencyProfile:
+    """
+    Latency and failure settings for one stub.
+
+    Args:
+        mean_ms (float): Mean latency in milliseconds
+        jitter_ms (float): Standard deviation of the latency
+        failure_rate (float): Fraction of calls that fail (0-1)
+    """
+
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    def sample_seconds(self) -> float:
+        if self.jitter_ms:
+            return max(0.0, random.gauss(self.mean_ms, self.jitter_ms)) / 1000
+        return self.mean_ms / 1000
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+    def block(self):
+        """Sleep for one sampled latency, then maybe raise an injected failure."""
+        time.sleep(self.sample_seconds())
+        if self.should_fail():
+            raise UpstreamFailure("injected failure")
+
+    async def wait(self):
+        await asyncio.sleep(self.sample_seconds())
+        if self.should_fail():
+            raise UpstreamFailure("injected failure")
+
+# ---------------------------------------------------------------- Gemini
+
+def make_fake_gemini(profile: LatencyProfile):
+    """Build a drop-in for se_prompt._generate_content(model_name, prompt, prefix)."""
+    def fake_generate_content(model_name: str, prompt: str, prefix=None) -> str:
+        profile.block()
+        # Echo the user text found between the prompt's --- markers
+        parts = prompt.split("---")
+        text = parts[-2].strip() if len(parts) >= 3 else prompt[-200:]
+        return f"[{model_name}] {text}"
+    return fake_generate_content
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """Rough token count (words and punctuation), good enough to compare prompts."""
+    return len(_TOKEN_RE.findall(text))
+
+class SentTokens(NamedTuple):
+    """Tokens carried by one generate_content request."""
+    model: str
+    prompt: int
+    system: int
+    cached: int
+
+class FakeGenAI:
+    """
+    Stand-in for the google.generativeai module, returned from se_prompt._genai().
+
+    Records what every generate_content call sends: the prompt, any system
+    instruction (sent again with each request) and any cached content
+    (referenced by name, not resent).
+
+    Args:
+        min_cache_tokens (int): Reject cached content smaller than this, like the provider does
+    """
+
+    def __init__(self, min_cache_tokens: int = 0):
+        self.requests: List[SentTokens] = []
+        self.caches_created = 0
+        self.caches_deleted = 0
+        genai = self
+
+        class CachedContent:
+            def __init__(self, model, tokens, display_name):
+                self.model = model
+                self.tokens = tokens
+                self.display_name = display_name
+
+            @classmethod
+            def create(cls, model, system_instruction=None, ttl=None, display_name=None, contents=None):
+                tokens = count_tokens(system_instruction or "")
+                if tokens < min_cache_tokens:
+                    raise ValueError(f"Cached content needs at least {min_cache_tokens} tokens, got {tokens}")
+                genai.caches_created += 1
+                return cls(model, tokens, display_name)
+
+            def delete(self):
+                genai.caches_deleted += 1
+
+        class GenerativeModel:
+            def __init__(self, model_name, system_instruction=None, cached_content=None):
+                self.model_name = model_name
+                self.system_tokens = count_tokens(system_instruction or "")
+                self.cached_tokens = cached_content.tokens if cached_content else 0
+
+            @classmethod
+            def from_cached_content(cls, cached_content):
+                return cls(cached_content.model, cached_content=cached_content)
+
+            def generate_content(self, contents, request_options=None, stream=False):
+                genai.requests.append(SentTokens(self.model_name, count_tokens(contents), self.system_tokens, self.cached_tokens))
+                if stream:
+                    return [SimpleNamespace(text=f"[{self.model_name}]"), SimpleNamespace(text=" ok")]
+                return SimpleNamespace(text=f"[{self.model_name}] ok")
+
+        self.caching = SimpleNamespace(CachedContent=CachedContent)
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, **kwargs):
+        pass
+
+# ---------------------------------------------------------------- Firestore
+
+class _Snapshot:
+    def __init__(self, data: Optional[Dict[str, Any]]):
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+class _Query:
+    def __init__(self, docs: List[Dict[str, Any]], profile: LatencyProfile):
+        self._docs = docs
+        self._profile = profile
+        self._order: Optional[tuple] = None
+        self._limit: Optional[int] = None
+
+    def order_by(self, field: str, direction: str = "ASCENDING"):
+        self._order = (field, direction)
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def get(self, timeout: Optional[float] = None) -> List[_Snapshot]:
+        self._profile.block()
+        return self._run()
+
+    def _run(self) -> List[_Snapshot]:
+        docs = list(self._docs)
+        if self._order:
+            field, direction = self._order
+            docs.sort(key=lambda d: d.get(field), reverse=str(direction).upper().startswith("DESC"))
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return [_Snapshot(d) for d in docs]
+
+class _Collection:
+    def __init__(self, store: "FakeFirestoreClient", path: str):
+        self._store = store
+        self._path = path
+
+    def document(self, doc_id: str) -> "_Document":
+        return _Document(self._store, f"{self._path}/{doc_id}")
+
+    def add(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        self._store.profile.block()
+        self._add(data)
+
+    def _add(self, data: Dict[str, Any]):
+        with self._store.lock:
+            self._store.collections.setdefault(self._path, []).append(copy.deepcopy(data))
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> _Query:
+        with self._store.lock:
+            docs = list(self._store.collections.get(self._path, []))
+        return _Query(docs, self._store.profile).order_by(field, direction)
+
+class _Document:
+    def __init__(self, store: "FakeFirestoreClient", path: str):
+        self._store = store
+        self._path = path
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self._store, f"{self._path}/{name}")
+
+    def get(self, timeout: Optional[float] = None) -> _Snapshot:
+        self._store.profile.block()
+        return self._get()
+
+    def set(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        self._store.profile.block()
+        self._set(data)
+
+    def update(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        self._store.profile.block()
+        self._update(data)
+
+    def delete(self, timeout: Optional[float] = None):
+        self._store.profile.block()
+        self._delete()
+
+    def _get(self) -> _Snapshot:
+        with self._store.lock:
+            return _Snapshot(copy.deepcopy(self._store.documents.get(self._path)))
+
+    def _set(self, data: Dict[str, Any]):
+        with self._store.lock:
+            self._store.documents[self._path] = copy.deepcopy(data)
+
+    def _update(self, data: Dict[str, Any]):
+        with self._store.lock:
+            self._store.documents[self._path].update(copy.deepcopy(data))
+
+    def _delete(self):
+        with self._store.lock:
+            self._store.documents.pop(self._path, None)
+
+# Async views over the same documents, as google.cloud.firestore.AsyncClient
+# exposes them: the RPCs are coroutines and the latency is awaited
+
+class _AsyncQuery(_Query):
+    async def get(self, timeout: Optional[float] = None) -> List[_Snapshot]:
+        await self._profile.wait()
+        return self._run()
+
+class _AsyncCollection(_Collection):
+    def document(self, doc_id: str) -> "_AsyncDocument":
+        return _AsyncDocument(self._store, f"{self._path}/{doc_id}")
+
+    async def add(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        await self._store.profile.wait()
+        self._add(data)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> _AsyncQuery:
+        with self._store.lock:
+            docs = list(self._store.collections.get(self._path, []))
+        return _AsyncQuery(docs, self._store.profile).order_by(field, direction)
+
+class _AsyncDocument(_Document):
+    def collection(self, name: str) -> _AsyncCollection:
+        return _AsyncCollection(self._store, f"{self._path}/{name}")
+
+    async def get(self, timeout: Optional[float] = None) -> _Snapshot:
+        await self._store.profile.wait()
+        return self._get()
+
+    async def set(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        await self._store.profile.wait()
+        self._set(data)
+
+    async def update(self, data: Dict[str, Any], timeout: Optional[float] = None):
+        await self._store.profile.wait()
+        self._update(data)
+
+    async def delete(self, timeout: Optional[float] = None):
+        await self._store.profile.wait()
+        self._delete()
+
+class FakeAsyncFirestoreClient:
+    """Async double sharing a FakeFirestoreClient's documents, returned by get_async_firestore_client()."""
+
+    def __init__(self, store: "FakeFirestoreClient"):
+        self._store = store
+
+    def collection(self, name: str) -> _AsyncCollection:
+        return _AsyncCollection(self._store, name)
+
+class FakeFirestoreClient:
+    """In-memory double for the subset of the Firestore client used by se_user_management."""
+
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.collections: Dict[str, List[Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self, name)
+
+    def async_client(self) -> FakeAsyncFirestoreClient:
+        return FakeAsyncFirestoreClient(self)
+
+    def seed_user(self, uid: str, **fields):
+        data = {
+            "first_name": "Load",
+            "last_name": "Test",
+            "grade_level": 5,
+            "group_ids": ["g1"],
+            "language": "en",
+            "preferred_type": "text",
+            "created_at": datetime(2025, 1, 1),
+        }
+        data.update(fields)
+        self.documents[f"se_users/{uid}"] = data
+
+# ---------------------------------------------------------------- Reasoning engine
+
+def build_reasoning_engine_app(profile: LatencyProfile, chunks: int = 3, chunk_delay_ms: float = 20.0) -> FastAPI:
+    """
+    Fake Vertex AI reasoning engine: session creation and a streamQuery
+    endpoint that emits ``chunks`` SSE events.
+    """
+    stub = FastAPI()
+
+    @stub.post("/{path:path}")
+    async def handle(path: str, request: Request):
+        try:
+            await profile.wait()
+        except UpstreamFailure:
+            return JSONResponse(status_code=503, content={"error": "injected failure"})
+
+        if path.endswith("/sessions"):
+            return {"name": f"{path}/{random.randint(10**17, 10**18)}"}
+
+        payload = await request.json()
+        question = payload.get("input", {}).get("message", "")
+
+        async def events():
+            for index in range(chunks):
+                await asyncio.sleep(chunk_delay_ms / 1000)
+                event = {
+                    "content": {"parts": [{"text": f"chunk {index} for: {question}"}], "role": "model"},
+                    "author": "root_agent",
+                }
+                yield f"data: {json.dumps(event)}\n\n"
+            usage = {"usage_metadata": {"prompt_token_count": 12, "candidates_token_count": 8 * chunks}}
+            yield f"data: {json.dumps(usage)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return stub
+
+# ---------------------------------------------------------------- Text-log server
+
+class FakeTextLogDatabase:
+    """
+    The textlog table the text-log server writes to, for the reads
+    se_psql_management makes directly. Pass it to build_text_log_app so
+    both see the same rows.
+    """
+
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+        self.rows: List[Dict[str, Any]] = []
+
+    def fetch_latest_text_logs(self, uid: str, limit: int = 10, read_after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Drop-in for se_psql_management.fetch_latest_text_logs; failures raise."""
+        self.profile.block()
+        return [r for r in reversed(list(self.rows)) if r["uid"] == uid][:limit]
+
+    def get_text_log_high_water_mark(self, uid: str, session_id: Optional[str] = None, text_type: Optional[str] = None,
+                                     read_after: Optional[str] = None, limit: Optional[int] = None):
+        """Drop-in for se_psql_management.get_text_log_high_water_mark; failures return None."""
+        try:
+            self.profile.block()
+        except UpstreamFailure:
+            return None
+        matching = [r["timestamp"] for r in list(self.rows) if r["uid"] == uid
+                    and (session_id is None or r["session_id"] == session_id)
+                    and (text_type is None or r["text_type"] == text_type)]
+        if limit is not None:
+            matching = sorted(matching)[-limit:]
+        return (max(matching) if matching else None), len(matching)
+
+def build_text_log_app(profile: LatencyProfile, database: Optional[FakeTextLogDatabase] = None) -> FastAPI:
+    """Fake text-log server backed by an in-memory list (the database's rows, if given)."""
+    stub = FastAPI()
+    rows: List[Dict[str, Any]] = database.rows if database is not None else []
+
+    @stub.post("/apps/se/text_logs/{uid}/{session_id}")
+    async def add(uid: str, session_id: str, request: Request):
+        try:
+            await profile.wait()
+        except UpstreamFailure:
+            return JSONResponse(status_code=503, content={"error": "injected failure"})
+        body = await request.json()
+        stored_at = datetime.now()
+        rows.append({
+            "uid": uid,
+            "session_id": session_id,
+            "timestamp": stored_at,
+            "text_type": body.get("text_type", "others"),
+            "text_content": body.get("text_content", ""),
+        })
+        return {"status": "success", "timestamp": stored_at.isoformat()}
+
+    @stub.get("/apps/se/text_logs/{uid}/{session_id}")
+    async def session_logs(uid: str, session_id: str, text_type: Optional[str] = None):
+        try:
+            await profile.wait()
+        except UpstreamFailure:
+            return JSONResponse(status_code=503, content={"error": "injected failure"})
+        return [r for r in rows if r["uid"] == uid and r["session_id"] == session_id
+                and (text_type is None or r["text_type"] == text_type)]
+
+    @stub.get("/apps/se/latest_text_logs/{uid}")
+    async def latest_logs(uid: str, limit: int = 10):
+        try:
+            await profile.wait()
+        except UpstreamFailure:
+            return JSONResponse(status_code=503, content={"error": "injected failure"})
+        return [r for r in reversed(rows) if r["uid"] == uid][:limit]
+
+    return stub
+
+# ---------------------------------------------------------------- Servers
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False, lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
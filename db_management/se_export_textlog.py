@@ -0,0 +1,41 @@
+import os
+import sys
+import argparse
+import logging
+from datetime import datetime
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from app.services.se_textlog_export import DEFAULT_BATCH_SIZE, FORMATS, export_text_logs
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """
+    Export the textlog table to compressed Parquet or Arrow files
+    partitioned by date (<out>/date=YYYY-MM-DD/part-*.parquet).
+
+    Re-running with the same --out resumes where the last run stopped
+    (SE_EXPORT_SAFETY_LAG_SECONDS before it started).
+    """
+    parser = argparse.ArgumentParser(description="Export text logs to columnar files for analytics")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Start after this timestamp instead of the saved watermark")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Stop at this timestamp")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        result = export_text_logs(args.out, since=args.since, until=args.until, fmt=args.format, batch_size=args.batch_size)
+        logger.info(f"Exported {result['rows']} rows to {len(result['files'])} files; watermark {result['watermark']}")
+    except Exception as e:
+        logger.error(f"Error exporting text logs: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
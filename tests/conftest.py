@@ -0,0 +1,19 @@
+import httpx
+
+class FakeClock:
+    """Monotonic clock double: tests move time by setting now"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Body(httpx.AsyncByteStream):
+    """Unread streaming body, as the proxy's upstream would give."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
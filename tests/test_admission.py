@@ -0,0 +1,112 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from app import main, serve
+from app.services.se_admission import (
+    LOW, HIGH, AdmissionController, InMemoryTokenBucketBackend, build_admission_controller,
+    charge_admitted_request, end_admitted_request, start_admitted_request,
+)
+from conftest import FakeClock
+
+def test_token_bucket_refills_over_time():
+    """A bucket allows its burst, then one request per 1/rate seconds"""
+    clock = FakeClock()
+    backend = InMemoryTokenBucketBackend(clock=clock)
+    assert [backend.take_sync("u1:gemini", 1.0, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take_sync("u1:gemini", 1.0, 3) == pytest.approx(1.0)
+    clock.now = 1.0
+    assert backend.take_sync("u1:gemini", 1.0, 3) == 0.0
+    # Other users have their own bucket
+    assert backend.take_sync("u2:gemini", 1.0, 3) == 0.0
+
+def test_bucket_store_is_bounded():
+    """Least recently used buckets are evicted past max_keys"""
+    backend = InMemoryTokenBucketBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.take_sync(key, 1.0, 1)
+    assert list(backend._buckets) == ["b", "c"]
+
+def test_low_priority_is_shed_first():
+    """Past the low threshold only low-priority routes are shed"""
+    controller = AdmissionController(
+        InMemoryTokenBucketBackend(), rate_limits={"default": (0, 0)}, shed_thresholds={LOW: 2, HIGH: 4}
+    )
+    controller.in_flight = 3
+    assert asyncio.run(controller.admit("default", LOW, "u1")) == (503, 1, "shed")
+    assert asyncio.run(controller.admit("default", HIGH, "u1")) is None
+
+def test_rate_limited_requests_get_retry_after(monkeypatch):
+    """Flooding a route class returns 429 with Retry-After for that uid only"""
+    controller = AdmissionController(InMemoryTokenBucketBackend(), rate_limits={"textlog_poll": (0.5, 2), "default": (0, 0)})
+    monkeypatch.setattr(main, "admission", controller)
+
+    async def fake_proxy(request, url, extra_headers=None):
+        return JSONResponse([])
+
+    monkeypatch.setattr(main.se, "proxy_request", fake_proxy)
+    monkeypatch.setattr(main.se, "get_text_log_high_water_mark", lambda *args: None)
+    monkeypatch.setattr(main.se, "fetch_latest_text_logs", lambda uid, limit: [])
+    client = TestClient(main.app)
+
+    statuses = [client.get("/apps/se/latest_text_logs/flooder").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    rejected = client.get("/apps/se/latest_text_logs/flooder")
+    assert rejected.headers["Retry-After"] == "2"
+    assert client.get("/apps/se/latest_text_logs/someone_else").status_code == 200
+    assert client.get("/").status_code == 200
+
+def test_anonymous_routes_are_keyed_by_forwarded_client_address(monkeypatch):
+    """Without a uid the bucket follows the proxy-reported client address, not headers the client picks"""
+    controller = AdmissionController(InMemoryTokenBucketBackend(), rate_limits={"default": (0.01, 1)})
+    monkeypatch.setattr(main, "admission", controller)
+    config = serve.worker_config(main.app, graceful_timeout=1)
+    config.load()
+
+    async def statuses(*requests):
+        transport = httpx.ASGITransport(app=config.loaded_app, client=("169.254.8.129", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [(await client.get("/no-such-route", headers=headers)).status_code for headers in requests]
+
+    # Rotating X-User-Id, or prepending a fake hop, does not get a fresh bucket
+    assert asyncio.run(statuses(
+        {"X-Forwarded-For": "203.0.113.7", "X-User-Id": "a"},
+        {"X-Forwarded-For": "203.0.113.7", "X-User-Id": "b"},
+        {"X-Forwarded-For": "198.51.100.1, 203.0.113.7"},
+    )) == [404, 429, 429]
+    # Different clients behind the front end have their own buckets
+    assert asyncio.run(statuses({"X-Forwarded-For": "203.0.113.8"})) == [404]
+
+def test_in_process_limits_are_split_between_workers(monkeypatch):
+    """N workers with their own buckets together allow about the configured rate, not N times it"""
+    monkeypatch.delenv("SE_RATE_LIMIT_REDIS_URL", raising=False)
+    monkeypatch.setenv("SE_WORKER_PROCESSES", "4")
+    limits = build_admission_controller().rate_limits
+    assert limits["gemini"] == (0.25, 10)  # Only the refill rate is split
+    assert limits["export"] == (0.05 / 4, 2)
+    assert limits["health"] == (0, 0)
+
+def test_fan_out_charge_fits_a_fresh_bucket_with_several_workers(monkeypatch):
+    """A request plus its extra Gemini calls fits a full bucket however many workers split the rate"""
+    monkeypatch.delenv("SE_RATE_LIMIT_REDIS_URL", raising=False)
+    monkeypatch.setenv("SE_WORKER_PROCESSES", "8")
+    controller = build_admission_controller()
+    calls = 4
+
+    async def scenario():
+        assert await controller.admit("gemini", LOW, "client") is None
+        token = start_admitted_request(controller, "gemini", "client")
+        try:
+            await charge_admitted_request(calls - 1)
+        finally:
+            end_admitted_request(token)
+        # The charge is capped at what a full bucket holds after admission
+        assert await controller.admit("gemini", LOW, "other") is None
+        token = start_admitted_request(controller, "gemini", "other")
+        try:
+            await charge_admitted_request(50)
+        finally:
+            end_admitted_request(token)
+
+    asyncio.run(scenario())
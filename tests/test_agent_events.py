@@ -0,0 +1,90 @@
+import asyncio
+import json
+import httpx
+from app.main import app
+from app.api import se
+from app.services import se_agent
+from app.services.se_agent_events import (
+    AgentError,
+    TextDelta,
+    ToolCall,
+    ToolResult,
+    Usage,
+    decode_event,
+    decode_sse_lines,
+    event_to_dict,
+)
+
+def test_decode_event_yields_typed_records_in_order():
+    """Text, tool calls, tool results and usage come out as typed records"""
+    event = {
+        "author": "root_agent",
+        "content": {"parts": [
+            {"text": "Hello"},
+            {"function_call": {"name": "lookup", "args": {"q": "panic"}, "id": "c1"}},
+            {"function_response": {"name": "lookup", "response": {"tips": ["breathe"]}, "id": "c1"}},
+        ]},
+        "usage_metadata": {"prompt_token_count": 10, "candidates_token_count": 5, "total_token_count": 15},
+    }
+    assert list(decode_event(event)) == [
+        TextDelta("Hello", "root_agent"),
+        ToolCall("lookup", {"q": "panic"}, "c1"),
+        ToolResult("lookup", {"tips": ["breathe"]}, "c1"),
+        Usage(10, 5, 15),
+    ]
+
+def test_decode_event_accepts_camel_case_and_errors():
+    """camelCase keys and error events are understood"""
+    event = {
+        "errorCode": "RESOURCE_EXHAUSTED",
+        "errorMessage": "quota",
+        "content": {"parts": [{"functionCall": {"name": "f", "args": {}}}]},
+        "usageMetadata": {"promptTokenCount": 3},
+    }
+    assert list(decode_event(event)) == [
+        AgentError("RESOURCE_EXHAUSTED", "quota"),
+        ToolCall("f", {}, None),
+        Usage(3, 0, 0),
+    ]
+
+def test_decode_sse_lines_skips_blank_and_invalid_lines():
+    """Blank and non-JSON lines are ignored"""
+    lines = [b"", b"data: " + json.dumps({"content": {"parts": [{"text": "a"}]}}).encode(), b"data: not json"]
+    assert list(decode_sse_lines(lines)) == [TextDelta("a")]
+
+def test_event_to_dict_tags_type():
+    """Serialized records carry their kind"""
+    assert event_to_dict(Usage(1, 2, 3)) == {"prompt_tokens": 1, "candidates_tokens": 2, "total_tokens": 3, "type": "usage"}
+
+def test_run_agent_collects_text_and_surfaces_errors(monkeypatch):
+    """The buffered path keeps only text, and raises when the agent only reported an error"""
+    monkeypatch.setattr(se_agent, "stream_agent", lambda q, u, s: iter([TextDelta("a"), Usage(1), TextDelta("b")]))
+    assert se_agent.run_agent("q", "u", "s") == ["a", "b"]
+
+    monkeypatch.setattr(se_agent, "stream_agent", lambda q, u, s: iter([AgentError("500", "boom")]))
+    try:
+        se_agent.run_agent("q", "u", "s")
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "boom" in str(e)
+
+def test_run_agent_stream_endpoint_emits_typed_sse(monkeypatch):
+    """The streaming endpoint forwards each record as a typed SSE event"""
+    def fake_stream(question, uid, session_id):
+        yield TextDelta(f"echo {question}")
+        yield ToolCall("lookup", {"q": question})
+        raise RuntimeError("upstream closed")
+
+    monkeypatch.setattr(se, "stream_agent", fake_stream)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/apps/se/run_agent_stream/u1/s1", json={"question": "hi"})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events] == ["text", "tool_call", "error"]
+    assert events[0]["text"] == "echo hi"
+    assert events[2]["message"] == "upstream closed"
@@ -0,0 +1,55 @@
+import asyncio
+from app.schemas.se_user import SEUserCreate, SEUserUpdate
+from app.services import se_user_management
+from benchmarks.stubs import FakeFirestoreClient, LatencyProfile
+
+def use_async_client(monkeypatch, db):
+    client = db.async_client()
+    monkeypatch.setattr(se_user_management, "async_firestore_client_ready", lambda: True)
+    monkeypatch.setattr(se_user_management, "get_async_firestore_client", lambda: client)
+
+def test_async_user_functions_match_blocking_ones(monkeypatch):
+    """Create, read, update and delete through the async client"""
+    db = FakeFirestoreClient()
+    use_async_client(monkeypatch, db)
+    user = SEUserCreate(first_name="Ada", last_name="L", grade_level=5, group_ids=["g1"], language="en", preferred_type="text")
+
+    async def scenario():
+        created = await se_user_management.create_se_user_async("ada", user)
+        fetched = await se_user_management.get_se_user_async("ada")
+        updated = await se_user_management.update_se_user_async("ada", SEUserUpdate(grade_level=6))
+        deleted = await se_user_management.delete_se_user_async("ada")
+        return created, fetched, updated, deleted, await se_user_management.get_se_user_async("ada")
+
+    created, fetched, updated, deleted, gone = asyncio.run(scenario())
+    assert fetched == created
+    assert (updated.grade_level, updated.first_name) == (6, "Ada")
+    assert deleted and gone is None
+    assert asyncio.run(se_user_management.update_se_user_async("nobody", SEUserUpdate(grade_level=1))) is None
+
+def test_async_usage_log_and_summary(monkeypatch):
+    db = FakeFirestoreClient()
+    use_async_client(monkeypatch, db)
+
+    async def scenario():
+        for length in (100, 200):
+            assert await se_user_management.log_usage_async("u1", "essay", {"grade_level": 5, "essay_length": length})
+        return await se_user_management.fetch_usage_summary_async("u1")
+
+    assert [entry["word_count"] for entry in asyncio.run(scenario())] == [200, 100]
+
+def test_concurrent_reads_overlap(monkeypatch):
+    """Ten 100 ms reads take about one round trip on the event loop, not ten"""
+    db = FakeFirestoreClient(LatencyProfile(mean_ms=100))
+    db.seed_user("u1")
+    use_async_client(monkeypatch, db)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        users = await asyncio.gather(*(se_user_management.get_se_user_async("u1") for _ in range(10)))
+        return users, loop.time() - start
+
+    users, elapsed = asyncio.run(scenario())
+    assert all(user.first_name == "Load" for user in users)
+    assert elapsed < 0.5
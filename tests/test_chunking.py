@@ -0,0 +1,133 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.services import se_executor, se_prompt
+from app.services.se_admission import AdmissionController, InMemoryTokenBucketBackend
+from app.services.se_chunking import TTLCache, split_sentences, stitch
+from app.services.se_executor import Bulkhead
+from conftest import FakeClock
+
+LONG_TEXT = (
+    "I went to the park today with my sister. We saw a big dog chasing a ball! "
+    "Then it started raining cats and dogs. Did you ever get that wet?\n\n"
+    "Tomorrow I want to go again if it is sunny."
+)
+
+@pytest.fixture
+def chunked(monkeypatch):
+    """Chunking on, with a fresh cache and a Gemini double that upper-cases each sentence"""
+    calls = []
+    lock = threading.Lock()
+    active = [0, 0]  # running now, most at once
+
+    def fake_results(prompt, prefix=None):
+        sentence = prompt.split("---")[1].strip()
+        with lock:
+            calls.append(sentence)
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return None if sentence.startswith("FAIL") else sentence.upper()
+
+    monkeypatch.setattr(se_prompt, "get_prompt_results", fake_results)
+    monkeypatch.setattr(se_prompt, "PARAPHRASE_CHUNKING", True)
+    monkeypatch.setattr(se_prompt, "PARAPHRASE_CHUNK_MIN_CHARS", 50)
+    monkeypatch.setattr(se_prompt, "_chunk_cache", TTLCache(100, 60))
+    return calls, active
+
+def test_split_sentences_keeps_separators():
+    """Chunks rejoin into the original text and stitching keeps paragraph breaks"""
+    chunks = split_sentences(LONG_TEXT)
+    assert [c.text for c in chunks][:2] == ["I went to the park today with my sister.", "We saw a big dog chasing a ball!"]
+    assert "".join(c.text + c.separator for c in chunks) == LONG_TEXT
+    assert stitch(chunks, [c.text for c in chunks]) == LONG_TEXT
+    assert split_sentences('She said "hi." Then left') == [("She said \"hi.\"", " "), ("Then left", "")]
+
+def test_ttl_cache_expires_and_evicts():
+    """Entries expire after the TTL and the least recently used entry is evicted"""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    clock.now = 10
+    assert cache.get("a") is None
+
+def test_long_text_is_paraphrased_concurrently_in_order(chunked):
+    """Each sentence is sent separately, in parallel, and stitched back in order"""
+    calls, active = chunked
+    result = se_prompt.get_outgoing_paraphrase(LONG_TEXT)
+    assert len(calls) == 5
+    assert active[1] > 1
+    assert result.startswith("I WENT TO THE PARK TODAY WITH MY SISTER. WE SAW A BIG DOG")
+    assert "THAT WET?\n\nTOMORROW" in result
+
+def test_editing_one_sentence_only_redoes_that_sentence(chunked):
+    """Unchanged sentences come from the per-chunk cache"""
+    calls, _ = chunked
+    se_prompt.get_incoming_paraphrase(LONG_TEXT)
+    calls.clear()
+    edited = LONG_TEXT.replace("a big dog", "a small cat")
+    result = se_prompt.get_incoming_paraphrase(edited)
+    assert calls == ["We saw a small cat chasing a ball!"]
+    assert "A SMALL CAT" in result
+
+def test_failed_sentence_fails_the_paraphrase(chunked):
+    """One failed sentence makes the whole result None; the others stay cached"""
+    calls, _ = chunked
+    assert se_prompt.get_outgoing_paraphrase("FAIL this one please. " + LONG_TEXT) is None
+    calls.clear()
+    assert se_prompt.get_outgoing_paraphrase("FAIL this one please. " + LONG_TEXT) is None
+    assert calls == ["FAIL this one please."]
+
+def test_short_text_is_one_prompt(chunked):
+    """Texts under the chunking threshold go to Gemini as a single prompt"""
+    calls, _ = chunked
+    assert se_prompt.get_outgoing_paraphrase("Hi. How are you?") == "HI. HOW ARE YOU?"
+    assert calls == ["Hi. How are you?"]
+
+def test_stream_yields_one_piece_per_sentence(chunked):
+    """The streaming variant yields sentences in order; joined, they match the stitched result"""
+    pieces = list(se_prompt.stream_outgoing_paraphrase(LONG_TEXT))
+    assert len(pieces) == 5
+    assert pieces[0] == "I WENT TO THE PARK TODAY WITH MY SISTER. "
+    assert "".join(pieces) == se_prompt.get_outgoing_paraphrase(LONG_TEXT)
+
+def test_fan_out_is_capped_and_runs_on_the_gemini_bulkhead(chunked, monkeypatch):
+    """One request has at most PARAPHRASE_CHUNK_FAN_OUT sentences in flight; a full bulkhead leaves the rest to the caller"""
+    calls, active = chunked
+    monkeypatch.setattr(se_prompt, "PARAPHRASE_CHUNK_FAN_OUT", 2)
+    assert se_prompt.get_outgoing_paraphrase(LONG_TEXT).startswith("I WENT TO THE PARK")
+    assert (len(calls), active[1]) == (5, 2)
+
+    calls.clear()
+    active[1] = 0
+    se_prompt._chunk_cache.clear()
+    monkeypatch.setattr(se_prompt, "PARAPHRASE_CHUNK_FAN_OUT", 8)
+    monkeypatch.setitem(se_executor.bulkheads, "gemini", Bulkhead("gemini", max_workers=1, max_queue=0))
+    assert se_prompt.get_outgoing_paraphrase(LONG_TEXT).startswith("I WENT TO THE PARK")
+    assert (len(calls), active[1]) == (5, 2)
+
+def test_each_uncached_sentence_is_charged_to_the_rate_limit(chunked, monkeypatch):
+    """A chunked paraphrase takes one token per Gemini call; more than the bucket holds is a 429"""
+    calls, _ = chunked
+    controller = AdmissionController(InMemoryTokenBucketBackend(), rate_limits={"gemini": (0.01, 7), "default": (0, 0)})
+    monkeypatch.setattr(main, "admission", controller)
+    client = TestClient(main.app)
+
+    def paraphrase(text):
+        return client.post("/apps/se/outgoing_paraphrase", json={"text_content": text})
+
+    assert paraphrase(LONG_TEXT).status_code == 200  # 5 tokens
+    assert paraphrase(LONG_TEXT).status_code == 200  # Cached: 1 token
+    assert len(calls) == 5
+    edited = LONG_TEXT.replace("a big dog", "a small cat").replace("sunny", "warm")
+    rejected = paraphrase(edited)  # 2 Gemini calls, 1 token left
+    assert rejected.status_code == 429 and int(rejected.headers["Retry-After"]) > 1
+    assert len(calls) == 5
@@ -0,0 +1,47 @@
+import threading
+import time
+import pytest
+from app.config import cloud_config
+from app.config.cloud_config import LazySingleton
+
+def test_import_does_not_initialize_clients():
+    """Importing cloud_config must not touch the network"""
+    assert not cloud_config._service_account_creds.is_ready()
+    assert not cloud_config._secret_client.is_ready()
+    assert not cloud_config._db_app.is_ready()
+
+def test_lazy_singleton_builds_once_under_concurrency():
+    """Concurrent callers share a single factory call"""
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    singleton = LazySingleton(factory, "test value")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(singleton.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(set(id(r) for r in results)) == 1
+
+def test_lazy_singleton_retries_after_failure():
+    """A failed build is not cached"""
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    singleton = LazySingleton(factory, "flaky value")
+    with pytest.raises(RuntimeError):
+        singleton.get()
+    assert singleton.get() == "ok"
+    assert len(attempts) == 2
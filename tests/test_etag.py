@@ -0,0 +1,139 @@
+import os
+import httpx
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.schemas.se_user import SEUserResponse
+from app.services import se_proxy
+from app.services.se_etag import ETagCache, etag_matches, make_etag
+from conftest import Body, FakeClock
+
+USER = SEUserResponse(
+    first_name="Ada", last_name="Lovelace", grade_level=5, group_ids=["g1"],
+    language="en", preferred_type="text", created_at=datetime(2025, 1, 1),
+)
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(se, "user_etags", ETagCache())
+    monkeypatch.setattr(se, "text_log_etags", ETagCache())
+
+def test_etag_matching_rules():
+    """If-None-Match uses weak comparison and accepts lists and *"""
+    etag = make_etag("user", "u1", 1)
+    assert etag.startswith('"') and etag == make_etag("user", "u1", 1)
+    assert etag != make_etag("user", "u1", 2)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_cache_expiry_and_owner_invalidation():
+    """Entries expire after the TTL and a write drops every key of its owner"""
+    clock = FakeClock()
+    cache = ETagCache(ttl=5, clock=clock)
+    cache.set("u1", "a", '"1"')
+    cache.set("u1", "b", '"2"')
+    assert cache.get("u1", "a") == '"1"'
+    clock.now = 6
+    assert cache.get("u1", "a") is None
+    cache.set("u1", "a", '"3"')
+    cache.invalidate("u1")
+    assert cache.get("u1", "a") is None
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_invalidation_reaches_forked_workers():
+    """A write handled by one worker drops the ETags other workers cached, even mid-lookup"""
+    cache = ETagCache(ttl=60)
+    cache.set("u1", "a", '"1"')
+    before_lookup = cache.stamp("u2")
+    pid = os.fork()
+    if pid == 0:
+        cache.invalidate("u1")
+        cache.invalidate("u2")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert cache.get("u1", "a") is None
+    # Version read before the other worker's write: not trusted
+    cache.set("u2", "a", '"old"', before_lookup)
+    assert cache.get("u2", "a") is None
+    cache.set("u2", "a", '"new"', cache.stamp("u2"))
+    assert cache.get("u2", "a") == '"new"'
+
+def test_user_profile_304_skips_firestore_when_cached(monkeypatch):
+    """A current If-None-Match gets 304; while the ETag is cached Firestore is not read"""
+    reads = []
+
+    async def versioned(uid):
+        reads.append(uid)
+        return USER, datetime(2025, 3, 1, 8, 0)
+
+    monkeypatch.setattr(se, "get_se_user_versioned_async", versioned)
+    client = TestClient(app)
+
+    first = client.get("/apps/se/users/ada")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()["first_name"] == "Ada"
+
+    second = client.get("/apps/se/users/ada", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+    assert reads == ["ada"]
+
+    # After a write the next poll goes back to Firestore and sees the new version
+    se.user_etags.invalidate("ada")
+    async def updated(uid):
+        return USER, datetime(2025, 3, 2)
+
+    monkeypatch.setattr(se, "get_se_user_versioned_async", updated)
+    third = client.get("/apps/se/users/ada", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+
+def test_text_logs_304_from_high_water_mark(monkeypatch):
+    """Text-log ETags come from the high-water mark; a match never reaches the text-log server"""
+    marks = []
+    proxied = []
+
+    def high_water_mark(uid, session_id=None, text_type=None, read_after=None, limit=None):
+        marks.append((uid, session_id, text_type, limit))
+        return datetime(2025, 5, 1, 12, 0), 3
+
+    def handler(request):
+        proxied.append(str(request.url))
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=Body(b'[{"text_content":"hi"}]'))
+
+    monkeypatch.setattr(se, "get_text_log_high_water_mark", high_water_mark)
+    monkeypatch.setattr(se, "fetch_latest_text_logs", lambda uid, limit: [])
+    monkeypatch.setattr(se_proxy, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client = TestClient(app)
+
+    # An unconditional poll does not wait for the high-water mark; it is
+    # computed after the response and the next poll carries the ETag
+    first = client.get("/apps/se/text_logs/u1/s1")
+    assert first.status_code == 200 and first.json() == [{"text_content": "hi"}]
+    assert "etag" not in first.headers
+    assert marks == [("u1", "s1", None, None)]
+    etag = client.get("/apps/se/text_logs/u1/s1").headers["etag"]
+    assert len(marks) == 1
+
+    assert client.get("/apps/se/text_logs/u1/s1", headers={"If-None-Match": etag}).status_code == 304
+    assert len(marks) == 1
+    assert len(proxied) == 2
+
+    # Cache expired: the high-water mark is re-checked, but the listing is still not fetched
+    se.text_log_etags = ETagCache(ttl=0)
+    assert client.get("/apps/se/text_logs/u1/s1", headers={"If-None-Match": etag}).status_code == 304
+    assert len(marks) == 2 and len(proxied) == 2
+
+    # Different listings of one user have different ETags
+    latest = client.get("/apps/se/latest_text_logs/u1")
+    assert latest.headers["etag"] != etag
+
+    # The proxied latest view only reads the newest rows for its mark
+    limit = se.latest_text_logs.capacity + 1
+    assert client.get(f"/apps/se/latest_text_logs/u2?limit={limit}", headers={"If-None-Match": etag}).status_code == 200
+    assert marks[-1] == ("u2", None, None, limit)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from app.main import app
+from app.api import se
+from app.services.se_executor import Bulkhead, BulkheadFullError
+from app.services.se_timing import end_request_timing, record_span, start_request_timing
+
+def test_bulkhead_rejects_when_queue_is_full():
+    """Calls beyond workers + queue fail fast with a 503"""
+    release = threading.Event()
+    bulkhead = Bulkhead("test", max_workers=1, max_queue=1)
+
+    async def scenario():
+        running = asyncio.ensure_future(bulkhead.run(release.wait))
+        queued = asyncio.ensure_future(bulkhead.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(BulkheadFullError) as exc_info:
+            await bulkhead.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert bulkhead.pending == 0
+    bulkhead.shutdown()
+
+def test_bulkhead_carries_request_context():
+    """Spans recorded in the worker thread land on the caller's request"""
+    bulkhead = Bulkhead("test_context", max_workers=1, max_queue=0)
+
+    async def scenario():
+        token = start_request_timing()
+        await bulkhead.run(record_span, "firestore", 1.0)
+        return end_request_timing(token)
+
+    assert asyncio.run(scenario()) == [("firestore", 1.0)]
+    bulkhead.shutdown()
+
+def test_firestore_stall_does_not_block_other_routes(monkeypatch):
+    """A stuck Firestore read leaves the event loop free for other requests"""
+    release = asyncio.Event()
+
+    async def stalled_get_se_user(uid):
+        await asyncio.wait_for(release.wait(), 5)
+        return None, None
+
+    monkeypatch.setattr(se, "get_se_user_versioned_async", stalled_get_se_user)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stalled = asyncio.ensure_future(client.get("/apps/se/users/slow"))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            health = await client.get("/")
+            elapsed = time.perf_counter() - start
+            release.set()
+            return health, elapsed, await stalled
+
+    health, elapsed, stalled = asyncio.run(scenario())
+    assert health.status_code == 200
+    assert elapsed < 1.0
+    assert stalled.status_code == 404
@@ -0,0 +1,57 @@
+import timeit
+from app.services import se_prompt
+from app.services.se_idioms import find_idioms, idiom_hints, literal_answer
+from benchmarks.microbench import IDIOM_TEXT
+
+def test_find_idioms_longest_match_with_offsets():
+    """Matches are case-insensitive, longest-first and carry offsets into the original text"""
+    text = "Honestly, It’s a piece of cake. Don't let the cat out of the bag!"
+    matches = find_idioms(text)
+    assert [m.idiom for m in matches] == ["a piece of cake", "let the cat out of the bag"]
+    assert text[matches[0].start:matches[0].end] == "a piece of cake"
+    assert text[matches[1].start:matches[1].end] == "let the cat out of the bag"
+
+def test_idiom_only_inputs_are_answered_locally():
+    """Short texts made only of idioms and filler words get a literal answer"""
+    assert literal_answer("It's raining cats and dogs!") == "It's raining very heavily!"
+    assert literal_answer("Break a leg!") == "Good luck!"
+    assert literal_answer("Wow, that's a piece of cake") == "Wow, that's very easy"
+
+def test_other_inputs_are_not_answered_locally():
+    """Texts with other words, no idioms, or over the length limit go to the model"""
+    assert literal_answer("Don't spill the beans about the surprise party.") is None
+    assert literal_answer("See you at lunch") is None
+    assert literal_answer("Break a leg! " * 20) is None
+
+def test_hints_list_each_idiom_once():
+    matches = find_idioms("Break a leg, really, break a leg and don't spill the beans")
+    assert idiom_hints(matches) == 'Idioms in this text: "break a leg" means "good luck"; "spill the beans" means "tell the secret".'
+    assert idiom_hints([]) is None
+
+def test_incoming_paraphrase_fast_path_and_hints(monkeypatch):
+    """The lexicon answers idiom-only input without Gemini and adds hints to model prompts"""
+    prompts = []
+
+    def fake_results(prompt, prefix=None):
+        prompts.append(prompt)
+        return "model answer"
+
+    monkeypatch.setattr(se_prompt, "get_prompt_results", fake_results)
+    assert se_prompt.get_incoming_paraphrase("It's raining cats and dogs!") == "It's raining very heavily!"
+    assert prompts == []
+
+    assert se_prompt.get_incoming_paraphrase("Don't spill the beans about the party.") == "model answer"
+    assert '"spill the beans" means "tell the secret"' in prompts[0]
+    assert prompts[0].endswith("Explain it to me:")
+
+def test_fast_path_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(se_prompt, "IDIOM_FAST_PATH", False)
+    monkeypatch.setattr(se_prompt, "get_prompt_results", lambda prompt, prefix=None: "model answer")
+    assert se_prompt.get_incoming_paraphrase("Break a leg!") == "model answer"
+
+def test_matching_1000_chars_is_sub_millisecond():
+    """Scanning a 1,000-character message takes well under a millisecond"""
+    text = IDIOM_TEXT[:1000]
+    assert len(find_idioms(text)) >= 3
+    per_call = min(timeit.repeat(lambda: find_idioms(text), number=50, repeat=5)) / 50
+    assert per_call < 0.001, f"find_idioms took {per_call * 1e6:.0f}us on 1,000 characters"
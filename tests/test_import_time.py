@@ -0,0 +1,20 @@
+import os
+import pytest
+from benchmarks.profile_imports import HEAVY_MODULES, run_importtime, total_import_ms
+
+# Cold import budget for app.main in milliseconds. Override on slow machines.
+IMPORT_BUDGET_MS = float(os.getenv("SE_IMPORT_BUDGET_MS", "1000"))
+
+@pytest.fixture(scope="module")
+def import_records():
+    return run_importtime("app.main")
+
+def test_cold_import_within_budget(import_records):
+    """Importing app.main must stay within the cold-start budget"""
+    total_ms = total_import_ms(import_records, "app.main")
+    assert total_ms < IMPORT_BUDGET_MS, f"app.main cold import took {total_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+def test_heavy_sdks_are_lazy(import_records):
+    """Google SDKs, psycopg2 and HTTP clients load on first use, not at import"""
+    imported = {record.module for record in import_records}
+    assert [m for m in HEAVY_MODULES if m in imported] == []
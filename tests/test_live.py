@@ -0,0 +1,164 @@
+import asyncio
+import json
+import httpx
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.services.se_agent_events import TextDelta, Usage
+from app.services.se_admission import HIGH, AdmissionController, InMemoryTokenBucketBackend
+from app.services.se_live import LiveConnection
+
+def receive_until_done(ws, message_id):
+    """Frames for one operation, up to and including its result or error"""
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        if frame.get("id") != message_id:
+            continue
+        frames.append(frame)
+        if frame["type"] in ("result", "error"):
+            return frames
+
+def test_paraphrase_streams_pieces_then_result(monkeypatch):
+    """Paraphrase pieces arrive as chunk frames followed by the full result"""
+    monkeypatch.setattr(se, "stream_outgoing_paraphrase", lambda text: iter(["Hello there. ", "How are you?"]))
+    with TestClient(app).websocket_connect("/apps/se/live/u1/s1") as ws:
+        ws.send_json({"id": "1", "type": "outgoing_paraphrase", "text_content": "hi. how r u"})
+        frames = receive_until_done(ws, "1")
+    assert [f["type"] for f in frames] == ["chunk", "chunk", "result"]
+    assert frames[0]["data"] == {"text": "Hello there. "}
+    assert frames[-1]["data"] == {"status": "success", "paraphrase": "Hello there. How are you?"}
+
+def test_agent_events_text_log_and_errors(monkeypatch):
+    """Agent events stream as typed frames; text logs are written upstream; failures map to REST statuses"""
+    def fake_stream_agent(question, uid, session_id):
+        yield TextDelta("Hi ", "agent")
+        yield TextDelta(f"{uid}!", "agent")
+        yield Usage(3, 2, 5)
+
+    posted = []
+
+    async def fake_post_json(url, payload, headers=None):
+        posted.append((url, payload))
+        return httpx.Response(201, json={"status": "success"})
+
+    def failing(text):
+        raise ValueError("Text content is too long. Maximum length is 1,000 characters.")
+        yield
+
+    monkeypatch.setattr(se, "stream_agent", fake_stream_agent)
+    monkeypatch.setattr(se, "post_json", fake_post_json)
+    monkeypatch.setattr(se, "stream_incoming_paraphrase", failing)
+    with TestClient(app).websocket_connect("/apps/se/live/u1/s1") as ws:
+        ws.send_json({"id": "a", "type": "run_agent", "question": "hello?"})
+        agent = receive_until_done(ws, "a")
+        ws.send_json({"id": "t", "type": "text_log", "text_content": "hello", "text_type": "outgoing"})
+        log = receive_until_done(ws, "t")
+        ws.send_json({"id": "p", "type": "incoming_paraphrase", "text_content": "x"})
+        bad = receive_until_done(ws, "p")
+        ws.send_json({"id": "q", "type": "nope"})
+        unknown = receive_until_done(ws, "q")
+        ws.send_json({"id": "r", "type": "text_log"})
+        invalid = receive_until_done(ws, "r")
+        ws.send_text("not json")
+        assert ws.receive_json()["status"] == 400
+        ws.send_json({"id": 7, "type": "ping"})
+        assert ws.receive_json() == {"id": 7, "type": "pong"}
+
+    assert [f["data"]["type"] for f in agent[:-1]] == ["text", "text", "usage"]
+    assert agent[-1]["data"]["agent_response"] == ["Hi ", "u1!"]
+    assert log[-1]["data"].pop("read_after").startswith("t=")
+    assert log[-1]["data"] == {"status": "success"}
+    assert posted == [(f"{se.TEXT_LOG_SERVER_URL}/apps/se/text_logs/u1/s1", {"text_content": "hello", "text_type": "outgoing"})]
+    assert (bad[-1]["type"], bad[-1]["status"]) == ("error", 422)
+    assert unknown[-1]["status"] == 400
+    assert invalid[-1]["status"] == 422
+
+class FakeWebSocket:
+    """Feeds queued client messages and records sends, optionally stalling them"""
+
+    def __init__(self, messages, send_delay=0.0):
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(message)})
+        self.sent = []
+        self.send_delay = send_delay
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(json.loads(text))
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+def test_in_flight_limit_bounds_concurrent_operations():
+    """With one slot, the next message is not even read until the running operation ends"""
+    running = []
+    peak = []
+
+    async def slow(message):
+        running.append(message["id"])
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(message["id"])
+        yield "result", message["id"]
+
+    async def scenario():
+        ws = FakeWebSocket([{"id": i, "type": "slow"} for i in range(4)])
+        connection = LiveConnection(ws, {"slow": slow}, max_in_flight=1)
+        task = asyncio.create_task(connection.run())
+        while len(ws.sent) < 4:
+            await asyncio.sleep(0.01)
+        ws.disconnect()
+        await task
+        return ws.sent
+
+    sent = asyncio.run(scenario())
+    assert max(peak) == 1
+    assert [frame["data"] for frame in sent] == [0, 1, 2, 3]
+
+def test_slow_reader_pauses_the_producer():
+    """A full send queue makes the handler wait instead of buffering every frame"""
+    produced = []
+
+    async def firehose(message):
+        for i in range(50):
+            produced.append(i)
+            yield "chunk", i
+        yield "result", None
+
+    async def scenario():
+        ws = FakeWebSocket([{"id": "f", "type": "firehose"}], send_delay=0.01)
+        connection = LiveConnection(ws, {"firehose": firehose}, send_queue_size=4)
+        task = asyncio.create_task(connection.run())
+        await asyncio.sleep(0.05)
+        in_flight = len(produced) - len(ws.sent)
+        ws.disconnect()
+        await task
+        return in_flight
+
+    # Frames produced but not yet sent: the queue plus the one being sent and one waiting to enter
+    assert asyncio.run(scenario()) <= 4 + 2
+
+def test_operations_are_admitted_like_rest_requests(monkeypatch):
+    """Paraphrases over one socket draw from the client's gemini bucket; rejections are 429 error frames"""
+    controller = AdmissionController(InMemoryTokenBucketBackend(), rate_limits={"gemini": (0.01, 2), "default": (0, 0)})
+    monkeypatch.setattr(app.state, "admission", controller)
+    monkeypatch.setattr(se, "stream_outgoing_paraphrase", lambda text: iter(["ok"]))
+    with TestClient(app).websocket_connect("/apps/se/live/u1/s1") as ws:
+        results = []
+        for i in range(3):
+            ws.send_json({"id": str(i), "type": "outgoing_paraphrase", "text_content": "hi"})
+            results.append(receive_until_done(ws, str(i))[-1])
+    assert [frame["type"] for frame in results] == ["result", "result", "error"]
+    assert (results[2]["status"], results[2]["retry_after"]) == (429, 100)
+    assert controller.in_flight == 0
+
+    # Shed like the REST route once the server is saturated
+    controller.shed_thresholds = {HIGH: 0}
+    with TestClient(app).websocket_connect("/apps/se/live/u2/s1") as ws:
+        ws.send_json({"id": "a", "type": "run_agent", "question": "hello?"})
+        assert receive_until_done(ws, "a")[-1]["status"] == 503
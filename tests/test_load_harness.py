@@ -0,0 +1,52 @@
+import asyncio
+from benchmarks import load_test
+from benchmarks.stubs import FakeFirestoreClient, LatencyProfile, make_fake_gemini
+
+def test_percentile_nearest_rank():
+    """Nearest-rank percentiles over a sorted sample"""
+    values = [float(v) for v in range(1, 101)]
+    assert load_test.percentile(values, 50) == 50.0
+    assert load_test.percentile(values, 99) == 99.0
+    assert load_test.percentile([7.0], 90) == 7.0
+
+def test_fake_firestore_round_trip():
+    """The Firestore double supports the calls se_user_management makes"""
+    db = FakeFirestoreClient()
+    db.seed_user("u1")
+    assert db.collection("se_users").document("u1").get().to_dict()["first_name"] == "Load"
+    entries = db.collection("se_usage_logs").document("u1").collection("entries")
+    for i in range(3):
+        entries.add({"timestamp": i})
+    latest = entries.order_by("timestamp", direction="DESCENDING").limit(2).get()
+    assert [s.to_dict()["timestamp"] for s in latest] == [2, 1]
+
+def test_fake_async_firestore_shares_documents():
+    """The async view awaits each call and sees the same documents"""
+    db = FakeFirestoreClient()
+    db.seed_user("u1")
+    users = db.async_client().collection("se_users")
+
+    async def scenario():
+        await users.document("u2").set({"first_name": "Async"})
+        await users.document("u1").delete()
+        return (await users.document("u1").get()).exists
+
+    assert asyncio.run(scenario()) is False
+    assert db.collection("se_users").document("u2").get().to_dict() == {"first_name": "Async"}
+
+def test_fake_gemini_echoes_user_text():
+    """The Gemini stub returns the text between the prompt markers"""
+    fake = make_fake_gemini(LatencyProfile())
+    assert fake("m", "instructions\n---\nhello\n---\n") == "[m] hello"
+
+def test_short_load_run_reports_every_route():
+    """A one-second run against the stubs serves every route without errors"""
+    args = load_test.build_parser().parse_args([
+        "--rps", "40", "--duration", "1", "--users", "5",
+        "--gemini-latency-ms", "5", "--agent-latency-ms", "5",
+        "--textlog-latency-ms", "1", "--firestore-latency-ms", "1",
+    ])
+    report = load_test.run_load_test(args)
+    assert set(report) == {route.name for route in load_test.ROUTES}
+    assert sum(row["requests"] for row in report.values()) == 40
+    assert all(row["errors"] == 0 for row in report.values() if row["requests"])
@@ -0,0 +1,30 @@
+import json
+import logging
+from app.config import logging_config
+from app.config.logging_config import StructuredFormatter, should_log_access
+
+def test_errors_and_slow_requests_are_always_logged():
+    """Sampling never drops errors or slow requests"""
+    assert should_log_access(500, 5.0, sample_rate=0.0)
+    assert should_log_access(404, 5.0, sample_rate=0.0)
+    assert should_log_access(200, logging_config.SLOW_REQUEST_MS, sample_rate=0.0)
+
+def test_fast_successful_requests_are_sampled():
+    """Fast 2xx requests follow the sample rate"""
+    assert should_log_access(200, 5.0, sample_rate=1.0)
+    assert not should_log_access(200, 5.0, sample_rate=0.0)
+    kept = sum(should_log_access(200, 5.0, sample_rate=0.25) for _ in range(4000))
+    assert 700 < kept < 1300
+
+def test_access_records_are_formatted_as_json():
+    """Access records become one JSON object; other records keep the text format"""
+    formatter = StructuredFormatter(logging_config.LOG_FORMAT)
+    access = logging.LogRecord("app.access", logging.INFO, __file__, 1, "access", None, None)
+    access.access = {"method": "GET", "path": "/", "status": 200, "duration_ms": 1.5}
+    entry = json.loads(formatter.format(access))
+    assert entry["path"] == "/"
+    assert entry["status"] == 200
+    assert entry["level"] == "INFO"
+
+    plain = logging.LogRecord("app.main", logging.INFO, __file__, 1, "hello", None, None)
+    assert formatter.format(plain).endswith("app.main - INFO - hello")
@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.se_metrics import Counter, Histogram, UPSTREAM_REQUEST_DURATION, render_metrics, time_upstream
+
+def test_histogram_buckets_are_cumulative():
+    """Bucket counts are cumulative and include +Inf, _sum and _count"""
+    hist = Histogram("test_latency_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+    hist.observe("/a", value=0.05)
+    hist.observe("/a", value=0.5)
+    hist.observe("/a", value=5.0)
+
+    text = render_metrics()
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{route="/a"} 3' in text
+    assert "# TYPE test_latency_seconds histogram" in text
+
+def test_label_values_are_escaped():
+    """Quotes and backslashes in label values do not break the format"""
+    counter = Counter("test_escape_total", "Test counter.", ("value",))
+    counter.inc('a"b\\c')
+    assert 'test_escape_total{value="a\\"b\\\\c"} 1' in render_metrics()
+
+def test_time_upstream_records_outcome():
+    """Successful and failed upstream calls are labelled separately"""
+    with time_upstream("test_upstream", "op"):
+        pass
+    with pytest.raises(RuntimeError):
+        with time_upstream("test_upstream", "op"):
+            raise RuntimeError("boom")
+
+    assert UPSTREAM_REQUEST_DURATION.count("test_upstream", "op", "ok") == 1
+    assert UPSTREAM_REQUEST_DURATION.count("test_upstream", "op", "error") == 1
+
+def test_metrics_endpoint_reports_route_templates():
+    """/metrics exposes per-route latency keyed by the route template"""
+    client = TestClient(app)
+    assert client.get("/").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'se_http_request_duration_seconds_count{method="GET",route="/",status="200"}' in response.text
+    assert "se_http_requests_in_flight" in response.text
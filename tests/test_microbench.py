@@ -0,0 +1,22 @@
+import pytest
+from benchmarks import microbench
+
+BASELINES = microbench.load_baselines()
+
+def test_every_case_has_a_baseline():
+    """New cases need a stored baseline (python benchmarks/microbench.py --update)"""
+    assert set(microbench.CASES) <= set(BASELINES)
+
+@pytest.mark.parametrize("name", sorted(microbench.CASES))
+def test_no_regression_against_baseline(name):
+    """Each hot path stays within SE_BENCH_THRESHOLD of its stored baseline"""
+    result = microbench.measure(name, repeat=3)
+    failure = microbench.check_regression(result, BASELINES.get(name))
+    assert failure is None, failure
+
+def test_check_regression_flags_slowdowns():
+    """Only results above baseline * threshold are reported"""
+    baseline = {"relative": 1.0}
+    assert microbench.check_regression(microbench.BenchResult("x", 1.0, 1.9), baseline, 2.0) is None
+    assert "limit 2.00x" in microbench.check_regression(microbench.BenchResult("x", 1.0, 2.1), baseline, 2.0)
+    assert microbench.check_regression(microbench.BenchResult("x", 1.0, 9.0), None) is None
@@ -0,0 +1,128 @@
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.services import se_prompt
+from benchmarks.prompt_tokens import SAMPLE_TEXTS, measure_prompt_tokens
+from benchmarks.stubs import FakeGenAI, count_tokens
+
+@pytest.fixture
+def genai(monkeypatch):
+    fake = FakeGenAI()
+    monkeypatch.setattr(se_prompt, "_genai", lambda: fake)
+    monkeypatch.setattr(se_prompt, "get_gemini_api_key", lambda: "key")
+    monkeypatch.setattr(se_prompt, "GEMINI_MODEL", "prefix-model")
+    monkeypatch.setattr(se_prompt, "GEMINI_FALLBACK_MODEL", "")
+    monkeypatch.setattr(se_prompt, "_models", {})
+    monkeypatch.setattr(se_prompt, "_cached_contents", {})
+    monkeypatch.setattr(se_prompt, "_model_builds", {})
+    return fake
+
+def test_prompts_carry_only_the_user_text():
+    """The per-request prompts no longer repeat the instructions and examples"""
+    prompt = se_prompt.get_outgoing_paraphrase_prompt("I like trains.")
+    assert "I like trains." in prompt
+    assert "language coach" not in prompt
+    assert "language coach" in se_prompt.OUTGOING_PARAPHRASE_PREFIX.system_instruction
+    assert "figurative" not in se_prompt.get_incoming_paraphrase_prompt("Break a leg!")
+
+def test_system_instruction_model_is_built_once(genai):
+    """Without context caching the prefix is set once per model as a system instruction"""
+    for _ in range(3):
+        se_prompt.get_outgoing_paraphrase("Hello there")
+    assert len(se_prompt._models) == 1
+    system_tokens = count_tokens(se_prompt.OUTGOING_PARAPHRASE_PREFIX.system_instruction)
+    assert all(r.system == system_tokens and r.cached == 0 for r in genai.requests)
+
+def test_cached_content_sends_only_user_text(genai, monkeypatch):
+    """With context caching each prefix is cached once and requests send only the user text"""
+    monkeypatch.setattr(se_prompt, "GEMINI_CONTEXT_CACHE", True)
+    for _ in range(3):
+        se_prompt.get_outgoing_paraphrase("Hello there")
+        se_prompt.get_incoming_paraphrase("Hello there")
+    assert genai.caches_created == 2
+    assert all(r.system == 0 and r.cached > 0 for r in genai.requests)
+    assert {r.prompt for r in genai.requests} <= {
+        count_tokens(se_prompt.get_outgoing_paraphrase_prompt("Hello there")),
+        count_tokens(se_prompt.get_incoming_paraphrase_prompt("Hello there")),
+    }
+
+def test_cached_content_is_refreshed_on_expiry(genai, monkeypatch):
+    """An expired cache entry is recreated on the next call"""
+    monkeypatch.setattr(se_prompt, "GEMINI_CONTEXT_CACHE", True)
+    se_prompt.get_outgoing_paraphrase("Hello there")
+    key = ("prefix-model", se_prompt.OUTGOING_PARAPHRASE_PREFIX.name)
+    model, _ = se_prompt._models[key]
+    se_prompt._models[key] = (model, 0.0)
+    se_prompt.get_outgoing_paraphrase("Hello there")
+    assert genai.caches_created == 2
+
+def test_refresh_deletes_the_replaced_cache(genai, monkeypatch):
+    """The cached content a refresh replaces is deleted once in-flight requests have timed out"""
+    monkeypatch.setattr(se_prompt, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(se_prompt, "GEMINI_TIMEOUT_SECONDS", 0.01)
+    se_prompt.get_outgoing_paraphrase("Hello there")
+    key = ("prefix-model", se_prompt.OUTGOING_PARAPHRASE_PREFIX.name)
+    model, _ = se_prompt._models[key]
+    se_prompt._models[key] = (model, 0.0)
+    se_prompt.get_outgoing_paraphrase("Hello there")
+    deadline = time.monotonic() + 2
+    while genai.caches_deleted == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (genai.caches_created, genai.caches_deleted) == (2, 1)
+
+def test_concurrent_expiry_builds_one_cache(genai, monkeypatch):
+    """Threads that find the handle missing together create a single cached content"""
+    monkeypatch.setattr(se_prompt, "GEMINI_CONTEXT_CACHE", True)
+    build = se_prompt._build_model
+
+    def slow_build(*args):
+        time.sleep(0.05)
+        return build(*args)
+
+    monkeypatch.setattr(se_prompt, "_build_model", slow_build)
+    prefix = se_prompt.OUTGOING_PARAPHRASE_PREFIX
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: se_prompt._get_model("prefix-model", prefix), range(8)))
+    assert genai.caches_created == 1
+    assert all(model is models[0] for model in models)
+
+def test_cache_rejection_falls_back_to_system_instruction(monkeypatch):
+    """Prefixes below the provider's cache minimum are sent as a system instruction"""
+    fake = FakeGenAI(min_cache_tokens=10_000)
+    monkeypatch.setattr(se_prompt, "_genai", lambda: fake)
+    monkeypatch.setattr(se_prompt, "get_gemini_api_key", lambda: "key")
+    monkeypatch.setattr(se_prompt, "GEMINI_MODEL", "prefix-model")
+    monkeypatch.setattr(se_prompt, "GEMINI_FALLBACK_MODEL", "")
+    monkeypatch.setattr(se_prompt, "_models", {})
+    monkeypatch.setattr(se_prompt, "_cached_contents", {})
+    monkeypatch.setattr(se_prompt, "_model_builds", {})
+    monkeypatch.setattr(se_prompt, "GEMINI_CONTEXT_CACHE", True)
+    assert se_prompt.get_outgoing_paraphrase("Hello there") == "[prefix-model] ok"
+    assert fake.caches_created == 0
+    assert fake.requests[0].system > 0
+
+def test_missing_cached_content_drops_the_model(genai, monkeypatch):
+    """A NotFound error (cache deleted upstream) forces the model to be rebuilt"""
+    class NotFound(Exception):
+        pass
+
+    def fail(*args, **kwargs):
+        raise NotFound("cached content not found")
+
+    se_prompt._get_model("prefix-model", se_prompt.OUTGOING_PARAPHRASE_PREFIX).generate_content = fail
+    with pytest.raises(NotFound):
+        se_prompt._generate_content("prefix-model", "---\nhi\n---", se_prompt.OUTGOING_PARAPHRASE_PREFIX)
+    assert se_prompt._models == {}
+
+def test_unchunked_paraphrase_streams_gemini_deltas(genai, monkeypatch):
+    """Without sentence chunking the stream forwards each delta Gemini sends"""
+    monkeypatch.setattr(se_prompt, "PARAPHRASE_CHUNKING", False)
+    assert list(se_prompt.stream_outgoing_paraphrase("Hello there")) == ["[prefix-model]", " ok"]
+
+def test_cached_prefix_cuts_tokens_sent_per_request():
+    """Measured with the local stub, cached prefixes send far fewer tokens than inline prompts"""
+    inline = measure_prompt_tokens(SAMPLE_TEXTS, "inline")
+    cached = measure_prompt_tokens(SAMPLE_TEXTS, "cached_content")
+    assert cached["requests"] == inline["requests"] == 2 * len(SAMPLE_TEXTS)
+    assert cached["sent_per_request"] < 0.25 * inline["sent_per_request"]
+    assert cached["caches_created"] == 2
@@ -0,0 +1,77 @@
+import gzip
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.services import se_proxy
+from app.services.se_proxy import filter_headers
+
+class ChunkedBody(httpx.AsyncByteStream):
+    """Unread streaming body, as a real upstream connection would give."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data[:10]
+        yield self.data[10:]
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the proxy's shared client to an in-process handler; returns the seen requests."""
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request)
+        body = gzip.compress(b'[{"text_content": "hello"}]')
+        return httpx.Response(
+            201 if request.method == "POST" else 200,
+            headers=[
+                ("content-type", "application/json"),
+                ("content-encoding", "gzip"),
+                ("set-cookie", "a=1"),
+                ("set-cookie", "b=2"),
+                ("connection", "keep-alive, x-upstream-private"),
+                ("x-upstream-private", "secret"),
+                ("keep-alive", "timeout=5"),
+            ],
+            stream=ChunkedBody(body),
+        )
+
+    monkeypatch.setattr(se_proxy, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(se, "TEXT_LOG_SERVER_URL", "http://textlog")
+    monkeypatch.setattr(se, "get_text_log_high_water_mark", lambda *args: None)
+    return seen
+
+def test_filter_headers_drops_hop_by_hop_and_connection_tokens():
+    """Hop-by-hop headers and those named in Connection are not forwarded"""
+    headers = {"Connection": "close, X-Foo", "X-Foo": "1", "TE": "trailers", "Host": "a", "Accept": "*/*"}
+    assert filter_headers(headers) == {"Accept": "*/*"}
+
+def test_get_streams_raw_bytes_with_headers_preserved(upstream):
+    """The listing is passed through still gzip-encoded, with end-to-end headers intact"""
+    client = TestClient(app)
+    response = client.get("/apps/se/text_logs/u1/s1?text_type=others", headers={"Connection": "keep-alive", "X-Trace": "t1"})
+
+    assert response.status_code == 200
+    assert response.json() == [{"text_content": "hello"}]
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers.get_list("set-cookie") == ["a=1", "b=2"]
+    assert "x-upstream-private" not in response.headers
+    assert "keep-alive" not in response.headers
+
+    forwarded = upstream[0]
+    assert str(forwarded.url) == "http://textlog/apps/se/text_logs/u1/s1?text_type=others"
+    assert forwarded.headers["x-trace"] == "t1"
+    assert forwarded.headers["x-internal-token"] == "my-shared-secret"
+    assert forwarded.headers["host"] == "textlog"
+
+def test_post_streams_request_body_and_status(upstream):
+    """The request body reaches the upstream unchanged and its status is kept"""
+    client = TestClient(app)
+    response = client.post("/apps/se/text_logs/u1/s1", json={"text_content": "hi", "text_type": "others"})
+
+    assert response.status_code == 201
+    assert upstream[0].method == "POST"
+    assert upstream[0].read() == b'{"text_content":"hi","text_type":"others"}'
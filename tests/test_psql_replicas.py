@@ -0,0 +1,216 @@
+import os
+import uuid
+import pytest
+from app.config.cloud_config import LazySingleton
+from app.services import se_psql_management
+from app.services.se_psql_routing import REPLAYED_QUERY, REPLICA_LAG_QUERY, WRITE_POSITION_QUERY, ReadRouter, RecentWrites, read_after_token
+from conftest import FakeClock
+
+class FakeServer:
+    """A Postgres server double: answers the routing queries and names itself for data queries"""
+
+    def __init__(self, name, lag=0.0, replayed=True):
+        self.name = name
+        self.lag = lag
+        self.replayed = replayed
+        self.down = False
+        self.queries = []
+
+    def connect(self):
+        if self.down:
+            raise OSError(f"{self.name} is down")
+        return FakeConnection(self)
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.server = connection.server
+        self.description = [("server",)]
+        self._result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if query == REPLICA_LAG_QUERY:
+            self._result = [(self.server.lag,)]
+        elif query == REPLAYED_QUERY:
+            self._result = [(self.server.replayed,)]
+        elif query == WRITE_POSITION_QUERY:
+            self._result = [("0/16B3748",)]
+        elif query.startswith("PREPARE"):
+            self.server.queries.append(query)
+        else:
+            self.server.queries.append(query)
+            self._result = [(self.server.name,)]
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+def make_router(*replicas, clock=None, **kwargs):
+    clock = clock or FakeClock()
+    primary = FakeServer("primary")
+    servers = {"primary": primary, **{server.name: server for server in replicas}}
+    router = ReadRouter("primary", [server.name for server in replicas], lambda dsn: servers[dsn].connect(),
+                        RecentWrites(clock=clock), clock=clock, **kwargs)
+    return router, primary
+
+def which(cur):
+    cur.execute("SELECT data")
+    return cur.fetchone()[0]
+
+def test_reads_are_spread_over_replicas():
+    """Unpinned reads go to the replicas, both of them, never the primary"""
+    a, b = FakeServer("a"), FakeServer("b")
+    router, primary = make_router(a, b)
+    served = {router.read("get_latest_text_logs", which, "u1") for _ in range(40)}
+    assert served == {"a", "b"}
+    assert primary.queries == []
+
+def test_failed_replica_falls_back_and_is_left_alone():
+    """A replica that fails is skipped for the next, then the primary; its breaker keeps it out"""
+    a, b = FakeServer("a"), FakeServer("b")
+    router, primary = make_router(a, b)
+    a.down = True
+    assert {router.read("get_latest_text_logs", which, "u1") for _ in range(20)} == {"b"}
+    b.down = True
+    assert router.read("get_latest_text_logs", which, "u1") == "primary"
+    assert router.replicas[0].breaker.state == "open"
+
+def test_lagging_replica_is_skipped_until_rechecked():
+    """A replica measured behind max lag gets no reads until its lag is measured again"""
+    clock = FakeClock()
+    a = FakeServer("a", lag=12.0)
+    router, primary = make_router(a, clock=clock, max_lag=5, check_interval=10)
+    assert router.read("get_latest_text_logs", which, "u1") == "primary"
+    a.lag = 0.2
+    assert router.read("get_latest_text_logs", which, "u1") == "primary"
+    clock.now = 10
+    assert router.read("get_latest_text_logs", which, "u1") == "a"
+
+def test_session_reads_its_own_writes():
+    """After a write, the session reads from a replica only once it has replayed that write"""
+    clock = FakeClock()
+    a = FakeServer("a", replayed=False)
+    router, primary = make_router(a, clock=clock)
+    router.recent_writes.note("u1", "s1", "0/16B3748")
+    assert router.read("get_session_text_logs", which, "u1", "s1") == "primary"
+    assert router.read("get_latest_text_logs", which, "u1") == "primary"
+    assert router.read("get_session_text_logs", which, "u1", "other") == "a"
+    a.replayed = True
+    assert router.read("get_session_text_logs", which, "u1", "s1") == "a"
+
+    router.recent_writes.note("u2", "s2")  # Written elsewhere, position unknown
+    assert router.read("get_session_text_logs", which, "u2", "s2") == "primary"
+    clock.now = 31
+    assert router.read("get_session_text_logs", which, "u2", "s2") == "a"
+
+def test_read_after_tokens_carry_writes_between_processes():
+    """Another worker's write reaches this one only through the client's token; without one, reads go to the primary"""
+    clock, wall = FakeClock(), FakeClock()
+    a = FakeServer("a", replayed=False)
+    router, primary = make_router(a, clock=clock, require_read_after=True, wall_clock=wall)
+    wall.now = 1000.0
+    assert router.read("get_session_text_logs", which, "u1", "s1") == "primary"
+    assert router.read("get_session_text_logs", which, "u1", "s1", "0/0") == "a"
+    assert router.read("get_session_text_logs", which, "u1", "s1", "0/16B3748") == "primary"
+    a.replayed = True
+    assert router.read("get_session_text_logs", which, "u1", "s1", "0/16B3748") == "a"
+
+    token = read_after_token(now=wall.now)
+    assert router.read("get_latest_text_logs", which, "u1", read_after=token) == "primary"
+    wall.now += 31
+    assert router.read("get_latest_text_logs", which, "u1", read_after=token) == "a"
+    assert router.read("get_latest_text_logs", which, "u1", read_after="garbage") == "primary"
+
+    # A local pin with an unknown position still wins over an older LSN token
+    router.recent_writes.note("u2", "s2")
+    assert router.read("get_session_text_logs", which, "u2", "s2", "0/16B3748") == "primary"
+
+def test_text_log_functions_route_through_replicas(monkeypatch):
+    """add_text_log pins the session; its reads and other sessions' reads are routed accordingly"""
+    servers = {"primary": FakeServer("primary"), "replica": FakeServer("replica", replayed=False)}
+
+    class FakePsycopg2:
+        @staticmethod
+        def connect(dsn):
+            return servers[dsn].connect()
+
+    monkeypatch.setenv("SE_PSQL_DSN", "primary")
+    monkeypatch.setenv("SE_PSQL_REPLICA_DSNS", "replica")
+    monkeypatch.setattr(se_psql_management, "_psycopg2", lambda: FakePsycopg2)
+    monkeypatch.setattr(se_psql_management, "_pools", {})
+    monkeypatch.setattr(se_psql_management, "recent_text_log_writes", RecentWrites())
+    monkeypatch.setattr(se_psql_management, "_read_router", LazySingleton(se_psql_management._build_read_router, "test router"))
+
+    assert se_psql_management.add_text_log("u1", "s1", "hello")
+    assert se_psql_management.get_session_text_logs("u1", "s1") == [{"server": "primary"}]
+    assert se_psql_management.get_session_text_logs("u1", "s2") == [{"server": "replica"}]
+    se_psql_management.note_text_log_write("u2", "s3")
+    assert se_psql_management.get_latest_text_logs("u2") == [{"server": "primary"}]
+
+PRIMARY_DSN = os.getenv("SE_TEST_PSQL_PRIMARY_DSN")
+REPLICA_DSN = os.getenv("SE_TEST_PSQL_REPLICA_DSN")
+
+@pytest.mark.skipif(not (PRIMARY_DSN and REPLICA_DSN), reason="set SE_TEST_PSQL_PRIMARY_DSN and SE_TEST_PSQL_REPLICA_DSN")
+def test_two_local_postgres_instances(monkeypatch):
+    """
+    With two independent local servers (the second standing in for a
+    replica), unpinned reads see the replica's rows and a session that just
+    wrote sees its own write on the primary.
+    """
+    psycopg2 = pytest.importorskip("psycopg2")
+    uid = f"replica-test-{uuid.uuid4().hex[:8]}"
+    for dsn in (PRIMARY_DSN, REPLICA_DSN):
+        with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS textlog (
+                    uid TEXT, session_id TEXT, timestamp TIMESTAMP, text_type TEXT, text_content TEXT
+                )
+            """)
+    with psycopg2.connect(REPLICA_DSN) as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO textlog VALUES (%s, 'old', now(), 'others', 'from replica')", (uid,))
+
+    monkeypatch.setenv("SE_PSQL_DSN", PRIMARY_DSN)
+    monkeypatch.setenv("SE_PSQL_REPLICA_DSNS", REPLICA_DSN)
+    monkeypatch.setattr(se_psql_management, "_pools", {})
+    monkeypatch.setattr(se_psql_management, "recent_text_log_writes", RecentWrites())
+    monkeypatch.setattr(se_psql_management, "_read_router", LazySingleton(se_psql_management._build_read_router, "test router"))
+    try:
+        assert [row["text_content"] for row in se_psql_management.get_latest_text_logs(uid)] == ["from replica"]
+        assert se_psql_management.add_text_log(uid, "new", "from primary")
+        assert [row["text_content"] for row in se_psql_management.get_session_text_logs(uid, "new")] == ["from primary"]
+        assert se_psql_management.get_session_text_logs(uid, "old")[0]["text_content"] == "from replica"
+    finally:
+        for dsn in (PRIMARY_DSN, REPLICA_DSN):
+            with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+                cur.execute("DELETE FROM textlog WHERE uid = %s", (uid,))
@@ -0,0 +1,106 @@
+import pytest
+from app.services.se_psql_pool import ConnectionPool
+from app.services.se_psql_statements import (
+    TEXTLOG_LATEST,
+    TEXTLOG_SESSION,
+    TEXTLOG_STATEMENTS,
+    execute_prepared,
+    execute_sql,
+    prepare_sql,
+)
+from conftest import FakeClock
+
+class RecordingConnection:
+    """Records every statement it is sent, like a server session's log"""
+
+    def __init__(self):
+        self.statements = []
+        self.closed = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.statements.append((query, params))
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect(dsn):
+        opened.append(RecordingConnection())
+        return opened[-1]
+
+    return ConnectionPool("postgresql://test", connect, **kwargs), opened
+
+def test_statements_are_prepared_once_per_connection():
+    """The first call on a connection prepares; later calls only EXECUTE"""
+    pool, opened = make_pool()
+    for limit in (5, 10, 20):
+        with pool.connection() as conn:
+            execute_prepared(conn.cursor(), TEXTLOG_LATEST, ("u1", limit))
+    with pool.connection() as conn:
+        execute_prepared(conn.cursor(), TEXTLOG_SESSION, ("u1", "s1"))
+
+    assert len(opened) == 1
+    sent = [query for query, _ in opened[0].statements]
+    assert sent == [
+        prepare_sql(TEXTLOG_LATEST),
+        "EXECUTE textlog_latest (%s, %s)",
+        "EXECUTE textlog_latest (%s, %s)",
+        "EXECUTE textlog_latest (%s, %s)",
+        prepare_sql(TEXTLOG_SESSION),
+        "EXECUTE textlog_session (%s, %s)",
+    ]
+    assert opened[0].statements[3][1] == ("u1", 20)
+
+    other = RecordingConnection()
+    execute_prepared(other.cursor(), TEXTLOG_LATEST, ("u1", 5))
+    assert other.statements[0][0] == prepare_sql(TEXTLOG_LATEST)
+
+def test_placeholders_match_parameter_types():
+    for statement in TEXTLOG_STATEMENTS:
+        assert execute_sql(statement).count("%s") == statement.sql.count("$")
+
+def test_pool_rolls_back_and_drops_broken_connections():
+    """Errors roll back; connections that were closed under us are not reused"""
+    pool, opened = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("query failed")
+    assert (opened[0].rollbacks, pool.idle_count()) == (1, 1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.close()
+            raise RuntimeError("server went away")
+    assert pool.idle_count() == 0
+    with pool.connection() as conn:
+        assert conn is opened[1]
+    assert opened[1].commits == 1
+
+def test_pool_closes_connections_idle_too_long_or_beyond_max():
+    clock = FakeClock()
+    pool, opened = make_pool(max_idle=1, max_idle_seconds=60, clock=clock)
+    with pool.connection():
+        with pool.connection():
+            pass
+    assert [conn.closed for conn in opened] == [True, False]
+    clock.now = 60
+    with pool.connection() as conn:
+        assert conn is opened[2]
+    assert opened[1].closed
@@ -0,0 +1,24 @@
+import re
+import tomllib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def test_image_requirements_cover_pyproject():
+    """The Docker image installs requirements.txt, so every dependency and extra must be exported to it"""
+    pyproject = tomllib.loads((ROOT / "pyproject.toml").read_text())["tool"]["poetry"]
+    wanted = {_normalize(name) for name in pyproject["dependencies"] if name != "python"}
+    wanted |= {_normalize(name) for names in pyproject.get("extras", {}).values() for name in names}
+    pinned = {_normalize(match) for match in re.findall(r"^([A-Za-z0-9_.-]+)(?:\[[^\]]*\])?==", (ROOT / "requirements.txt").read_text(), re.M)}
+    assert sorted(wanted - pinned) == []
+
+def test_lock_matches_pyproject():
+    """poetry.lock pins every direct dependency, including the optional ones"""
+    lock = tomllib.loads((ROOT / "poetry.lock").read_text())
+    locked = {_normalize(package["name"]) for package in lock["package"]}
+    pyproject = tomllib.loads((ROOT / "pyproject.toml").read_text())["tool"]["poetry"]
+    assert sorted({_normalize(name) for name in pyproject["dependencies"] if name != "python"} - locked) == []
+    assert lock.get("extras") == pyproject.get("extras")
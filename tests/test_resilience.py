@@ -0,0 +1,147 @@
+import time
+import threading
+import pytest
+from app.services import se_prompt
+from app.services.se_resilience import CircuitBreaker, HedgedCaller, LatencyTracker
+from conftest import FakeClock
+
+def test_circuit_breaker_opens_and_recovers():
+    """Consecutive failures open the breaker; a successful trial closes it"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_trial_reopens_breaker():
+    """A failure while half-open re-opens the breaker immediately"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+def test_latency_tracker_percentile():
+    """Percentiles are only reported once there are enough samples"""
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+    for i in range(9, 100):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) == pytest.approx(0.94)
+
+def test_hedge_wins_when_primary_is_slow():
+    """A slow first attempt is hedged and the faster attempt's result is used"""
+    hedger = HedgedCaller("test", max_workers=4)
+    delays = iter([0.5, 0.0])
+
+    def call():
+        delay = next(delays)
+        time.sleep(delay)
+        return delay
+
+    start = time.perf_counter()
+    result, winner, hedged = hedger.call(call, hedge_after=0.05, timeout=2)
+    assert (result, winner, hedged) == (0.0, "hedge", True)
+    assert time.perf_counter() - start < 0.4
+    hedger.shutdown()
+
+def test_fast_primary_is_not_hedged():
+    """Calls finishing before the hedge delay send a single request"""
+    hedger = HedgedCaller("test", max_workers=4)
+    assert hedger.call(lambda: "ok", hedge_after=1.0, timeout=2) == ("ok", "primary", False)
+    hedger.shutdown()
+
+def test_hedger_times_out():
+    """No result within the deadline raises TimeoutError"""
+    hedger = HedgedCaller("test", max_workers=4)
+    with pytest.raises(TimeoutError):
+        hedger.call(lambda: time.sleep(0.3), hedge_after=None, timeout=0.05)
+    hedger.shutdown()
+
+def test_hedger_never_queues_behind_busy_threads():
+    """With every hedging thread busy, calls run on the caller's thread instead of queueing"""
+    hedger = HedgedCaller("test", max_workers=1)
+    release = threading.Event()
+    threads = []
+
+    def call():
+        threads.append(threading.current_thread())
+        release.wait(2)
+        return "slow"
+
+    with pytest.raises(TimeoutError):
+        hedger.call(call, hedge_after=None, timeout=0.05)
+    assert hedger.call(lambda: threading.current_thread(), hedge_after=0.01, timeout=1) == (threading.current_thread(), "primary", False)
+    release.set()
+    hedger.shutdown()
+    assert threads[0] is not threading.current_thread()
+
+def test_prompt_results_fall_back_when_primary_fails(monkeypatch):
+    """A failing primary model is retried on the fallback model and trips its breaker"""
+    calls = []
+
+    def fake_generate(model_name, prompt, prefix=None):
+        calls.append(model_name)
+        if model_name == "primary-model":
+            raise RuntimeError("503 from Gemini")
+        return "fallback answer"
+
+    class FakeGenai:
+        @staticmethod
+        def configure(api_key):
+            pass
+
+    monkeypatch.setattr(se_prompt, "get_gemini_api_key", lambda: "key")
+    monkeypatch.setattr(se_prompt, "_genai", lambda: FakeGenai)
+    monkeypatch.setattr(se_prompt, "_generate_content", fake_generate)
+    monkeypatch.setattr(se_prompt, "GEMINI_MODEL", "primary-model")
+    monkeypatch.setattr(se_prompt, "GEMINI_FALLBACK_MODEL", "fallback-model")
+    monkeypatch.setattr(se_prompt, "GEMINI_BREAKER_FAILURES", 2)
+
+    assert se_prompt.get_prompt_results("hello") == "fallback answer"
+    assert se_prompt.get_prompt_results("hello") == "fallback answer"
+    # Breaker is now open: the primary is skipped entirely
+    assert se_prompt.get_prompt_results("hello") == "fallback answer"
+    assert calls == ["primary-model", "fallback-model", "primary-model", "fallback-model", "fallback-model"]
+    assert se_prompt.GEMINI_DECISIONS.value("primary-model", "breaker_open") == 1
+
+def test_streamed_results_fall_back_only_before_the_first_delta(monkeypatch):
+    """A stream that fails before any text moves to the fallback; one that breaks off mid-way raises"""
+    def fake_stream(model_name, prompt, prefix=None):
+        if model_name == "stream-primary":
+            raise RuntimeError("503 from Gemini")
+        yield "fall"
+        if prompt == "break":
+            raise RuntimeError("connection reset")
+        yield "back"
+
+    class FakeGenai:
+        @staticmethod
+        def configure(api_key):
+            pass
+
+    monkeypatch.setattr(se_prompt, "get_gemini_api_key", lambda: "key")
+    monkeypatch.setattr(se_prompt, "_genai", lambda: FakeGenai)
+    monkeypatch.setattr(se_prompt, "_generate_content_stream", fake_stream)
+    monkeypatch.setattr(se_prompt, "GEMINI_MODEL", "stream-primary")
+    monkeypatch.setattr(se_prompt, "GEMINI_FALLBACK_MODEL", "stream-fallback")
+
+    assert list(se_prompt.stream_prompt_results("hello")) == ["fall", "back"]
+    pieces = []
+    with pytest.raises(RuntimeError, match="broke off"):
+        for piece in se_prompt.stream_prompt_results("break"):
+            pieces.append(piece)
+    assert pieces == ["fall"]
@@ -0,0 +1,53 @@
+import json
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.schemas.se_user import SEUserResponse
+from app.services import se_serialization
+from app.services.se_serialization import dump_text_log_rows, dump_user_response, dumps
+
+USER = {
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "grade_level": 5,
+    "group_ids": ["g1"],
+    "language": "en",
+    "preferred_type": "text",
+    "created_at": datetime(2025, 1, 1, 9, 30, 15, 123456),
+}
+
+class DatetimeWithNanoseconds(datetime):
+    """Stand-in for the datetime subclass Firestore returns."""
+
+def test_output_matches_fastapi_default_encoding():
+    """Rows, users and nested datetimes encode to the same JSON as before"""
+    rows = [{"uid": "u1", "timestamp": datetime(2025, 5, 1, 12, 0, 0, 5), "text_content": "héllo"}]
+    assert json.loads(dump_text_log_rows(rows)) == jsonable_encoder(rows)
+    user = SEUserResponse(**USER)
+    assert json.loads(dump_user_response(user)) == jsonable_encoder(user)
+    assert json.loads(dump_user_response(USER)) == jsonable_encoder(user)
+
+def test_datetime_subclasses_and_timezones():
+    """Firestore's datetime subclass and aware datetimes are written as ISO 8601"""
+    aware = DatetimeWithNanoseconds(2025, 1, 1, tzinfo=timezone.utc)
+    assert json.loads(dumps({"t": aware})) == {"t": "2025-01-01T00:00:00+00:00"}
+
+def test_stdlib_fallback(monkeypatch):
+    """Without orjson the same JSON comes from the standard library"""
+    content = {"t": datetime(2025, 1, 1), "n": [1, 2], "s": "é"}
+    fast = dumps(content)
+    monkeypatch.setattr(se_serialization, "orjson", None)
+    assert json.loads(dumps(content)) == json.loads(fast)
+
+def test_user_endpoint_uses_prebuilt_serializer(monkeypatch):
+    """GET /users/{uid} returns the SEUserResponse JSON"""
+    async def versioned(uid):
+        return SEUserResponse(**USER), None
+
+    monkeypatch.setattr(se, "get_se_user_versioned_async", versioned)
+    response = TestClient(app).get("/apps/se/users/ada")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["created_at"] == "2025-01-01T09:30:15.123456"
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import httpx
+import pytest
+from app import serve
+from app.config.cloud_config import LazySingleton, _reset_singletons_after_fork
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def drain_app(scope, receive, send):
+    """Tiny ASGI app for the supervisor test: /slow sleeps, every path returns the worker pid"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["path"] == "/slow":
+        await asyncio.sleep(1.0)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+
+def test_cpu_limit_honours_cgroup_quota(tmp_path):
+    """A cgroup v2 quota caps the worker count; "max" means no quota"""
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    assert serve.cpu_limit(str(cpu_max)) == min(2, len(os.sched_getaffinity(0)))
+    cpu_max.write_text("max 100000\n")
+    assert serve.cpu_limit(str(cpu_max)) == len(os.sched_getaffinity(0))
+    assert serve.cpu_limit(str(tmp_path / "missing")) >= 1
+
+def test_worker_count_prefers_configuration(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setenv("SE_WEB_CONCURRENCY", "3")
+    assert serve.worker_count(cpus=8) == 3
+    monkeypatch.delenv("SE_WEB_CONCURRENCY")
+    assert serve.worker_count(cpus=8) == 8
+
+def test_preload_imports_the_lazy_sdks(monkeypatch):
+    """The supervisor imports the lazily loaded SDKs before forking; missing ones are skipped"""
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    assert serve.preload("app.main:app", load_secrets=False, modules=("colorsys", "no_such_sdk")) is not None
+    assert "colorsys" in sys.modules
+    assert "google.generativeai" in serve.PRELOAD_MODULES
+
+def test_lazy_singletons_reset_after_fork():
+    """Values built before fork are dropped in the child and rebuilt on first use"""
+    builds = []
+    singleton = LazySingleton(lambda: builds.append(1) or len(builds), "test value")
+    assert singleton.get() == 1
+    _reset_singletons_after_fork()
+    assert not singleton.is_ready()
+    assert singleton.get() == 2
+
+def test_workers_accept_websocket_upgrades():
+    """The live endpoint needs a WebSocket implementation in every worker"""
+    config = serve.worker_config(drain_app, graceful_timeout=1)
+    config.load()
+    assert config.ws_protocol_class is not None
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_supervisor_serves_and_drains_on_sigterm():
+    """Workers share the socket and finish in-flight requests after SIGTERM"""
+    with serve.bind_socket("127.0.0.1", 0) as probe:
+        port = probe.getsockname()[1]
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, SE_SKIP_WARMUP="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--app", "tests.test_serve:drain_app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", "2", "--graceful-timeout", "5"],
+        cwd=PROJECT_ROOT, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                assert httpx.get(f"{base}/", timeout=1).status_code == 200
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        result = {}
+        slow = threading.Thread(target=lambda: result.update(response=httpx.get(f"{base}/slow", timeout=10)))
+        slow.start()
+        time.sleep(0.3)
+        process.send_signal(signal.SIGTERM)
+        slow.join()
+        assert result["response"].status_code == 200
+        assert int(result["response"].text) != process.pid
+        assert process.wait(timeout=10) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
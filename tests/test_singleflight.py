@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+from app.main import app
+from app.api import se
+from app.services.se_singleflight import SINGLEFLIGHT_COALESCED, SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    """Identical concurrent calls run once and all get the result"""
+    group = SingleFlight("test_share")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return f"value-{key}"
+
+    async def scenario():
+        return await asyncio.gather(*(group.do("a", fetch, "a") for _ in range(5)), group.do("b", fetch, "b"))
+
+    results = asyncio.run(scenario())
+    assert results == ["value-a"] * 5 + ["value-b"]
+    assert calls == ["a", "b"]
+    assert SINGLEFLIGHT_COALESCED.value("test_share") == 4
+    assert group.in_flight() == 0
+
+def test_errors_are_shared_and_not_cached():
+    """All waiters see the error; the next call starts fresh"""
+    group = SingleFlight("test_error")
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(group.do("k", flaky), group.do("k", flaky), return_exceptions=True)
+        return results, await group.do("k", flaky)
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == "ok"
+    assert len(attempts) == 2
+
+def test_leader_cancellation_does_not_cancel_followers():
+    """A disconnecting first caller leaves the shared call running"""
+    group = SingleFlight("test_cancel")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(group.do("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+def test_user_lookups_are_coalesced(monkeypatch):
+    """Concurrent GETs of one profile make a single Firestore read"""
+    calls = []
+
+    async def counting_get_se_user(uid):
+        calls.append(uid)
+        await asyncio.sleep(0.1)
+        return None, None
+
+    monkeypatch.setattr(se, "get_se_user_versioned_async", counting_get_se_user)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/apps/se/users/student1") for _ in range(10)))
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [404] * 10
+    assert calls == ["student1"]
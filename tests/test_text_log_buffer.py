@@ -0,0 +1,138 @@
+import json
+from datetime import datetime, timedelta
+import httpx
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.services import se_proxy
+from app.services.se_text_log_buffer import ROW_OVERHEAD_BYTES, LatestTextLogBuffer
+from app.services.se_write_stamps import WriteStamps
+from conftest import Body, FakeClock
+
+START = datetime(2025, 6, 1, 9, 0)
+
+def row(i, uid="u1", text="hello"):
+    return {"uid": uid, "session_id": "s1", "timestamp": START + timedelta(seconds=i), "text_type": "outgoing", "text_content": f"{text} {i}"}
+
+def newest_first(count, uid="u1"):
+    return [row(i, uid) for i in reversed(range(count))]
+
+def test_ring_keeps_the_newest_rows():
+    """Reads come back newest first; appends push the oldest row out"""
+    buffer = LatestTextLogBuffer(capacity=3, refresh_seconds=0)
+    assert buffer.get("u1", 2) is None
+    buffer.begin_fill("u1")
+    assert buffer.fill("u1", newest_first(3))
+    assert [r["text_content"] for r in buffer.get("u1", 2)] == ["hello 2", "hello 1"]
+
+    buffer.append("u1", row(3))
+    assert [r["text_content"] for r in buffer.get("u1", 3)] == ["hello 3", "hello 2", "hello 1"]
+    assert buffer.get("u1", 4) is None
+    buffer.append("u2", row(0, "u2"))  # Not buffered: left for its first read
+    assert buffer.get("u2", 1) is None
+
+def test_users_with_few_rows_answer_any_limit():
+    buffer = LatestTextLogBuffer(capacity=5, refresh_seconds=0)
+    buffer.begin_fill("u1")
+    buffer.fill("u1", newest_first(2))
+    assert len(buffer.get("u1", 100)) == 2
+
+def test_write_during_fill_discards_the_fill():
+    """Rows read before a concurrent write are not cached; the next read refills"""
+    buffer = LatestTextLogBuffer(capacity=5, refresh_seconds=0)
+    buffer.begin_fill("u1")
+    buffer.append("u1", row(9))
+    assert not buffer.fill("u1", newest_first(2))
+    assert buffer.get("u1", 2) is None
+
+def test_writes_through_another_worker_drop_the_buffer():
+    """Workers share write stamps: a write through one makes the others refill instead of serving stale rows"""
+    stamps = WriteStamps(slots=64)
+    here, there = (LatestTextLogBuffer(capacity=5, refresh_seconds=0, stamps=stamps) for _ in range(2))
+    for buffer in (here, there):
+        buffer.begin_fill("u1")
+        assert buffer.fill("u1", newest_first(2))
+
+    there.append("u1", row(2))
+    assert [r["text_content"] for r in there.get("u1", 1)] == ["hello 2"]
+    assert here.get("u1", 1) is None
+    here.begin_fill("u1")
+    assert here.fill("u1", newest_first(3))
+
+    # A worker that missed a write does not patch its copy with the next one
+    there.append("u1", row(3))
+    here.append("u1", row(4))
+    assert here.get("u1", 1) is None
+    assert there.get("u1", 1) is None
+
+def test_least_recently_read_users_are_evicted_under_the_cap():
+    per_user = 2 * (ROW_OVERHEAD_BYTES + len("hello 0"))
+    buffer = LatestTextLogBuffer(capacity=2, max_bytes=2 * per_user, refresh_seconds=0)
+    for uid in ("a", "b"):
+        buffer.begin_fill(uid)
+        buffer.fill(uid, newest_first(2, uid))
+    buffer.get("a", 1)
+    buffer.begin_fill("c")
+    buffer.fill("c", newest_first(2, "c"))
+    assert (buffer.get("b", 1), len(buffer)) == (None, 2)
+    assert buffer.get("a", 1) is not None
+    assert buffer.bytes <= buffer.max_bytes
+
+def test_buffers_are_refreshed_after_a_while():
+    clock = FakeClock()
+    buffer = LatestTextLogBuffer(capacity=2, refresh_seconds=30, clock=clock)
+    buffer.begin_fill("u1")
+    buffer.fill("u1", newest_first(2))
+    clock.now = 30
+    assert buffer.get("u1", 1) is None
+    assert len(buffer) == 0
+
+def test_polls_are_served_from_memory_and_see_writes(monkeypatch):
+    """The first poll reads Postgres once; later polls and writes through the app stay in memory"""
+    fetches = []
+    proxied = []
+    database = newest_first(3)
+    stored_at = START + timedelta(minutes=5, microseconds=123)
+
+    def fetch_latest(uid, limit):
+        fetches.append((uid, limit))
+        return database[:limit]
+
+    def handler(request):
+        proxied.append((request.method, str(request.url), request.read()))
+        if request.method == "POST":
+            database.insert(0, {"uid": "u1", "session_id": "s9", "timestamp": stored_at, "text_type": "incoming", "text_content": "new one"})
+        reply = json.dumps({"status": "success", "timestamp": stored_at.isoformat()}).encode()
+        return httpx.Response(201, headers={"content-type": "application/json"}, stream=Body(reply))
+
+    monkeypatch.setattr(se, "latest_text_logs", LatestTextLogBuffer(capacity=3, refresh_seconds=0))
+    monkeypatch.setattr(se, "fetch_latest_text_logs", fetch_latest)
+    monkeypatch.setattr(se, "get_text_log_high_water_mark", lambda *args: None)
+    monkeypatch.setattr(se_proxy, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client = TestClient(app)
+
+    first = client.get("/apps/se/latest_text_logs/u1?limit=2")
+    assert [r["text_content"] for r in first.json()] == ["hello 2", "hello 1"]
+    assert client.get("/apps/se/latest_text_logs/u1?limit=2", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    posted = client.post("/apps/se/text_logs/u1/s9", json={"text_content": "new one", "text_type": "incoming"})
+    assert posted.status_code == 201
+    assert posted.json()["timestamp"] == stored_at.isoformat()
+    assert posted.headers["x-read-after"].startswith("t=")
+    assert json.loads(proxied[0][2]) == {"text_content": "new one", "text_type": "incoming"}
+    latest = client.get("/apps/se/latest_text_logs/u1?limit=2", headers={"If-None-Match": first.headers["etag"]})
+    assert latest.status_code == 200
+    assert [(r["session_id"], r["text_content"]) for r in latest.json()] == [("s9", "new one"), ("s1", "hello 2")]
+    assert fetches == [("u1", 3)]
+    assert len(proxied) == 1
+
+    # The buffered row carries the stored timestamp, so a refill from
+    # Postgres gives the same listing and ETag
+    se.latest_text_logs.forget("u1")
+    refilled = client.get("/apps/se/latest_text_logs/u1?limit=2", headers={"If-None-Match": latest.headers["etag"]})
+    assert refilled.status_code == 304
+    assert len(fetches) == 2
+
+    # Beyond the buffer's capacity the text-log server answers
+    client.get("/apps/se/latest_text_logs/u1?limit=50")
+    assert proxied[-1][:2] == ("GET", f"{se.TEXT_LOG_SERVER_URL}/apps/se/latest_text_logs/u1?limit=50")
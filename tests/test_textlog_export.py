@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.main import app
+from app.api import se
+from app.services import se_textlog_export
+from app.services.se_textlog_export import DEFAULT_BATCH_SIZE, EXPORT_SAFETY_LAG_SECONDS, complete_batches, export_text_logs, load_watermark, split_by_date
+
+def row(ts, uid="u1"):
+    return (uid, "s1", ts, "others", f"text at {ts.isoformat()}")
+
+T0 = datetime(2025, 5, 1, 23, 59, 58)
+
+def recording_writer(written):
+    def write(out_dir, day, rows, fmt):
+        written.append((day, [r[2] for r in rows]))
+        return f"{out_dir}/date={day.isoformat()}/part.{fmt}"
+    return write
+
+def test_complete_batches_never_split_a_timestamp():
+    """Rows sharing the last timestamp of a batch move to the next batch"""
+    t1, t2, t3 = T0, T0 + timedelta(seconds=1), T0 + timedelta(seconds=2)
+    batches = [[row(t1), row(t2)], [row(t2), row(t2)], [row(t2), row(t3)]]
+    out = [[r[2] for r in b] for b in complete_batches(batches)]
+    assert out == [[t1], [t2, t2, t2, t2], [t3]]
+
+def test_split_by_date_groups_contiguous_days():
+    """A batch spanning midnight is written to two date partitions"""
+    rows = [row(T0), row(T0 + timedelta(seconds=1)), row(T0 + timedelta(seconds=3))]
+    assert [(day.isoformat(), len(r)) for day, r in split_by_date(rows)] == [("2025-05-01", 2), ("2025-05-02", 1)]
+
+def test_export_partitions_by_date_and_resumes_from_watermark(tmp_path, monkeypatch):
+    """The watermark is the run's cap (now minus the safety lag); a re-run starts after it"""
+    written = []
+    stamps = [T0 + timedelta(seconds=i) for i in range(4)]
+    now = stamps[3] + timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS + 60)
+    result = export_text_logs(str(tmp_path), batches=[[row(t) for t in stamps[:3]], [row(stamps[3])]],
+                              writer=recording_writer(written), now=now)
+
+    assert result["rows"] == 4
+    assert [day.isoformat() for day, _ in written] == ["2025-05-01", "2025-05-02", "2025-05-02"]
+    cap = now - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS)
+    assert load_watermark(str(tmp_path)) == cap
+    assert json.load(open(os.path.join(tmp_path, "_watermark.json")))["rows"] == 4
+
+    seen = []
+
+    def fake_fetch(since, until, batch_size):
+        seen.append((since, until))
+        return iter([])
+
+    monkeypatch.setattr(se_textlog_export, "fetch_text_log_batches", fake_fetch)
+    later = now + timedelta(hours=1)
+    assert export_text_logs(str(tmp_path), writer=recording_writer([]), now=later)["rows"] == 0
+    assert seen == [(cap, later - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS))]
+    # An empty run still moves the watermark up to its cap
+    assert load_watermark(str(tmp_path)) == seen[0][1]
+    # --until in the future is capped too
+    export_text_logs(str(tmp_path), until=later + timedelta(days=1), writer=recording_writer([]), now=later)
+    assert seen[-1][1] == seen[0][1]
+
+def test_closing_the_batches_closes_the_cursor():
+    """complete_batches closes its source, so the export's cursor ends with the stream"""
+    closed = []
+
+    def source():
+        try:
+            yield [row(T0), row(T0 + timedelta(seconds=1))]
+            yield [row(T0 + timedelta(seconds=2))]
+        finally:
+            closed.append(True)
+
+    batches = complete_batches(source())
+    next(batches)
+    batches.close()
+    assert closed == [True]
+
+def test_parquet_and_arrow_round_trip(tmp_path):
+    """Written files read back with the same rows (needs pyarrow)"""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from app.services.se_textlog_export import arrow_ipc_stream
+    rows = [row(T0 + timedelta(seconds=i)) for i in range(3)]
+
+    result = export_text_logs(str(tmp_path / "pq"), batches=[rows])
+    tables = [pq.read_table(path) for path in result["files"]]
+    assert sum(t.num_rows for t in tables) == 3
+
+    stream = b"".join(arrow_ipc_stream([rows[:2], rows[2:]]))
+    table = pa.ipc.open_stream(stream).read_all()
+    assert table.column("uid").to_pylist() == ["u1"] * 3
+
+def test_export_endpoint_requires_token(monkeypatch):
+    """Without SE_EXPORT_TOKEN, or with the wrong token, the export is refused"""
+    client = TestClient(app)
+    monkeypatch.setattr(se, "EXPORT_TOKEN", None)
+    assert client.get("/apps/se/export/text_logs").status_code == 403
+    monkeypatch.setattr(se, "EXPORT_TOKEN", "s3cret")
+    assert client.get("/apps/se/export/text_logs", headers={"X-Export-Token": "nope"}).status_code == 403
+
+def test_export_endpoint_caps_the_stream_and_closes_it(monkeypatch):
+    """batch_size is clamped, until is capped and returned, and the cursor is closed after a batch in flight"""
+    requested = {}
+
+    def fake_fetch(since, until, batch_size):
+        requested.update(since=since, until=until, batch_size=batch_size)
+        yield [row(T0)]
+
+    monkeypatch.setitem(main.admission.rate_limits, "export", (0, 0))  # Not under test
+    monkeypatch.setattr(se, "EXPORT_TOKEN", "s3cret")
+    monkeypatch.setattr(se, "fetch_text_log_batches", fake_fetch)
+    monkeypatch.setattr(se, "arrow_ipc_stream", lambda batches: (b"batch" for _ in batches))
+    response = TestClient(app).get("/apps/se/export/text_logs?batch_size=100000000&until=2999-01-01T00:00:00",
+                                   headers={"X-Export-Token": "s3cret"})
+    assert response.content == b"batch"
+    assert requested["batch_size"] == DEFAULT_BATCH_SIZE
+    assert datetime.fromisoformat(response.headers["x-export-until"]) == requested["until"] < datetime.now()
+
+    # Offsets in the query are converted to the column's naive UTC
+    response = TestClient(app).get("/apps/se/export/text_logs", params={"since": "2024-01-01T02:00:00+02:00", "until": "2024-01-02T00:00:00Z"},
+                                   headers={"X-Export-Token": "s3cret"})
+    assert response.status_code == 200
+    assert requested["until"] == datetime(2024, 1, 2) == datetime.fromisoformat(response.headers["x-export-until"])
+    assert requested["since"] == datetime(2024, 1, 1)
+
+    class Stream:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    async def scenario():
+        stream, batch = Stream(), asyncio.get_running_loop().create_future()
+        se._close_export_stream(stream, batch)
+        await asyncio.sleep(0.05)
+        assert not stream.closed  # Still fetching on a worker thread
+        batch.set_result(b"late batch")
+        await asyncio.gather(*se._closing_exports)
+        return stream.closed
+
+    assert asyncio.run(scenario())
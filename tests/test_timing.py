@@ -0,0 +1,46 @@
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import se
+from app.services.se_metrics import time_upstream
+from app.services.se_timing import end_request_timing, server_timing_header, span, start_request_timing, summarize_spans
+
+def test_spans_are_collected_per_request():
+    """Spans are only recorded while a request is being timed"""
+    with span("outside"):
+        pass
+
+    token = start_request_timing()
+    with span("gemini"):
+        pass
+    with span("firestore"):
+        pass
+    with span("firestore"):
+        pass
+    summary = summarize_spans(end_request_timing(token))
+
+    assert list(summary) == ["gemini", "firestore"]
+    assert summary["firestore"]["count"] == 2
+
+def test_server_timing_header_format():
+    """Repeated spans are summed and annotated with a call count"""
+    header = server_timing_header({"gemini": {"ms": 812.44, "count": 1}, "postgres": {"ms": 20.0, "count": 3}}, 850.0)
+    assert header == 'gemini;dur=812.4, postgres;dur=20.0;desc="3 calls", total;dur=850.0'
+
+def test_server_timing_header_on_response(monkeypatch):
+    """Upstream calls made while serving a request show up in Server-Timing"""
+    def fake_paraphrase(text_content):
+        with time_upstream("secret_manager", "access_secret_version"):
+            pass
+        with time_upstream("gemini", "generate_content"):
+            time.sleep(0.01)
+        return "rephrased"
+
+    monkeypatch.setattr(se, "get_outgoing_paraphrase", fake_paraphrase)
+    response = TestClient(app).post("/apps/se/outgoing_paraphrase", json={"text_content": "hi"})
+
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("secret_manager;dur=")
+    assert "gemini;dur=" in timing
+    assert "total;dur=" in timing